@@ -30,5 +30,7 @@ class Config:
     # Prevents the fake bank from blocking on slow or unresponsive receivers.
     TIMEOUT_SECONDS = float(os.getenv("TIMEOUT_SECONDS", "5"))
 
-
-
+    # Batched delivery (POST /bank/pix/pay/batch -> receiver's /webhooks/pix/batch).
+    # gzip pays off for large batches; the signature always covers the bytes sent.
+    WEBHOOK_BATCH_GZIP = os.getenv("WEBHOOK_BATCH_GZIP", "1") == "1"
+    MAX_PAY_BATCH_SIZE = int(os.getenv("MAX_PAY_BATCH_SIZE", "500"))
@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify
-from services.webhook_dispatcher import send_webhook
+from config import Config
+from services.webhook_dispatcher import send_webhook, send_webhook_batch
 import uuid
 
 pix_bp = Blueprint("pix", __name__, url_prefix="/bank/pix")
@@ -92,4 +93,50 @@ def process_pix_payment():
     }), 200
 
 
+@pix_bp.route("/pay/batch", methods=["POST"])
+def process_pix_payment_batch():
+    """
+    Settles many PIX payments at once and notifies each receiver with ONE batched
+    webhook request (grouped by webhook_url), instead of one request per event.
+
+    Body: {"external_ids": [...]}. Used to benchmark the receiver's batch path.
+    """
+    data = request.get_json(silent=True) or {}
+    external_ids = data.get("external_ids")
+
+    if not isinstance(external_ids, list) or not external_ids:
+        return jsonify({"error": "external_ids must be a non-empty list"}), 400
+
+    if len(external_ids) > Config.MAX_PAY_BATCH_SIZE:
+        return jsonify({"error": f"Batch size must be <= {Config.MAX_PAY_BATCH_SIZE}"}), 400
+
+    missing = [external_id for external_id in external_ids if external_id not in BANK_CHARGES]
+    if missing:
+        return jsonify({"error": "Charge not found", "external_ids": missing}), 404
 
+    # One event per payment, grouped by receiver
+    by_url = {}
+    for external_id in dict.fromkeys(external_ids):
+        charge = BANK_CHARGES[external_id]
+        by_url.setdefault(charge["webhook_url"], []).append({
+            "event_id": f"evt_{uuid.uuid4()}",
+            "external_id": external_id,
+            "value": charge["value"],
+            "status": "PAID"
+        })
+
+    delivered = {}
+    for url, events in by_url.items():
+        delivered.update(send_webhook_batch(url, events, gzip_body=Config.WEBHOOK_BATCH_GZIP))
+
+    for external_id in external_ids:
+        BANK_CHARGES[external_id]["status"] = "PAID"
+
+    failed = [event_id for event_id, ok in delivered.items() if not ok]
+
+    return jsonify({
+        "message": "PIX batch processed",
+        "events": len(delivered),
+        "delivered": len(delivered) - len(failed),
+        "failed_event_ids": failed
+    }), 502 if failed else 200
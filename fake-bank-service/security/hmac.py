@@ -2,12 +2,18 @@ import hmac
 import hashlib
 from config import Config
 
-def sign_payload(payload: str) -> str:
-    signature = hmac.new(
-        Config.WEBHOOK_SECRET.encode(),
-        payload.encode(),
-        hashlib.sha256
-    ).hexdigest()
+# Keyed once per process; each signature copy()-es it and only hashes the body.
+# Rotation: the receiver accepts the new secret as current and this one as
+# previous (WEBHOOK_SECRET_PREVIOUS) before this service switches to the new one.
+_keyed = hmac.new(Config.WEBHOOK_SECRET.encode(), digestmod=hashlib.sha256)
 
-    return f"sha256={signature}"
 
+def sign_payload(payload) -> str:
+    # str (JSON text) or bytes (e.g. a gzip-encoded batch body)
+    if isinstance(payload, str):
+        payload = payload.encode()
+
+    mac = _keyed.copy()
+    mac.update(payload)
+
+    return f"sha256={mac.hexdigest()}"
@@ -1,6 +1,8 @@
+import gzip
 import json
 import time
 import random
+import uuid
 import requests
 
 from audit.request_context import get_request_id
@@ -41,6 +43,7 @@ def send_webhook(
     - HMAC signature over the RAW JSON body
     - X-Timestamp header
     - X-Event-Id header
+    - Idempotency-Key (= event_id): the receiver replays its stored response on retries
     - X-Request-Id for cross-service correlation
     - Retry with exponential backoff on network errors and non-2xx responses
 
@@ -71,6 +74,7 @@ def send_webhook(
         "X-Signature": signature,
         "X-Timestamp": timestamp,
         "X-Event-Id": event_id,
+        "Idempotency-Key": event_id,
         "X-Request-Id": request_id,
     }
 
@@ -153,3 +157,143 @@ def send_webhook(
 
     return False
 
+
+def batch_url(url: str) -> str:
+    """
+    Batch endpoint of a receiver registered with its single-event webhook URL
+    (.../webhooks/pix -> .../webhooks/pix/batch).
+    """
+    return f"{url.rstrip('/')}/batch"
+
+
+def _is_retryable(status_code) -> bool:
+    return status_code is None or status_code == 429 or status_code >= 500
+
+
+def send_webhook_batch(
+    url: str,
+    events: list,
+    *,
+    gzip_body: bool = False,
+    timeout_seconds: int = DEFAULT_TIMEOUT_SECONDS,
+    max_retries: int = DEFAULT_MAX_RETRIES,
+    initial_delay_seconds: float = DEFAULT_INITIAL_DELAY_SECONDS,
+    backoff_multiplier: float = DEFAULT_BACKOFF_MULTIPLIER,
+    max_delay_seconds: float = DEFAULT_MAX_DELAY_SECONDS,
+) -> dict:
+    """
+    Sends many events in one request to the receiver's batch endpoint:
+    body {"events": [...]}, optionally gzip-encoded, ONE HMAC signature over the
+    bytes on the wire.
+
+    The receiver answers with one result per event. Only the events that failed
+    with a retryable status (5xx / 429 / network error) are sent again, in a new
+    batch, with the same backoff as send_webhook(); the ones still failing after
+    the last attempt go to the DLQ individually (replayable via /bank/dlq/replay).
+
+    `url` is the single-event webhook URL registered with the charge.
+
+    Returns:
+      {event_id: delivered (bool)}
+    """
+    if not url:
+        raise ValueError("Webhook URL is required")
+
+    if not events or any(not isinstance(e, dict) or not e.get("event_id") for e in events):
+        raise ValueError("events must be a non-empty list of payloads with event_id")
+
+    request_id = get_request_id()
+    pending = {event["event_id"]: event for event in events}
+    delivered = {}
+    rejected = {}
+    last_status = {}
+    last_error = None
+    delay = float(initial_delay_seconds)
+
+    for attempt in range(1, max_retries + 1):
+        body = json.dumps({"events": list(pending.values())}, separators=(",", ":"), ensure_ascii=False).encode()
+        headers = {
+            "Content-Type": "application/json",
+            # A new key per attempt: each attempt carries a different subset of events
+            "Idempotency-Key": f"batch_{uuid.uuid4()}",
+            "X-Request-Id": request_id,
+        }
+        if gzip_body:
+            body = gzip.compress(body)
+            headers["Content-Encoding"] = "gzip"
+
+        # Signature over the exact bytes sent (compressed or not)
+        headers["X-Signature"] = sign_payload(body)
+        headers["X-Timestamp"] = str(int(time.time()))
+
+        try:
+            resp = requests.post(batch_url(url), data=body, headers=headers, timeout=timeout_seconds)
+            last_error = None
+
+            if 200 <= resp.status_code < 300:
+                for result in resp.json().get("results", []):
+                    event_id = result.get("event_id")
+                    if event_id not in pending:
+                        continue
+                    status = result.get("status")
+                    last_status[event_id] = status
+                    if _is_retryable(status):
+                        continue
+                    if status < 400:
+                        delivered[event_id] = True
+                    else:
+                        # 4xx for this event: permanent, same as send_webhook()
+                        rejected[event_id] = pending[event_id]
+                    del pending[event_id]
+            elif not _is_retryable(resp.status_code):
+                # Whole batch rejected (bad signature / payload): no point retrying
+                print(
+                    f"[BANK] webhook batch non-retryable | attempt={attempt} "
+                    f"| status={resp.status_code} | events={len(pending)} | request_id={request_id} "
+                    f"| response_body={(resp.text or '')[:1000]}"
+                )
+                for event_id in pending:
+                    last_status[event_id] = resp.status_code
+                rejected.update(pending)
+                pending.clear()
+                break
+            else:
+                for event_id in pending:
+                    last_status[event_id] = resp.status_code
+
+            print(
+                f"[BANK] webhook batch sent | attempt={attempt} | status={resp.status_code} "
+                f"| delivered={sum(delivered.values())} | pending={len(pending)} | request_id={request_id}"
+            )
+
+        except (requests.RequestException, ValueError) as e:
+            print(
+                f"[BANK] webhook batch error | attempt={attempt} "
+                f"| error={e} | events={len(pending)} | request_id={request_id}"
+            )
+            last_error = str(e)
+
+        if not pending or attempt == max_retries:
+            break
+
+        time.sleep(_sleep_with_jitter(delay))
+        delay = min(delay * backoff_multiplier, max_delay_seconds)
+
+    failed = {**rejected, **pending}
+    for event_id, payload in failed.items():
+        delivered[event_id] = False
+        enqueue_failed_webhook(
+            url=url,
+            payload=payload,
+            headers={"Content-Type": "application/json", "X-Event-Id": event_id, "X-Request-Id": request_id},
+            last_status_code=last_status.get(event_id),
+            last_error=last_error,
+        )
+
+    if failed:
+        print(
+            f"[BANK] webhook batch events permanently failed -> DLQ "
+            f"| events={len(failed)} | request_id={request_id} | last_error={last_error}"
+        )
+
+    return delivered
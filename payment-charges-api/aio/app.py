@@ -0,0 +1,118 @@
+import asyncio
+import time
+
+from quart import Quart, jsonify, g, request
+from dotenv import load_dotenv
+
+from aio.database import create_all, init_database
+from aio.redis_client import create_redis_client
+from aio.routes.charges import charges_bp
+from aio.routes.health import health_bp, health_checks, health_state
+from aio.routes.webhooks import webhooks_bp
+from audit.logger import configure_audit_log
+from audit.request_context import REQUEST_ID_HEADER, set_request_id
+from config import load_config
+from infrastructure.health_monitor import run_health_monitor_async
+from infrastructure.metrics import observe_request
+from services.charge_expiry import run_expiry_sweeper_async
+from exceptions.charge_exceptions import (
+    ChargeNotPayable,
+    ChargeTemporarilyUnavailable,
+    InvalidChargeValue
+)
+
+
+def create_app(config=None) -> Quart:
+    """
+    asyncio-native (ASGI) build of the Payment Charges API.
+
+    Exposes the same blueprints as app.py, backed by redis.asyncio and an async
+    SQLAlchemy engine, so a single worker can keep thousands of polling/webhook
+    connections open without one thread per request.
+
+    Same configuration as app.create_app: config.load_config() (.env loaded
+    first unless `config` is given), overridden by `config`; config["REDIS_CLIENT"]
+    replaces the Redis client. The engine, session factory and Redis client are
+    created here, per app (app.extensions), and connect on first use.
+    """
+    if config is None:
+        # Before load_config(): .env values must reach DATABASE_URL / REDIS_URL too
+        load_dotenv()
+        config = {}
+
+    app = Quart(__name__)
+
+    app.config.update(load_config())
+    app.config.update({key: value for key, value in config.items() if key != "REDIS_CLIENT"})
+
+    # Fail fast if critical security config is missing
+    if not app.config["WEBHOOK_SECRET"]:
+        raise RuntimeError("WEBHOOK_SECRET not configured")
+
+    client = config.get("REDIS_CLIENT")
+    app.extensions["redis"] = client if client is not None else create_redis_client(app.config["REDIS_URL"])
+    init_database(app)
+
+    configure_audit_log(app.config)
+
+    @app.before_serving
+    async def _startup():
+        await create_all(app.extensions["db_engine"])
+        if app.config["EXPIRY_SWEEPER_ENABLED"]:
+            app.extensions["expiry_sweeper"] = asyncio.create_task(
+                run_expiry_sweeper_async(
+                    app.extensions["redis"],
+                    app.extensions["db_engine"],
+                    interval=app.config["EXPIRY_SWEEP_INTERVAL_SECONDS"],
+                    chunk_size=app.config["EXPIRY_SWEEP_CHUNK"],
+                )
+            )
+        if app.config["HEALTH_MONITOR_ENABLED"]:
+            state = health_state(app)
+            app.extensions["health_monitor"] = asyncio.create_task(
+                run_health_monitor_async(state, health_checks(app), interval=state.interval, timeout=state.timeout)
+            )
+
+    @app.after_serving
+    async def _shutdown():
+        tasks = [app.extensions.pop(name, None) for name in ("expiry_sweeper", "health_monitor")]
+        for task in filter(None, tasks):
+            task.cancel()
+        await asyncio.gather(*filter(None, tasks), return_exceptions=True)
+        await app.extensions["redis"].aclose()
+        await app.extensions["db_engine"].dispose()
+
+    @app.before_request
+    async def _before_request():
+        g.request_started = time.perf_counter()
+        g.request_id = set_request_id(request.headers.get(REQUEST_ID_HEADER))
+
+    @app.after_request
+    async def _after_request(response):
+        response.headers[REQUEST_ID_HEADER] = g.request_id
+        observe_request(
+            request.method,
+            request.blueprint,
+            request.url_rule.rule if request.url_rule else None,
+            response.status_code,
+            time.perf_counter() - g.request_started,
+        )
+        return response
+
+    app.register_blueprint(webhooks_bp)
+    app.register_blueprint(health_bp)
+    app.register_blueprint(charges_bp)
+
+    @app.errorhandler(ChargeNotPayable)
+    async def handle_not_payable(e):
+        return jsonify({"error": str(e)}), 400
+
+    @app.errorhandler(InvalidChargeValue)
+    async def handle_invalid_value(e):
+        return jsonify({"error": str(e)}), 400
+
+    @app.errorhandler(ChargeTemporarilyUnavailable)
+    async def handle_temporarily_unavailable(e):
+        return jsonify({"error": str(e)}), 503, {"Retry-After": "1"}
+
+    return app
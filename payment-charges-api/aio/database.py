@@ -0,0 +1,70 @@
+from quart import current_app
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from werkzeug.local import LocalProxy
+
+from infrastructure.metrics import instrument_engine
+from repository.database import db, migrate_schema
+from repository.engine import engine_options, ensure_sqlite_dir, install_sqlite_pragmas
+
+# Async drivers for the URLs accepted by the sync mode.
+_ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+
+def to_async_url(url: str) -> str:
+    scheme, sep, rest = url.partition("://")
+    return f"{_ASYNC_DRIVERS.get(scheme, scheme)}{sep}{rest}"
+
+
+def create_database_engine(url, options=None):
+    """
+    Async engine for a DATABASE_URL of the sync mode, with the same pool tuning
+    (engine_options unless `options` is given), SQLite pragmas and metrics.
+    No connection is opened before first use.
+    """
+    ensure_sqlite_dir(url)
+    if options is None:
+        options = engine_options(url, async_driver=True)
+    engine = create_async_engine(to_async_url(url), **options)
+    install_sqlite_pragmas(engine.sync_engine)
+    instrument_engine(engine.sync_engine)
+    return engine
+
+
+def init_database(app) -> None:
+    """
+    Engine and session factory of `app`, from SQLALCHEMY_DATABASE_URI (and
+    SQLALCHEMY_ENGINE_OPTIONS when set): app.extensions["db_engine"] and
+    app.extensions["db_sessions"].
+    """
+    engine = app.extensions["db_engine"] = create_database_engine(
+        app.config["SQLALCHEMY_DATABASE_URI"],
+        app.config.get("SQLALCHEMY_ENGINE_OPTIONS"),
+    )
+    # expire_on_commit=False: attributes stay loaded after commit, so building the
+    # response never triggers an implicit (and, under asyncio, illegal) lazy load.
+    app.extensions["db_sessions"] = async_sessionmaker(engine, expire_on_commit=False)
+
+
+def get_engine():
+    return current_app.extensions["db_engine"]
+
+
+def get_session_factory():
+    return current_app.extensions["db_sessions"]
+
+
+# Module-level handles kept for the call sites: resolve to the current app's
+# engine / session factory on every use
+engine = LocalProxy(get_engine)
+SessionLocal = LocalProxy(get_session_factory)
+
+
+async def create_all(engine):
+    # Models are declared on Flask-SQLAlchemy's metadata; the tables are the same
+    # in both serving modes.
+    async with engine.begin() as conn:
+        await conn.run_sync(db.metadata.create_all)
+        await conn.run_sync(migrate_schema)
@@ -0,0 +1,38 @@
+import time
+from functools import wraps
+
+from quart import request, jsonify
+
+from aio.redis_client import redis_client
+from infrastructure.metrics import RATE_LIMIT_REJECTIONS
+
+
+def rate_limit_key():
+    # Same key as extensions.rate_limit_key: API key first, then client IP
+    return request.headers.get("x-api-key") or request.remote_addr
+
+
+def limit(max_requests: int, per_seconds: int = 60):
+    """
+    Fixed-window rate limit (the strategy Flask-Limiter uses by default),
+    implemented with a single pipelined INCR + EXPIRE on the async client.
+    """
+    def decorator(f):
+        @wraps(f)
+        async def wrapper(*args, **kwargs):
+            window = int(time.time()) // per_seconds
+            key = f"LIMITER/aio/{rate_limit_key()}/{request.endpoint}/{window}"
+
+            async with redis_client.pipeline(transaction=False) as pipe:
+                pipe.incr(key)
+                pipe.expire(key, per_seconds)
+                hits, _ = await pipe.execute()
+
+            if hits > max_requests:
+                RATE_LIMIT_REJECTIONS.labels(request.endpoint or "unknown").inc()
+                return jsonify({"error": f"Rate limit exceeded: {max_requests} per {per_seconds} seconds"}), 429
+
+            return await f(*args, **kwargs)
+
+        return wrapper
+    return decorator
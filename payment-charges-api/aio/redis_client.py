@@ -0,0 +1,22 @@
+from quart import current_app
+from werkzeug.local import LocalProxy
+
+from infrastructure.metrics import InstrumentedAsyncRedis
+
+
+def create_redis_client(url):
+    # asyncio counterpart of infrastructure/redis_client.py (same URL, same decoding),
+    # so both serving modes read and write the exact same keys.
+    return InstrumentedAsyncRedis.from_url(url, decode_responses=True)
+
+
+def get_redis():
+    """
+    Async Redis client of the current app: app.extensions["redis"], set by
+    aio.app.create_app() (config["REDIS_CLIENT"] or a client for REDIS_URL).
+    """
+    return current_app.extensions["redis"]
+
+
+# Module-level handle kept for the call sites: resolves to get_redis() on every use
+redis_client = LocalProxy(get_redis)
@@ -0,0 +1,252 @@
+from quart import Blueprint, request, jsonify, current_app
+from sqlalchemy import insert
+from datetime import datetime, timedelta
+import time
+import uuid
+
+from aio.database import SessionLocal
+from aio.extensions import limit
+from aio.redis_client import redis_client
+from aio.security import require_api_key
+from db_models.charges import Charge, ChargeStatus
+from infrastructure.local_cache import charge_response, charge_snapshot, terminal_cache_for
+from audit.logger import logger
+from services.charge_cache import (
+    STALE_GRACE_SECONDS,
+    cache_key,
+    cache_ttl_for,
+    encode_entry,
+    get_charge_cached_async,
+)
+from routes.charges import (
+    CHARGE_TTL_SECONDS,
+    MAX_BATCH_SIZE,
+    pending_payload,
+    _amount_cents,
+    seconds_until_deadline,
+)
+from services.charge_expiry import payment_queued_async, schedule_expiry
+from services.money import from_cents
+from services.charge_listing import InvalidListQuery, build_list_query, page_response, parse_list_params
+from services.charge_state_machine import ChargeState, transition_where_async
+
+# asyncio mirror of routes/charges.py: same URLs, payloads, status codes and Redis keys.
+charges_bp = Blueprint("charges", __name__, url_prefix="/payment")
+
+
+@charges_bp.route("/charges", methods=["POST"])
+@limit(10, per_seconds=60)
+async def create_charge():
+    data = await request.get_json()
+
+    if not data or ("value" not in data and "amount_cents" not in data):
+        return jsonify({"error": "Value is required"}), 400
+
+    amount_cents = _amount_cents(data)
+    if amount_cents is None:
+        return jsonify({"error": "Invalid value"}), 400
+
+    created_at = datetime.utcnow()
+    charge = Charge(
+        value=from_cents(amount_cents),
+        amount_cents=amount_cents,
+        status=ChargeStatus.PENDING,
+        external_id=str(uuid.uuid4()),
+        created_at=created_at,
+        expires_at=created_at + timedelta(seconds=CHARGE_TTL_SECONDS),
+    )
+
+    async with SessionLocal() as session:
+        session.add(charge)
+        await session.commit()
+
+    # TTL key, expiry deadline and cache entry in a single round trip (see routes/charges.py)
+    async with redis_client.pipeline(transaction=False) as pipe:
+        pipe.setex(
+            f"charge:ttl:{charge.external_id}",
+            CHARGE_TTL_SECONDS,
+            "PENDING",
+        )
+        schedule_expiry(pipe, {charge.external_id: time.time() + CHARGE_TTL_SECONDS})
+        pipe.setex(
+            cache_key(charge.id),
+            CHARGE_TTL_SECONDS + STALE_GRACE_SECONDS,
+            encode_entry(charge_response(charge_snapshot(charge)), 0.0, CHARGE_TTL_SECONDS),
+        )
+        await pipe.execute()
+
+    logger.info(
+        "Charge created",
+        extra={"charge_id": charge.id, "external_id": charge.external_id}
+    )
+
+    return jsonify({
+        "id": charge.id,
+        "external_id": charge.external_id,
+        "status": charge.status,
+    }), 201
+
+
+@charges_bp.route("/charges", methods=["GET"])
+@require_api_key
+async def list_charges():
+    try:
+        params = parse_list_params(request.args)
+    except InvalidListQuery as e:
+        return jsonify({"error": str(e)}), 400
+
+    async with SessionLocal() as session:
+        charges = (await session.execute(build_list_query(**params))).scalars().all()
+
+    return jsonify(page_response(charges, params["limit"]))
+
+
+@charges_bp.route("/charges/batch", methods=["POST"])
+@limit(10, per_seconds=60)
+async def create_charges_batch():
+    data = await request.get_json(silent=True)
+
+    if not isinstance(data, dict) or not isinstance(data.get("charges"), list):
+        return jsonify({"error": "charges must be a list"}), 400
+
+    items = data["charges"]
+    if not items:
+        return jsonify({"error": "charges must not be empty"}), 400
+
+    if len(items) > MAX_BATCH_SIZE:
+        return jsonify({"error": f"Batch too large (max {MAX_BATCH_SIZE})"}), 400
+
+    now = datetime.utcnow()
+    expires_at = now + timedelta(seconds=CHARGE_TTL_SECONDS)
+    results = [None] * len(items)
+    rows = []
+
+    for index, item in enumerate(items):
+        amount_cents = _amount_cents(item)
+        if amount_cents is None:
+            results[index] = {"index": index, "error": "Invalid value"}
+            continue
+
+        rows.append({
+            "value": from_cents(amount_cents),
+            "amount_cents": amount_cents,
+            "status": ChargeStatus.PENDING.value,
+            "external_id": str(uuid.uuid4()),
+            "created_at": now,
+            "expires_at": expires_at,
+        })
+        results[index] = {"index": index, "external_id": rows[-1]["external_id"]}
+
+    if not rows:
+        return jsonify({"created": 0, "failed": len(items), "results": results}), 400
+
+    try:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for row in rows:
+                pipe.setex(f"charge:ttl:{row['external_id']}", CHARGE_TTL_SECONDS, "PENDING")
+            deadline = time.time() + CHARGE_TTL_SECONDS
+            schedule_expiry(pipe, {row["external_id"]: deadline for row in rows})
+            await pipe.execute()
+    except Exception:
+        logger.exception("Failed to write TTL keys for charge batch", extra={"size": len(rows)})
+        return jsonify({"error": "Service unavailable"}), 503
+
+    async with SessionLocal() as session:
+        try:
+            inserted = (await session.execute(
+                insert(Charge).returning(Charge.id, Charge.external_id),
+                rows,
+            )).all()
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            logger.exception("Failed to insert charge batch", extra={"size": len(rows)})
+            return jsonify({"error": "Internal server error"}), 500
+
+    ids_by_external_id = {external_id: charge_id for charge_id, external_id in inserted}
+    cents_by_external_id = {row["external_id"]: row["amount_cents"] for row in rows}
+
+    for result in results:
+        if "external_id" in result:
+            result["id"] = ids_by_external_id[result["external_id"]]
+            result["status"] = ChargeStatus.PENDING.value
+
+    try:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for external_id, charge_id in ids_by_external_id.items():
+                payload = pending_payload(charge_id, cents_by_external_id[external_id])
+                pipe.setex(
+                    cache_key(charge_id),
+                    CHARGE_TTL_SECONDS + STALE_GRACE_SECONDS,
+                    encode_entry(payload, 0.0, CHARGE_TTL_SECONDS),
+                )
+            await pipe.execute()
+    except Exception:
+        logger.exception("Failed to warm charge cache for batch", extra={"size": len(rows)})
+
+    logger.info(
+        "Charge batch created",
+        extra={"charges_created": len(rows), "charges_failed": len(items) - len(rows)}
+    )
+
+    return jsonify({
+        "created": len(rows),
+        "failed": len(items) - len(rows),
+        "results": results,
+    }), 201
+
+
+@charges_bp.route("/charges/<int:charge_id>", methods=["GET"])
+async def get_charge(charge_id):
+    terminal_cache = terminal_cache_for(current_app)
+    terminal = terminal_cache.get_by_id(charge_id)
+    if terminal:
+        return jsonify(charge_response(terminal))
+
+    loaded = []
+
+    def load():
+        # _load_charge stores the DB snapshot (with external_id) in the terminal cache
+        loaded.append(charge_id)
+        return _load_charge(charge_id)
+
+    response = await get_charge_cached_async(redis_client, charge_id, load)
+    if response is None:
+        return jsonify({"error": "Charge not found"}), 404
+
+    if not loaded:
+        # Served from Redis: this read has not stored it yet
+        terminal_cache.put(response)
+    return jsonify(response)
+
+
+async def _load_charge(charge_id):
+    async with SessionLocal() as session:
+        charge = await session.get(Charge, charge_id)
+        if not charge:
+            return None, None
+
+        # DB status is kept current by the expiry sweeper; same past-deadline safety net
+        # (and queued-payment check) as the sync mode
+        remaining_ttl = seconds_until_deadline(charge)
+        row = None
+        if (
+            charge.status == ChargeState.PENDING.value
+            and remaining_ttl <= 0
+            and not await payment_queued_async(redis_client, charge.external_id)
+        ):
+            try:
+                row = await transition_where_async(session, ChargeState.EXPIRED, Charge.id == charge.id)
+                if row is not None:
+                    logger.info("Charge expired on read past its deadline", extra={"charge_id": charge.id})
+                else:
+                    # Lost the race (paid in the meantime): read the current state
+                    await session.refresh(charge)
+            except Exception:
+                logger.exception("Failed to expire charge on read", extra={"charge_id": charge.id})
+
+        snapshot = charge_snapshot(row if row is not None else charge)
+
+    terminal_cache_for(current_app).put(snapshot)
+    response = charge_response(snapshot)
+    return response, cache_ttl_for(response, remaining_ttl)
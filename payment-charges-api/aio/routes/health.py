@@ -0,0 +1,64 @@
+import asyncio
+
+from quart import Blueprint, Response, current_app, jsonify
+from sqlalchemy import text
+
+from infrastructure.health_monitor import HealthState, check_all_async
+from infrastructure.metrics import metrics_payload
+
+health_bp = Blueprint("health", __name__)
+
+@health_bp.route("/health", methods=["GET"])
+async def health():
+    return jsonify({"status": "ok"}), 200
+
+
+def health_checks(app) -> dict:
+    """
+    Dependency checks of `app` (its engine and Redis client), run by the monitor
+    task started in aio/app.py or by /ready itself.
+    """
+    engine = app.extensions["db_engine"]
+    client = app.extensions["redis"]
+
+    async def database():
+        async with engine.connect() as conn:
+            result = (await conn.execute(text("SELECT 1"))).scalar_one()
+        if result != 1:
+            raise RuntimeError("DB healthcheck returned unexpected result")
+
+    return {"database": database, "redis": client.ping}
+
+
+def health_state(app) -> HealthState:
+    state = app.extensions.get("health_state")
+    if state is None:
+        state = app.extensions["health_state"] = HealthState(
+            ("database", "redis"),
+            interval=app.config["HEALTH_CHECK_INTERVAL_SECONDS"],
+            timeout=app.config["HEALTH_CHECK_TIMEOUT_SECONDS"],
+        )
+    return state
+
+
+@health_bp.route("/ready", methods=["GET"])
+async def ready():
+    state = health_state(current_app)
+    if "health_monitor" not in current_app.extensions and state.is_stale():
+        # No monitor task (HEALTH_MONITOR_ENABLED=0): one refresh at a time, the
+        # other probes answer from the previous snapshot meanwhile
+        refresh = current_app.extensions.get("health_refresh")
+        if refresh is None or refresh.done():
+            refresh = current_app.extensions["health_refresh"] = asyncio.ensure_future(
+                check_all_async(state, health_checks(current_app), state.timeout)
+            )
+        if not state.checked:
+            await asyncio.shield(refresh)
+    body, is_ready = state.report()
+    return jsonify(body), 200 if is_ready else 503
+
+
+@health_bp.route("/metrics", methods=["GET"])
+async def metrics():
+    body, content_type = metrics_payload()
+    return Response(body, content_type=content_type)
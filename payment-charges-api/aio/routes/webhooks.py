@@ -0,0 +1,292 @@
+from functools import wraps
+
+from quart import Blueprint, request, jsonify, current_app, make_response
+from sqlalchemy import select
+
+from aio.database import SessionLocal
+from aio.redis_client import redis_client
+from aio.security import idempotent, require_webhook_signature
+from audit.logger import logger
+from db_models.charges import Charge
+from infrastructure.local_cache import charge_response, charge_snapshot, terminal_cache_for
+from infrastructure.metrics import observe_webhook
+from services.money import cents_from_payload
+from services.charge_cache import write_through_async
+from services.webhook_batch import (
+    InvalidWebhookBatch,
+    candidate_ids,
+    decide_batch,
+    fail_candidates,
+    parse_batch_body,
+    queue_finish,
+    settle_batch,
+    stream_results,
+    summary,
+    validate_events,
+)
+from services.webhook_processor import validate_event
+from services.webhook_stream import (
+    DEFAULT_STREAM_MAXLEN,
+    enqueue_webhook_event_async,
+    enqueue_webhook_events_async,
+)
+from security.event_dedupe import event_dedupe_for
+from security.webhook_gate import (
+    GateResult,
+    release_webhook_event_async,
+    reserve_webhook_event_async,
+    reserve_webhook_events_async,
+)
+from services.charge_state_machine import (
+    ChargeState,
+    transition_rows_where_async,
+    transition_where_async,
+)
+
+# asyncio mirror of routes/webhooks.py: same validations, responses and Redis keys.
+webhooks_bp = Blueprint("webhooks", __name__)
+
+
+async def _release_event(event_id, reserved):
+    if not reserved:
+        return
+    try:
+        await release_webhook_event_async(redis_client, event_id, event_dedupe_for(current_app))
+    except Exception:
+        logger.exception("Failed to release webhook event reservation", extra={"event_id": event_id})
+
+
+def count_outcome(f):
+    # Same as routes.webhooks.count_outcome
+    @wraps(f)
+    async def wrapper(*args, **kwargs):
+        response = await make_response(await f(*args, **kwargs))
+        observe_webhook(
+            await response.get_json(silent=True),
+            response.status_code,
+            replayed="Idempotent-Replayed" in response.headers,
+        )
+        return response
+    return wrapper
+
+
+@webhooks_bp.route("/webhooks/pix", methods=["POST"])
+@count_outcome
+@require_webhook_signature
+@idempotent(ttl=300)
+async def pix_webhook():
+    data = await request.get_json(silent=True)
+
+    if not isinstance(data, dict):
+        return jsonify({"error": "Invalid JSON payload"}), 400
+
+    invalid = validate_event(data)
+    if invalid:
+        body, status = invalid
+        return jsonify(body), status
+
+    external_id = data["external_id"]
+    event_id = data["event_id"]
+    stream_mode = current_app.config.get("WEBHOOK_INGESTION_MODE") == "stream"
+    reserved = False
+
+    try:
+        try:
+            if stream_mode:
+                gate = await enqueue_webhook_event_async(
+                    redis_client,
+                    data,
+                    current_app.config.get("WEBHOOK_STREAM_MAXLEN", DEFAULT_STREAM_MAXLEN),
+                    dedupe=event_dedupe_for(current_app),
+                )
+            else:
+                gate = await reserve_webhook_event_async(
+                    redis_client, event_id, external_id, dedupe=event_dedupe_for(current_app)
+                )
+        except Exception:
+            logger.exception("Redis webhook gate failed", extra={"event_id": event_id})
+            return jsonify({"error": "Service unavailable"}), 503
+
+        if gate == GateResult.DUPLICATE:
+            logger.info(
+                "Duplicate webhook event ignored",
+                extra={"event_id": event_id, "external_id": external_id}
+            )
+            return jsonify({"message": "Duplicate event ignored"}), 200
+
+        if stream_mode:
+            if gate == GateResult.CHARGE_EXPIRED:
+                logger.warning("Webhook received but charge TTL missing/expired", extra={"external_id": external_id})
+                return jsonify({"message": "Expired charge ignored"}), 200
+            # Applied by the worker pool (webhook_worker.py), same as WSGI mode
+            return jsonify({"message": "Event accepted"}), 202
+
+        reserved = gate == GateResult.RESERVED
+
+        terminal_cache = terminal_cache_for(current_app)
+        terminal = terminal_cache.get_by_external_id(external_id)
+        if terminal:
+            logger.info("Ignored webhook for already finalized charge (local cache)", extra={"charge_id": terminal['id'], "status": terminal['status']})
+            await _release_event(event_id, reserved)
+            return jsonify({"message": "Charge already processed"}), 200
+
+        amount_cents = cents_from_payload(data)
+
+        async with SessionLocal() as session:
+            # Hot path: one conditional UPDATE, no SELECT (same as services/webhook_processor.py)
+            row = None
+            if gate != GateResult.CHARGE_EXPIRED and amount_cents is not None:
+                try:
+                    row = await transition_where_async(
+                        session,
+                        ChargeState.PAID,
+                        Charge.external_id == external_id,
+                        Charge.amount_cents == amount_cents,
+                    )
+                except Exception:
+                    logger.exception("Failed to commit payment for charge", extra={"external_id": external_id})
+                    await _release_event(event_id, reserved)
+                    return jsonify({"error": "Internal server error"}), 500
+
+            if row is None:
+                charge = (
+                    await session.execute(select(Charge).filter_by(external_id=external_id))
+                ).scalars().first()
+
+                if not charge:
+                    logger.error("Charge not found", extra={"external_id": external_id})
+                    await _release_event(event_id, reserved)
+                    return jsonify({"error": "Charge not found"}), 404
+
+                if str(charge.status) in (ChargeState.PAID.value, ChargeState.EXPIRED.value):
+                    logger.info("Ignored webhook for already finalized charge", extra={"charge_id": charge.id, "status": charge.status})
+                    terminal_cache.put(charge_snapshot(charge))
+                    await _release_event(event_id, reserved)
+                    return jsonify({"message": "Charge already processed"}), 200
+
+                if gate == GateResult.CHARGE_EXPIRED:
+                    logger.warning("Webhook received but charge TTL missing/expired", extra={"charge_id": charge.id})
+                    return jsonify({"message": "Expired charge ignored"}), 200
+
+                if amount_cents is None:
+                    await _release_event(event_id, reserved)
+                    return jsonify({"error": "Invalid value type"}), 400
+
+                if amount_cents != charge.cents:
+                    logger.warning("Invalid value on webhook", extra={"charge_id": charge.id, "got": amount_cents, "expected": charge.cents})
+                    await _release_event(event_id, reserved)
+                    return jsonify({"error": "Invalid value"}), 400
+
+                try:
+                    row = await transition_where_async(session, ChargeState.PAID, Charge.id == charge.id)
+                except Exception:
+                    logger.exception("Failed to commit payment for charge", extra={"charge_id": charge.id})
+                    await _release_event(event_id, reserved)
+                    return jsonify({"error": "Internal server error"}), 500
+
+                if row is None:
+                    logger.warning("Ignored webhook for non-pending charge", extra={"charge_id": charge.id})
+                    await _release_event(event_id, reserved)
+                    return jsonify({"message": "Charge already processed"}), 200
+
+        reserved = False
+        snapshot = charge_snapshot(row)
+        terminal_cache.put(snapshot)
+
+        try:
+            await write_through_async(redis_client, charge_response(snapshot))
+        except Exception:
+            logger.exception("Failed to write charge cache", extra={"charge_id": row.id})
+
+        logger.info(
+            "Payment confirmed via webhook",
+            extra={"charge_id": row.id, "external_id": external_id}
+        )
+
+        return jsonify({"message": "Payment confirmed"}), 200
+
+    except Exception:
+        logger.exception("Unhandled error processing PIX webhook")
+        await _release_event(event_id, reserved)
+        return jsonify({"error": "Internal server error"}), 500
+
+
+@webhooks_bp.route("/webhooks/pix/batch", methods=["POST"])
+@require_webhook_signature
+@idempotent(ttl=300)
+async def pix_webhook_batch():
+    try:
+        events = parse_batch_body(await request.get_data(), request.headers.get("Content-Encoding"))
+    except InvalidWebhookBatch as e:
+        return jsonify({"error": str(e)}), e.status
+
+    results, accepted = validate_events(events)
+    if not accepted:
+        return jsonify(summary(results)), 200
+
+    stream_mode = current_app.config.get("WEBHOOK_INGESTION_MODE") == "stream"
+    dedupe = event_dedupe_for(current_app)
+
+    try:
+        if stream_mode:
+            gates = await enqueue_webhook_events_async(
+                redis_client,
+                [data for _, data in accepted],
+                current_app.config.get("WEBHOOK_STREAM_MAXLEN", DEFAULT_STREAM_MAXLEN),
+                dedupe=dedupe,
+            )
+        else:
+            gates = await reserve_webhook_events_async(
+                redis_client, [(data["event_id"], data["external_id"]) for _, data in accepted], dedupe=dedupe
+            )
+    except Exception:
+        logger.exception("Redis webhook gate failed for batch", extra={"events": len(events)})
+        return jsonify({"error": "Service unavailable"}), 503
+
+    if stream_mode:
+        return jsonify(summary(stream_results(results, accepted, gates))), 200
+
+    terminal_cache = terminal_cache_for(current_app)
+
+    try:
+        async with SessionLocal() as session:
+            external_ids = {data["external_id"] for _, data in accepted}
+            charges = {
+                charge.external_id: charge
+                for charge in (
+                    await session.execute(select(Charge).where(Charge.external_id.in_(external_ids)))
+                ).scalars()
+            }
+
+            release, candidates = decide_batch(results, accepted, gates, charges, terminal_cache)
+
+            confirmed = []
+            if candidates:
+                try:
+                    rows = await transition_rows_where_async(
+                        session, ChargeState.PAID, Charge.id.in_(candidate_ids(candidates))
+                    )
+                except Exception:
+                    logger.exception("Failed to commit webhook batch", extra={"events": len(candidates)})
+                    fail_candidates(results, candidates, release)
+                else:
+                    confirmed = settle_batch(results, candidates, rows, release)
+    except Exception:
+        logger.exception("Unhandled error processing PIX webhook batch")
+        for (_, data), gate in zip(accepted, gates):
+            await _release_event(data["event_id"], gate == GateResult.RESERVED)
+        return jsonify({"error": "Internal server error"}), 500
+
+    try:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            if queue_finish(pipe, release, confirmed, terminal_cache, dedupe):
+                await pipe.execute()
+    except Exception:
+        logger.exception("Failed to release reservations / write cache for webhook batch")
+
+    body = summary(results)
+    logger.info(
+        "Webhook batch processed",
+        extra={"events": len(events), "confirmed": body["confirmed"]}
+    )
+    return jsonify(body), 200
@@ -0,0 +1,136 @@
+import asyncio
+import time
+from functools import wraps
+
+from quart import request, jsonify, make_response, current_app
+
+from aio.redis_client import redis_client
+from audit.logger import logger
+from infrastructure.redis_lock import release_lock_async
+from security.auth import api_key_error
+from security.idempotency import (
+    DEFAULT_LOCK_TTL_SECONDS,
+    DEFAULT_WAIT_SECONDS,
+    STORE_RESPONSE_SCRIPT,
+    WAIT_POLL_SECONDS,
+    conflict_response,
+    decode_response,
+    encode_response,
+    idempotency_key,
+    is_in_progress,
+    new_marker,
+    should_store,
+)
+from infrastructure.metrics import observe_signature_match
+from security.webhook_signature import secret_label, signature_match, webhook_secrets
+
+_store_script = None
+
+
+def require_api_key(f):
+    """
+    asyncio counterpart of security.auth.require_api_key.
+    """
+
+    @wraps(f)
+    async def decorated(*args, **kwargs):
+        error = api_key_error(request.headers.get("Authorization"), current_app.config.get("EXTERNAL_API_KEY"))
+        if error:
+            return jsonify({"error": error[0]}), error[1]
+        return await f(*args, **kwargs)
+
+    return decorated
+
+
+def require_webhook_signature(f):
+    """
+    asyncio counterpart of security.webhook_signature.require_webhook_signature.
+    The body is awaited without blocking the event loop; the HMAC check itself is shared.
+    """
+
+    @wraps(f)
+    async def decorated(*args, **kwargs):
+        payload = await request.get_data()
+        index = signature_match(
+            request.headers.get("X-Signature"),
+            request.headers.get("X-Timestamp"),
+            payload,
+            webhook_secrets(current_app.config),
+        )
+        if index is None:
+            return jsonify({"error": "Invalid webhook signature"}), 401
+        observe_signature_match(secret_label(index))
+        return await f(*args, **kwargs)
+
+    return decorated
+
+
+def idempotent(ttl=300, wait=DEFAULT_WAIT_SECONDS, lock_ttl=DEFAULT_LOCK_TTL_SECONDS):
+    """
+    asyncio counterpart of security.idempotency.idempotent (same keys, same contract).
+    Concurrent duplicates wait with asyncio.sleep, without blocking the event loop.
+    """
+    def decorator(f):
+        @wraps(f)
+        async def wrapper(*args, **kwargs):
+            key = request.headers.get("Idempotency-Key")
+
+            if not key:
+                return jsonify({"error": "Idempotency-Key missing"}), 400
+
+            redis_key = idempotency_key(key)
+            marker = new_marker()
+            deadline = time.monotonic() + wait
+
+            while not await redis_client.set(redis_key, marker, nx=True, ex=lock_ttl):
+                cached = await redis_client.get(redis_key)
+                if cached is not None and not is_in_progress(cached):
+                    return await _replay(cached)
+                if cached is None:
+                    continue
+                if time.monotonic() >= deadline:
+                    body, status, headers = conflict_response()
+                    return jsonify(body), status, headers
+                await asyncio.sleep(WAIT_POLL_SECONDS)
+
+            try:
+                response = await make_response(await f(*args, **kwargs))
+            except Exception:
+                await _release(redis_key, marker)
+                raise
+
+            if should_store(response.status_code):
+                await _store(redis_key, marker, response, ttl)
+            else:
+                await _release(redis_key, marker)
+
+            return response
+
+        return wrapper
+    return decorator
+
+
+async def _replay(raw):
+    status, headers, body = decode_response(raw)
+    response = await make_response(body, status)
+    response.headers.update(headers)
+    response.headers["Idempotent-Replayed"] = "true"
+    return response
+
+
+async def _store(redis_key, marker, response, ttl):
+    global _store_script
+    if _store_script is None:
+        _store_script = redis_client.register_script(STORE_RESPONSE_SCRIPT)
+    encoded = encode_response(response.status_code, response.headers, await response.get_data(as_text=True))
+    try:
+        await _store_script(keys=[redis_key], args=[marker, encoded, ttl], client=redis_client)
+    except Exception:
+        logger.exception("Failed to store idempotent response", extra={"idempotency_key": redis_key})
+
+
+async def _release(redis_key, marker):
+    try:
+        await release_lock_async(redis_client, redis_key, marker)
+    except Exception:
+        logger.exception("Failed to release idempotency key", extra={"idempotency_key": redis_key})
@@ -1,80 +1,180 @@
-from flask import Flask, jsonify, g
-from dotenv import load_dotenv
-from routes.health import health_bp
-import os
-
-from repository.database import db
-from extensions import limiter
-from routes.charges import charges_bp
+from flask import Flask, jsonify, g, request
+import time
+
 from exceptions.charge_exceptions import (
     ChargeNotPayable,
+    ChargeTemporarilyUnavailable,
     InvalidChargeValue
 )
-from routes.webhooks import webhooks_bp
-from audit.request_context import init_request_id, REQUEST_ID_HEADER
-
-# Load environment variables from .env for local development
-load_dotenv()
-
-app = Flask(__name__)
-
-# Register webhook routes early to ensure proper request handling
-app.register_blueprint(webhooks_bp)
-
-# Register health check routes
-app.register_blueprint(health_bp)
-
-# Database configuration
-# Use an absolute path for SQLite to avoid issues with different
-# working directories (CLI, Docker, gunicorn, etc.).
-BASE_DIR = os.path.abspath(os.path.dirname(__file__))
-DB_PATH = os.path.join(BASE_DIR, "instance", "database.db")
-
-# Ensure instance directory exists before SQLite initialization
-os.makedirs("/app/instance", exist_ok=True)
-
-app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:////app/instance/database.db"
 
-# Security-related configuration
-app.config["EXTERNAL_API_KEY"] = os.getenv("EXTERNAL_API_KEY")
-app.config["WEBHOOK_SECRET"] = os.getenv("WEBHOOK_SECRET")
 
-# Fail fast if critical security config is missing
-if not app.config["WEBHOOK_SECRET"]:
-    raise RuntimeError("WEBHOOK_SECRET not configured")
-
-# MIDDLEWARES (OBSERVABILITY)
-# Initialize request correlation ID at the beginning of each request
-@app.before_request
-def _before_request():
-    init_request_id()
-
-# Propagate request_id back to the caller for cross-service tracing
-@app.after_request
-def _after_request(response):
-    response.headers[REQUEST_ID_HEADER] = g.request_id
-    return response
+def create_app(config=None) -> Flask:
+    """
+    Builds the Payment Charges API (WSGI).
+
+    Settings come from the environment (config.load_config; .env is loaded
+    first unless `config` is given). Keys in `config` override them, and
+    config["REDIS_CLIENT"] replaces the Redis client of this app (tests).
+
+    Importing this module has no side effects: directories, log handlers,
+    database engines, Redis and rate limit clients and the expiry sweeper are
+    all created here, and the Redis client only on first use. Optional parts
+    (profiling) are not even imported unless enabled.
+    """
+    from repository.database import db
+    from repository.engine import engine_options, ensure_sqlite_dir, install_sqlite_pragmas
+    from extensions import limiter, storage_config
+    from routes.health import health_bp
+    from routes.charges import charges_bp
+    from routes.webhooks import webhooks_bp
+    from audit.logger import configure_audit_log
+    from audit.request_context import init_request_id, REQUEST_ID_HEADER
+    from infrastructure.metrics import instrument_engine, observe_request
+
+    app = Flask(__name__)
+
+    if config is None:
+        # Load environment variables from .env for local development
+        from dotenv import load_dotenv
+
+        load_dotenv()
+        config = {}
+
+    from config import load_config
+
+    app.config.update(load_config())
+    app.config.update({key: value for key, value in config.items() if key != "REDIS_CLIENT"})
+    if config.get("REDIS_CLIENT") is not None:
+        app.extensions["redis"] = config["REDIS_CLIENT"]
+
+    # Fail fast if critical security config is missing
+    if not app.config["WEBHOOK_SECRET"]:
+        raise RuntimeError("WEBHOOK_SECRET not configured")
+
+    if app.config["PROFILING_ENABLED"] and not app.config["PROFILING_TOKEN"]:
+        raise RuntimeError("PROFILING_TOKEN not configured")
+
+    app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", engine_options(app.config["SQLALCHEMY_DATABASE_URI"]))
+    for key, value in storage_config(app.config).items():
+        app.config.setdefault(key, value)
+
+    # Ensure instance directory exists before SQLite initialization
+    ensure_sqlite_dir(app.config["SQLALCHEMY_DATABASE_URI"])
+    configure_audit_log(app.config)
+
+    # Register webhook routes early to ensure proper request handling
+    app.register_blueprint(webhooks_bp)
+
+    # Register health check routes
+    app.register_blueprint(health_bp)
+
+    # MIDDLEWARES (OBSERVABILITY)
+    # Initialize request correlation ID at the beginning of each request
+    @app.before_request
+    def _before_request():
+        g.request_started = time.perf_counter()
+        init_request_id()
+
+    # Propagate request_id back to the caller for cross-service tracing
+    @app.after_request
+    def _after_request(response):
+        response.headers[REQUEST_ID_HEADER] = g.request_id
+        # Latency histogram per blueprint route (exposed on /metrics)
+        observe_request(
+            request.method,
+            request.blueprint,
+            request.url_rule.rule if request.url_rule else None,
+            response.status_code,
+            time.perf_counter() - g.request_started,
+        )
+        return response
+
+    # INIT EXTENSIONS
+    db.init_app(app)
+    with app.app_context():
+        # WAL + busy_timeout + synchronous=NORMAL on every new SQLite connection
+        install_sqlite_pragmas(db.engine)
+        instrument_engine(db.engine)
+    limiter.init_app(app)
+
+    # REGISTER BLUEPRINTS
+    app.register_blueprint(charges_bp)
+
+    if app.config["PROFILING_ENABLED"]:
+        from infrastructure.profiling import install_profiling
+        from routes.ops import ops_bp
+
+        install_profiling(app)
+        app.register_blueprint(ops_bp)
+
+    # BACKGROUND WORKERS (a preloading server starts them in each worker instead)
+    if not app.config["DEFER_BACKGROUND_WORKERS"]:
+        start_background_workers(app)
+
+    # ERROR HANDLERS
+    @app.errorhandler(ChargeNotPayable)
+    def handle_not_payable(e):
+        return jsonify({"error": str(e)}), 400
+
+    @app.errorhandler(InvalidChargeValue)
+    def handle_invalid_value(e):
+        return jsonify({"error": str(e)}), 400
+
+    @app.errorhandler(ChargeTemporarilyUnavailable)
+    def handle_temporarily_unavailable(e):
+        return jsonify({"error": str(e)}), 503, {"Retry-After": "1"}
+
+    return app
+
+
+def start_background_workers(app) -> None:
+    """
+    Expiry sweeper and health monitor threads. Threads do not survive fork:
+    under gunicorn (preload_app) this runs in each worker, from reinit_after_fork().
+    """
+    from infrastructure.health_monitor import start_health_monitor
+    from infrastructure.redis_client import get_redis
+    from services.charge_expiry import start_expiry_sweeper
+
+    if app.config["EXPIRY_SWEEPER_ENABLED"]:
+        with app.app_context():
+            start_expiry_sweeper(app, get_redis())
+    start_health_monitor(app)
+
+
+def reinit_after_fork(app) -> None:
+    """
+    Runs in a worker right after it was forked from a process that already
+    built `app` (gunicorn.conf.py, post_fork). Connections opened by the parent
+    are dropped, not closed (the sockets are still the parent's), so no two
+    processes ever share one; pools reconnect on first use.
+    """
+    from infrastructure.redis_client import reset_after_fork
+    from repository.database import db
 
-# INIT EXTENSIONS
-db.init_app(app)
-limiter.init_app(app)
+    with app.app_context():
+        db.engine.dispose(close=False)
+    reset_after_fork(app)
+    start_background_workers(app)
 
-# REGISTER BLUEPRINTS
-app.register_blueprint(charges_bp)
 
-# ERROR HANDLERS
-@app.errorhandler(ChargeNotPayable)
-def handle_not_payable(e):
-    return jsonify({"error": str(e)}), 400
+def init_schema(app) -> None:
+    """
+    Creates missing tables and applies the additive migrations. Run once per
+    deploy: by the dev server below, or by the gunicorn master before forking.
+    """
+    from repository.database import db, migrate_schema
 
-@app.errorhandler(InvalidChargeValue)
-def handle_invalid_value(e):
-    return jsonify({"error": str(e)}), 400
+    with app.app_context():
+        db.create_all()
+        with db.engine.begin() as conn:
+            migrate_schema(conn)
 
 
-# ENTRYPOINT
+# ENTRYPOINT (development server; production: gunicorn -c gunicorn.conf.py)
 if __name__ == "__main__":
-    with app.app_context():
-        db.create_all()
-    app.run(host="0.0.0.0", port=5000, debug=True)
+    import os
 
+    app = create_app()
+    init_schema(app)
+    app.run(host="0.0.0.0", port=int(os.getenv("PORT", "5000")), debug=True)
@@ -0,0 +1,14 @@
+"""
+ASGI entrypoint for the asyncio serving mode.
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5000
+"""
+from aio.app import create_app
+
+app = create_app()
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host="0.0.0.0", port=5000)
@@ -1,36 +1,249 @@
+import atexit
+import copy
+import json
 import logging
-from logging.handlers import RotatingFileHandler
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 import os
 from audit.request_context import get_request_id
 
 LOG_DIR = "logs"
 LOG_FILE = "audit.log"
 
-os.makedirs(LOG_DIR, exist_ok=True)
+# Settings read by configure_audit_log() (app config keys, env var defaults):
+# AUDIT_LOG_MODE    "sync": records are formatted and written by the calling (request) thread.
+#                   "queue": the caller only enqueues; a listener thread formats and writes.
+# AUDIT_LOG_FORMAT  "text": "asctime | level | request_id=... | message | key=value ...";
+#                   "json": one JSON object per line
+# AUDIT_LOG_FLUSH_RECORDS / AUDIT_LOG_FLUSH_INTERVAL_SECONDS
+#                   buffered writes: flush after this many records or seconds (ERROR and
+#                   above are flushed right away). The defaults flush every record, as before.
+DEFAULTS = {
+    "AUDIT_LOG_MODE": "sync",
+    "AUDIT_LOG_FORMAT": "text",
+    "AUDIT_LOG_FLUSH_RECORDS": 1,
+    "AUDIT_LOG_FLUSH_INTERVAL_SECONDS": 0.0,
+}
+WRITE_BUFFER_BYTES = 64 * 1024
+
+# Attributes every LogRecord has; anything else came in through `extra`.
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id", "taskName"}
+
+
+def record_fields(record) -> dict:
+    return {key: value for key, value in vars(record).items() if key not in _RECORD_ATTRS}
+
+
+class TextFormatter(logging.Formatter):
+    """
+    The original line layout, with the structured fields appended as key=value.
+    """
+
+    def formatMessage(self, record):
+        line = super().formatMessage(record)
+        fields = record_fields(record)
+        if fields:
+            line += " | " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return line
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """
+    One JSON object per line: timestamp, level, request_id, message and the
+    `extra` fields as top-level keys.
+    """
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", None),
+            "message": record.getMessage(),
+            **record_fields(record),
+        }
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class BufferedRotatingFileHandler(RotatingFileHandler):
+    """
+    RotatingFileHandler that flushes every `flush_records` records or
+    `flush_interval` seconds instead of after each record. Records at
+    `flush_level` or above are flushed immediately; a daemon thread flushes
+    what is left when the log goes quiet.
+    """
+
+    def __init__(self, filename, flush_records=1, flush_interval=0.0, flush_level=logging.ERROR, **kwargs):
+        super().__init__(filename, **kwargs)
+        self.flush_records = flush_records
+        self.flush_interval = flush_interval
+        self.flush_level = flush_level
+        self._unflushed = 0
+        self._last_flush = time.monotonic()
+        self._flusher = None
+
+    def _open(self):
+        stream = open(self.baseFilename, self.mode, buffering=WRITE_BUFFER_BYTES, encoding=self.encoding, errors=self.errors)
+        self._size = os.path.getsize(self.baseFilename)
+        return stream
+
+    def emit(self, record):
+        try:
+            line = self.format(record) + self.terminator
+            if self.stream is None:
+                self.stream = self._open()
+            # Size tracked here, in bytes: the default shouldRollover() seeks
+            # the stream, which flushes the buffer on every record
+            size = len(line.encode(self.encoding or "utf-8"))
+            if self.maxBytes > 0 and self._size + size >= self.maxBytes:
+                self.doRollover()
+                if self.stream is None:
+                    self.stream = self._open()
+            self.stream.write(line)
+            self._size += size
+            self._unflushed += 1
+            if (
+                self._unflushed >= self.flush_records
+                or record.levelno >= self.flush_level
+                or (self.flush_interval and time.monotonic() - self._last_flush >= self.flush_interval)
+            ):
+                self.flush()
+            else:
+                self._ensure_flusher()
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        super().flush()
+        self._unflushed = 0
+        self._last_flush = time.monotonic()
+
+    def _ensure_flusher(self):
+        # Threads do not survive fork: started lazily, in each process
+        if self._flusher is None or not self._flusher.is_alive():
+            self._flusher = threading.Thread(target=self._flush_periodically, name="audit-log-flush", daemon=True)
+            self._flusher.start()
+
+    def _flush_periodically(self):
+        while True:
+            time.sleep(self.flush_interval or 1.0)
+            with self.lock:
+                if self._unflushed:
+                    self.flush()
+
+
+class LazyQueueHandler(QueueHandler):
+    """
+    In-process QueueHandler: the request thread only interpolates the message
+    (when it has args) and enqueues. Formatting, traceback rendering, JSON
+    encoding and file I/O happen on the listener thread.
+    """
+
+    def prepare(self, record):
+        # Nothing is pickled, so exc_info can travel as is (the default
+        # prepare() formats the whole record here, on the caller's thread)
+        record = copy.copy(record)
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
 
 _base_logger = logging.getLogger("audit_logger")
 _base_logger.setLevel(logging.INFO)
+_listener = None
+
 
-# Avoid duplicated handlers if Flask reloads in debug mode
-if not _base_logger.handlers:
-    handler = RotatingFileHandler(
+def _file_handler(settings):
+    os.makedirs(LOG_DIR, exist_ok=True)
+    handler = BufferedRotatingFileHandler(
         filename=os.path.join(LOG_DIR, LOG_FILE),
         maxBytes=5_000_000,  # 5MB
-        backupCount=3
+        backupCount=3,
+        flush_records=int(settings["AUDIT_LOG_FLUSH_RECORDS"]),
+        flush_interval=float(settings["AUDIT_LOG_FLUSH_INTERVAL_SECONDS"]),
     )
+    if settings["AUDIT_LOG_FORMAT"] == "json":
+        handler.setFormatter(JsonLinesFormatter())
+    else:
+        handler.setFormatter(TextFormatter(
+            "%(asctime)s | %(levelname)s | request_id=%(request_id)s | %(message)s"
+        ))
+    return handler
+
+
+def _start_listener(queue_handler, file_handler):
+    global _listener
+    queue_handler.queue = queue.SimpleQueue()
+    _listener = QueueListener(queue_handler.queue, file_handler, respect_handler_level=True)
+    _listener.start()
 
-    formatter = logging.Formatter(
-        "%(asctime)s | %(levelname)s | request_id=%(request_id)s | %(message)s"
-    )
 
-    handler.setFormatter(formatter)
-    _base_logger.addHandler(handler)
+def stop_listener():
+    """
+    Drains the queue and flushes the file (registered with atexit).
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    for handler in _base_logger.handlers:
+        handler.flush()
+
+
+def flush_audit_log() -> None:
+    """
+    Writes out buffered records. Called before fork (gunicorn pre_fork): a
+    child would otherwise inherit, and write again, the parent's buffer.
+    """
+    for handler in _base_logger.handlers:
+        handler.flush()
+
+
+def configure_audit_log(config=None) -> None:
+    """
+    Attaches the audit file handler (logs/audit.log), once per process; called
+    by create_app(). `config` is a mapping with the AUDIT_LOG_* keys (missing
+    ones come from the environment, then DEFAULTS). Until then nothing is
+    created on disk and records go to the standard logging fallbacks.
+    """
+    # Avoid duplicated handlers if Flask reloads in debug mode (or several apps are built)
+    if _base_logger.handlers:
+        return
+
+    config = config or {}
+    settings = {key: config.get(key, os.getenv(key, default)) for key, default in DEFAULTS.items()}
+    file_handler = _file_handler(settings)
+
+    if settings["AUDIT_LOG_MODE"] == "queue":
+        queue_handler = LazyQueueHandler(queue.SimpleQueue())
+        _base_logger.addHandler(queue_handler)
+        _start_listener(queue_handler, file_handler)
+        # The listener thread does not survive fork (gunicorn workers): each
+        # child gets a fresh queue and its own listener
+        os.register_at_fork(after_in_child=lambda: _start_listener(queue_handler, file_handler))
+        atexit.register(stop_listener)
+    else:
+        _base_logger.addHandler(file_handler)
+        atexit.register(file_handler.flush)
 
 
 class RequestIdAdapter(logging.LoggerAdapter):
     """
     Injects request_id into log records automatically.
     Works for all logs emitted during a Flask request.
+
+    Pass values as structured fields, not interpolated into the message:
+        logger.info("Charge not found", extra={"external_id": external_id})
     """
     def process(self, msg, kwargs):
         extra = kwargs.get("extra", {})
@@ -40,4 +253,3 @@ class RequestIdAdapter(logging.LoggerAdapter):
 
 
 logger = RequestIdAdapter(_base_logger, {})
-
@@ -1,10 +1,17 @@
 import uuid
-from flask import g, request
+from contextvars import ContextVar
+from flask import g, request, has_app_context
 
 REQUEST_ID_HEADER = "X-Request-Id"
 
+# Used by the asyncio (ASGI) mode, where Flask's `g` is not available.
+# Each asyncio task runs in its own context, so ids never leak between requests.
+_request_id_var: ContextVar = ContextVar("request_id", default=None)
+
 def get_request_id() -> str:
-    return getattr(g, "request_id", None) or "unknown"
+    if has_app_context():
+        return getattr(g, "request_id", None) or "unknown"
+    return _request_id_var.get() or "unknown"
 
 def init_request_id():
     rid = request.headers.get(REQUEST_ID_HEADER)
@@ -12,3 +19,11 @@ def init_request_id():
         rid = str(uuid.uuid4())
     g.request_id = rid
     return rid
+
+def set_request_id(rid=None) -> str:
+    """
+    Framework-agnostic variant of init_request_id() for the ASGI mode.
+    """
+    rid = rid or str(uuid.uuid4())
+    _request_id_var.set(rid)
+    return rid
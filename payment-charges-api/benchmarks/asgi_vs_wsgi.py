@@ -0,0 +1,188 @@
+"""
+Throughput/latency comparison between serving modes:
+
+    wsgi      create_app() on the threaded Flask server, one process
+    asgi      asgi.py under uvicorn (asyncio mode)
+    dev       `python app.py`, the development entry point (debug server)
+    gunicorn  gunicorn -c gunicorn.conf.py (preloaded, multi-process; GUNICORN_* env)
+
+Requires a reachable Redis (REDIS_URL, default redis://localhost:6379/0), e.g.
+`docker compose up redis`, or --redis-standin to use benchmarks/redis_standin.py.
+Both modes share the same SQLite file and Redis keys.
+
+    python -m benchmarks.asgi_vs_wsgi --concurrency 10 100 500 --requests 2000
+    python -m benchmarks.asgi_vs_wsgi --modes dev gunicorn --redis-standin
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import hashlib
+import hmac
+import urllib.request
+
+from benchmarks.loadgen import json_request, run_load
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WEBHOOK_SECRET = "benchmark-secret"
+
+WSGI_SERVER = """
+import sys
+from app import create_app
+from repository.database import db
+app = create_app()
+with app.app_context():
+    db.create_all()
+app.run(host="127.0.0.1", port=int(sys.argv[1]), threaded=True)
+"""
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_ready(base_url, timeout=20, path="/health"):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f"{base_url}{path}", timeout=1) as resp:
+                if resp.status == 200:
+                    return
+        except Exception:
+            time.sleep(0.2)
+    raise RuntimeError(f"server at {base_url} did not become ready")
+
+
+def _start(mode, port, env):
+    if mode == "wsgi":
+        cmd = [sys.executable, "-c", WSGI_SERVER, str(port)]
+    elif mode == "dev":
+        cmd = [sys.executable, "app.py"]
+    elif mode == "gunicorn":
+        cmd = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py"]
+    else:
+        cmd = [sys.executable, "-m", "uvicorn", "asgi:app", "--host", "127.0.0.1",
+               "--port", str(port), "--log-level", "warning"]
+    # Own process group: the debug reloader and gunicorn workers are stopped with it
+    return subprocess.Popen(cmd, cwd=SERVICE_DIR, env={**env, "PORT": str(port)},
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
+
+
+def _stop(proc):
+    try:
+        os.killpg(proc.pid, signal.SIGTERM)
+    except ProcessLookupError:
+        return
+    try:
+        proc.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        os.killpg(proc.pid, signal.SIGKILL)
+        proc.wait()
+
+
+def _post_json(url, payload, headers=None):
+    body = json.dumps(payload, separators=(",", ":")).encode()
+    req = urllib.request.Request(url, data=body, method="POST",
+                                 headers={"Content-Type": "application/json", **(headers or {})})
+    with urllib.request.urlopen(req, timeout=10) as resp:
+        return json.loads(resp.read())
+
+
+def _signed_headers(body: bytes, idempotency_key: str):
+    digest = hmac.new(WEBHOOK_SECRET.encode(), body, hashlib.sha256).hexdigest()
+    return {
+        "X-Timestamp": str(int(time.time())),
+        "X-Signature": f"sha256={digest}",
+        "Idempotency-Key": idempotency_key,
+    }
+
+
+def _seed(base_url, count):
+    """
+    Creates `count` charges (batch endpoint) and pays the first one, which is then
+    used for the duplicate-webhook scenario (bank retries of an already applied event).
+    """
+    created = _post_json(f"{base_url}/payment/charges/batch",
+                         {"charges": [{"value": 10.0} for _ in range(count)]})
+    charges = [r for r in created["results"] if "id" in r]
+
+    event = {"event_id": "evt_bench_paid", "external_id": charges[0]["external_id"],
+             "value": 10.0, "status": "PAID"}
+    body = json.dumps(event, separators=(",", ":")).encode()
+    req = urllib.request.Request(f"{base_url}/webhooks/pix", data=body, method="POST",
+                                 headers={"Content-Type": "application/json",
+                                          **_signed_headers(body, f"seed-{time.time_ns()}")})
+    urllib.request.urlopen(req, timeout=10).read()
+    return charges, body
+
+
+def _scenarios(charges, duplicate_body):
+    ids = [c["id"] for c in charges]
+
+    def poll(i):
+        return json_request("GET", f"/payment/charges/{ids[i % len(ids)]}")
+
+    def duplicate_webhook(i):
+        headers = {"Content-Type": "application/json",
+                   **_signed_headers(duplicate_body, f"bench-{time.time_ns()}-{i}")}
+        return "POST", "/webhooks/pix", duplicate_body, headers
+
+    def health(i):
+        return json_request("GET", "/health")
+
+    return {"poll_charge": poll, "duplicate_webhook": duplicate_webhook, "health": health}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", default=["wsgi", "asgi"], choices=["wsgi", "asgi", "dev", "gunicorn"])
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[10, 100, 500])
+    parser.add_argument("--requests", type=int, default=2000, help="requests per scenario and concurrency level")
+    parser.add_argument("--charges", type=int, default=100)
+    parser.add_argument("--redis-standin", action="store_true",
+                        help="serve Redis from an in-process fakeredis stand-in")
+    parser.add_argument("--output", help="write results as JSON to this path")
+    args = parser.parse_args()
+
+    env = {**os.environ, "WEBHOOK_SECRET": WEBHOOK_SECRET}
+    env.setdefault("REDIS_URL", "redis://localhost:6379/0")
+
+    if args.redis_standin:
+        from benchmarks.redis_standin import start
+
+        _, env["REDIS_URL"] = start()
+
+    results = {}
+    for mode in args.modes:
+        port = _free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        proc = _start(mode, port, env)
+        try:
+            _wait_ready(base_url)
+            charges, duplicate_body = _seed(base_url, args.charges)
+            results[mode] = {}
+            for name, make_request in _scenarios(charges, duplicate_body).items():
+                for concurrency in args.concurrency:
+                    summary = asyncio.run(run_load(base_url, make_request,
+                                                   total=args.requests, concurrency=concurrency))
+                    results[mode][f"{name}@c{concurrency}"] = summary
+                    print(f"{mode:8} {name:18} c={concurrency:<4} "
+                          f"rps={summary['throughput_rps']} p50={summary['p50_ms']}ms "
+                          f"p99={summary['p99_ms']}ms errors={summary['errors']}")
+        finally:
+            _stop(proc)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,308 @@
+"""
+End-to-end load test of the payment flow across both services:
+
+    create (POST /payment/charges)
+      -> register at the bank (POST /bank/pix/charges)
+      -> pay (POST /bank/pix/pay: the bank delivers the signed webhook inline)
+      -> PAID visible (GET /payment/charges/<id> polled until status == PAID)
+
+Starts the payment API (WSGI) and the fake bank on free ports, with a fresh
+SQLite file and Redis from REDIS_URL (or --redis-standin). Reports throughput
+and p50/p95/p99 per stage, plus the server-side latency of /webhooks/pix read
+from the API's /metrics histogram, and saves everything as JSON.
+
+    python -m benchmarks.e2e_flow --charges 500 --pay-rate 50 --concurrency 20 \\
+        --redis-standin --output results/e2e-baseline.json
+    python -m benchmarks.e2e_flow ... --compare results/e2e-baseline.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from prometheus_client.parser import text_string_to_metric_families
+
+from benchmarks.asgi_vs_wsgi import SERVICE_DIR, _free_port, _wait_ready
+from benchmarks.loadgen import _Connection, json_request, run_load, summarize
+
+BANK_DIR = os.path.join(os.path.dirname(SERVICE_DIR), "fake-bank-service")
+WEBHOOK_SECRET = "benchmark-secret"
+CHARGE_VALUE = 10.0
+
+API_SERVER = """
+import sys
+from app import create_app
+from repository.database import db, migrate_schema
+# POST /payment/charges allows 10/min per client: the load test measures the
+# service, not the limiter (--keep-rate-limit to measure both)
+app = create_app({"RATELIMIT_ENABLED": sys.argv[2] == "1"})
+with app.app_context():
+    db.create_all()
+    with db.engine.begin() as conn:
+        migrate_schema(conn)
+app.run(host="127.0.0.1", port=int(sys.argv[1]), threaded=True)
+"""
+
+BANK_SERVER = """
+import sys
+from app import app
+app.run(host="127.0.0.1", port=int(sys.argv[1]), threaded=True)
+"""
+
+# Stages compared by --compare
+COMPARED_FIELDS = ("throughput_rps", "p50_ms", "p95_ms", "p99_ms")
+
+
+def _start(script, cwd, port, env, *args):
+    return subprocess.Popen(
+        [sys.executable, "-c", script, str(port), *args],
+        cwd=cwd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+
+def webhook_latency(exposition, route="/webhooks/pix", method="POST"):
+    """
+    p50/p95/p99 (ms) of `route` from http_request_duration_seconds, summed over
+    status codes. Histogram quantiles: each one is the upper bound of the bucket
+    it falls in, so they are only as precise as the buckets.
+    """
+    buckets = {}
+    for family in text_string_to_metric_families(exposition):
+        if family.name != "http_request_duration_seconds":
+            continue
+        for sample in family.samples:
+            labels = sample.labels
+            if sample.name.endswith("_bucket") and labels.get("route") == route and labels.get("method") == method:
+                bound = float(labels["le"])
+                buckets[bound] = buckets.get(bound, 0) + sample.value
+
+    total = buckets.get(float("inf"), 0)
+    if not total:
+        return {"requests": 0}
+
+    def quantile(q):
+        for bound in sorted(buckets):
+            if buckets[bound] >= q * total:
+                return None if bound == float("inf") else round(bound * 1000, 3)
+
+    return {
+        "requests": int(total),
+        "p50_ms_le": quantile(0.50),
+        "p95_ms_le": quantile(0.95),
+        "p99_ms_le": quantile(0.99),
+    }
+
+
+def _diff_exposition(after, before):
+    # Histograms are cumulative since the API started: keep only this run's share
+    previous = {}
+    for family in text_string_to_metric_families(before):
+        for sample in family.samples:
+            previous[(sample.name, tuple(sorted(sample.labels.items())))] = sample.value
+
+    lines = []
+    for family in text_string_to_metric_families(after):
+        if family.name != "http_request_duration_seconds":
+            continue
+        lines.append(f"# TYPE {family.name} histogram")
+        for sample in family.samples:
+            key = (sample.name, tuple(sorted(sample.labels.items())))
+            labels = ",".join(f'{name}="{value}"' for name, value in sample.labels.items())
+            lines.append(f"{sample.name}{{{labels}}} {sample.value - previous.get(key, 0)}")
+    return "\n".join(lines) + "\n"
+
+
+def _scrape(base_url):
+    import urllib.request
+
+    with urllib.request.urlopen(f"{base_url}/metrics", timeout=10) as resp:
+        return resp.read().decode()
+
+
+async def _create_charges(api_url, count, concurrency):
+    charges = [None] * count
+
+    def on_response(i, status, payload, _started):
+        if status == 201:
+            charges[i] = json.loads(payload)
+
+    summary = await run_load(
+        api_url,
+        lambda i: json_request("POST", "/payment/charges", {"value": CHARGE_VALUE}),
+        total=count, concurrency=concurrency, expect=(201,), on_response=on_response,
+    )
+    return summary, [charge for charge in charges if charge]
+
+
+async def _register_at_bank(bank_url, api_url, charges, concurrency):
+    webhook_url = f"{api_url}/webhooks/pix"
+    return await run_load(
+        bank_url,
+        lambda i: json_request("POST", "/bank/pix/charges", {
+            "external_id": charges[i]["external_id"],
+            "value": CHARGE_VALUE,
+            "webhook_url": webhook_url,
+        }),
+        total=len(charges), concurrency=concurrency, expect=(201,),
+    )
+
+
+async def _pay_and_watch(bank_url, api_url, charges, *, rate, concurrency, pollers, poll_interval, visible_timeout):
+    """
+    Pays every charge through the bank at `rate` and, concurrently, polls the
+    API until each paid charge reads PAID. Returns (pay summary, visibility summary).
+    """
+    from urllib.parse import urlsplit
+
+    paid = asyncio.Queue()
+    visible, timed_out = [], 0
+
+    def on_response(i, status, _payload, started):
+        if status == 200:
+            paid.put_nowait((charges[i]["id"], started))
+
+    async def poller():
+        nonlocal timed_out
+        parts = urlsplit(api_url)
+        conn = _Connection(parts.hostname, parts.port)
+        try:
+            while True:
+                item = await paid.get()
+                if item is None:
+                    return
+                charge_id, started = item
+                deadline = started + visible_timeout
+                while True:
+                    status, payload = await conn.request("GET", f"/payment/charges/{charge_id}")
+                    if status == 200 and json.loads(payload).get("status") == "PAID":
+                        visible.append(time.perf_counter() - started)
+                        break
+                    if time.perf_counter() > deadline:
+                        timed_out += 1
+                        break
+                    await asyncio.sleep(poll_interval)
+        finally:
+            await conn.close()
+
+    watchers = [asyncio.create_task(poller()) for _ in range(pollers)]
+    started = time.perf_counter()
+    pay = await run_load(
+        bank_url,
+        lambda i: json_request("POST", "/bank/pix/pay", {"external_id": charges[i]["external_id"]}),
+        total=len(charges), concurrency=concurrency, rate=rate, on_response=on_response,
+    )
+    for _ in watchers:
+        paid.put_nowait(None)
+    await asyncio.gather(*watchers)
+    return pay, summarize(visible, timed_out, time.perf_counter() - started, {"timeout": timed_out} if timed_out else {})
+
+
+def compare(current, baseline):
+    """
+    Relative change (%) of COMPARED_FIELDS per stage: current vs baseline.
+    """
+    changes = {}
+    for stage, summary in current["stages"].items():
+        before = baseline.get("stages", {}).get(stage, {})
+        for field in COMPARED_FIELDS:
+            if summary.get(field) is not None and before.get(field):
+                changes[f"{stage}.{field}"] = round((summary[field] - before[field]) / before[field] * 100, 1)
+    return changes
+
+
+def run(args):
+    env = {**os.environ, "WEBHOOK_SECRET": WEBHOOK_SECRET, **dict(item.split("=", 1) for item in args.env)}
+    env.setdefault("REDIS_URL", "redis://localhost:6379/0")
+    if args.redis_standin:
+        from benchmarks.redis_standin import start
+
+        _, env["REDIS_URL"] = start()
+
+    workdir = tempfile.mkdtemp(prefix="e2e-flow-")
+    api_env = {**env, "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'payments.db')}"}
+    api_port, bank_port = _free_port(), _free_port()
+    api_url, bank_url = f"http://127.0.0.1:{api_port}", f"http://127.0.0.1:{bank_port}"
+
+    processes = [
+        _start(API_SERVER, SERVICE_DIR, api_port, api_env, "1" if args.keep_rate_limit else "0"),
+        # The bank writes its DLQ under the working directory: keep it out of the repo
+        _start(BANK_SERVER, workdir, bank_port, {**env, "PYTHONPATH": BANK_DIR}),
+    ]
+    try:
+        _wait_ready(api_url)
+        _wait_ready(bank_url, path="/bank/dlq/dlq")
+        metrics_before = _scrape(api_url)
+
+        async def flow():
+            create, charges = await _create_charges(api_url, args.charges, args.concurrency)
+            register = await _register_at_bank(bank_url, api_url, charges, args.concurrency)
+            pay, visible = await _pay_and_watch(
+                bank_url, api_url, charges,
+                rate=args.pay_rate, concurrency=args.concurrency, pollers=args.pollers,
+                poll_interval=args.poll_interval_ms / 1000, visible_timeout=args.visible_timeout,
+            )
+            return {"create": create, "bank_register": register, "pay": pay, "pay_to_paid_visible": visible}
+
+        stages = asyncio.run(flow())
+        stages["webhook_server"] = webhook_latency(_diff_exposition(_scrape(api_url), metrics_before))
+    finally:
+        for proc in processes:
+            proc.terminate()
+            proc.wait(timeout=10)
+
+    return {
+        "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "config": {
+            "charges": args.charges,
+            "pay_rate": args.pay_rate,
+            "concurrency": args.concurrency,
+            "pollers": args.pollers,
+            "poll_interval_ms": args.poll_interval_ms,
+            "redis": "standin" if args.redis_standin else "external",
+            "env": args.env,
+            "python": platform.python_version(),
+        },
+        "stages": stages,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--charges", type=int, default=500, help="charges created and paid")
+    parser.add_argument("--pay-rate", type=float, default=None, help="payments per second (default: as fast as possible)")
+    parser.add_argument("--concurrency", type=int, default=20, help="open connections per stage")
+    parser.add_argument("--pollers", type=int, default=10, help="connections polling for PAID")
+    parser.add_argument("--poll-interval-ms", type=float, default=10)
+    parser.add_argument("--visible-timeout", type=float, default=30, help="seconds to wait for PAID after a pay")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="extra API environment")
+    parser.add_argument("--keep-rate-limit", action="store_true")
+    parser.add_argument("--redis-standin", action="store_true",
+                        help="serve Redis from an in-process fakeredis stand-in")
+    parser.add_argument("--output", help="write results as JSON to this path")
+    parser.add_argument("--compare", help="previous results JSON to compare with")
+    args = parser.parse_args()
+
+    results = run(args)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            results["compared_with"] = {"file": args.compare, "change_pct": compare(results, json.load(f))}
+
+    for stage, summary in results["stages"].items():
+        print(f"{stage:20} " + " ".join(f"{key}={value}" for key, value in summary.items() if key != "error_statuses"))
+    for key, change in results.get("compared_with", {}).get("change_pct", {}).items():
+        print(f"{key:32} {change:+.1f}%")
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Cold start of a WSGI worker: time to import the app module and build the app,
+measured in fresh interpreters, plus the modules that dominate it (from
+python -X importtime).
+
+    python -m benchmarks.import_time                      # 5 runs, top 25 modules
+    python -m benchmarks.import_time --output benchmarks/baselines/import_time.json
+    python -m benchmarks.import_time --statement "from app import create_app"
+
+No Redis or database server needed: the app is built with an in-memory SQLite
+database and the expiry sweeper off (nothing connects until the first request).
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+
+from benchmarks.asgi_vs_wsgi import SERVICE_DIR
+
+DEFAULT_STATEMENT = "from app import create_app; create_app()"
+
+TIMED = """
+import time
+started = time.perf_counter()
+{statement}
+print("TOTAL_MS", (time.perf_counter() - started) * 1000)
+"""
+
+
+def parse_importtime(stderr) -> list:
+    """
+    [(module, self_us, cumulative_us, depth)] from -X importtime output, in
+    import order. depth 0 = imported directly by the measured statement.
+    """
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        modules.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return modules
+
+
+def measure_once(statement, env) -> dict:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", TIMED.format(statement=statement)],
+        cwd=SERVICE_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    total_ms = next(float(line.split()[1]) for line in proc.stdout.splitlines() if line.startswith("TOTAL_MS"))
+    return {"total_ms": total_ms, "modules": parse_importtime(proc.stderr)}
+
+
+def report(runs, top=25) -> dict:
+    """
+    Median total and, per module, the median cumulative import time across
+    runs. Only top-level imports (depth 0) and their children (depth 1) are
+    ranked: deeper entries are already counted in their parents.
+    """
+    per_module = {}
+    for run in runs:
+        for name, _self_us, cumulative_us, depth in run["modules"]:
+            if depth <= 1:
+                per_module.setdefault(name, []).append(cumulative_us)
+
+    ranked = sorted(
+        ((name, statistics.median(values) / 1000) for name, values in per_module.items()),
+        key=lambda item: item[1],
+        reverse=True,
+    )
+    return {
+        "total_ms": {
+            "median": round(statistics.median(run["total_ms"] for run in runs), 1),
+            "min": round(min(run["total_ms"] for run in runs), 1),
+        },
+        "modules_imported": statistics.median(len(run["modules"]) for run in runs),
+        "top_modules_ms": {name: round(ms, 1) for name, ms in ranked[:top]},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument("--statement", default=DEFAULT_STATEMENT, help="code to time (default: build the app)")
+    parser.add_argument("--output", help="write the report as JSON to this path")
+    args = parser.parse_args()
+
+    env = {
+        **os.environ,
+        "WEBHOOK_SECRET": os.environ.get("WEBHOOK_SECRET", "import-time"),
+        "DATABASE_URL": "sqlite:///:memory:",
+        "EXPIRY_SWEEPER_ENABLED": "0",
+    }
+    runs = [measure_once(args.statement, env) for _ in range(args.runs)]
+    result = {
+        "statement": args.statement,
+        "runs": args.runs,
+        "python": platform.python_version(),
+        **report(runs, args.top),
+    }
+
+    print(f"{args.statement}: median {result['total_ms']['median']} ms, "
+          f"min {result['total_ms']['min']} ms, {result['modules_imported']:.0f} modules")
+    for name, ms in result["top_modules_ms"].items():
+        print(f"  {ms:>8.1f} ms  {name}")
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+            f.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Minimal asyncio HTTP/1.1 load generator (keep-alive, no third-party deps).
+
+Each virtual client owns one persistent connection and issues requests back to
+back, so `concurrency` is also the number of simultaneously open connections.
+With `rate`, requests are instead started on a fixed schedule (open loop).
+"""
+import asyncio
+import json
+import statistics
+import time
+from urllib.parse import urlsplit
+
+
+def percentile(samples, pct):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(latencies, errors, elapsed, error_statuses=None):
+    """
+    Latencies in seconds -> report in milliseconds.
+    """
+    ms = [lat * 1000 for lat in latencies]
+    return {
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "error_statuses": dict(error_statuses or {}),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else None,
+        "p50_ms": _round(percentile(ms, 50)),
+        "p95_ms": _round(percentile(ms, 95)),
+        "p99_ms": _round(percentile(ms, 99)),
+        "mean_ms": _round(statistics.fmean(ms)) if ms else None,
+    }
+
+
+def _round(value):
+    return None if value is None else round(value, 3)
+
+
+class _Connection:
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    async def request(self, method, path, body=b"", headers=None):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {self.host}:{self.port}", "Connection: keep-alive"]
+        for name, value in (headers or {}).items():
+            lines.append(f"{name}: {value}")
+        lines.append(f"Content-Length: {len(body)}")
+        self.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode() + body)
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError("connection closed by server")
+        status = int(status_line.split()[1])
+
+        length = 0
+        close = False
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.decode().partition(":")
+            name = name.strip().lower()
+            if name == "content-length":
+                length = int(value.strip())
+            elif name == "connection" and value.strip().lower() == "close":
+                close = True
+
+        payload = await self.reader.readexactly(length) if length else b""
+        if close:
+            await self.close()
+        return status, payload
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except Exception:
+                pass
+        self.reader = self.writer = None
+
+
+async def run_load(base_url, make_request, *, total, concurrency, expect=(200,), rate=None, on_response=None):
+    """
+    Fires `total` requests produced by `make_request(i) -> (method, path, body, headers)`
+    using `concurrency` persistent connections. Returns summarize(...) output.
+
+    rate: requests per second. Request i is due at start + i / rate and its
+      latency is measured from that instant, so time spent waiting for a free
+      connection counts (no coordinated omission).
+    on_response(i, status, payload, started): called for every response;
+      `started` is the perf_counter() instant the latency is measured from.
+    """
+    parts = urlsplit(base_url)
+    counter = iter(range(total))
+    latencies = []
+    errors = 0
+    error_statuses = {}
+
+    async def worker():
+        nonlocal errors
+        conn = _Connection(parts.hostname, parts.port)
+        try:
+            for i in counter:
+                method, path, body, headers = make_request(i)
+                if rate:
+                    due = load_started + i / rate
+                    delay = due - time.perf_counter()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                    started = due
+                else:
+                    started = time.perf_counter()
+                try:
+                    status, payload = await conn.request(method, path, body, headers)
+                except (ConnectionError, OSError, asyncio.IncompleteReadError):
+                    errors += 1
+                    error_statuses["connection"] = error_statuses.get("connection", 0) + 1
+                    await conn.close()
+                    continue
+                if on_response is not None:
+                    on_response(i, status, payload, started)
+                if status in expect:
+                    latencies.append(time.perf_counter() - started)
+                else:
+                    errors += 1
+                    error_statuses[status] = error_statuses.get(status, 0) + 1
+        finally:
+            await conn.close()
+
+    load_started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - load_started, error_statuses)
+
+
+def json_request(method, path, payload=None, headers=None):
+    body = json.dumps(payload).encode() if payload is not None else b""
+    merged = {"Content-Type": "application/json", **(headers or {})}
+    return method, path, body, merged
@@ -0,0 +1,71 @@
+"""
+Local Redis stand-in for benchmarks when no redis-server is available.
+
+Wraps fakeredis' TCP server (pip install "fakeredis[lua]") so error replies such
+as NOSCRIPT are sent back to the client instead of dropping the connection,
+which redis-py's EVALSHA -> SCRIPT LOAD fallback relies on.
+
+Numbers measured against the stand-in include its (pure Python) command cost;
+prefer a real Redis when comparing absolute latencies.
+
+    python -m benchmarks.redis_standin --port 6379
+"""
+import argparse
+import threading
+
+import redis
+
+
+def _handler_class():
+    from fakeredis._clients._tcp_server import TCPFakeRequestHandler
+
+    class _ErrorTolerantHandler(TCPFakeRequestHandler):
+        def setup(self):
+            super().setup()
+            read_response = self.current_client.read_response
+
+            def read_response_or_error(*args, **kwargs):
+                try:
+                    return read_response(*args, **kwargs)
+                except redis.ResponseError as exc:
+                    return exc
+
+            self.current_client.read_response = read_response_or_error
+
+    return _ErrorTolerantHandler
+
+
+def start(host="127.0.0.1", port=0):
+    """
+    Starts the stand-in on a background thread. Returns (server, url).
+    """
+    from fakeredis import TcpFakeServer
+
+    class _StandinServer(TcpFakeServer):
+        # socketserver's default listen backlog (5) resets bursts of new connections
+        request_queue_size = 1024
+
+    server = _StandinServer((host, port), server_type="redis")
+    server.RequestHandlerClass = _handler_class()
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    bound_host, bound_port = server.server_address[:2]
+    return server, f"redis://{bound_host}:{bound_port}/0"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6379)
+    args = parser.parse_args()
+
+    server, url = start(args.host, args.port)
+    print(f"Redis stand-in listening on {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
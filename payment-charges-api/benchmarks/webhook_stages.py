@@ -0,0 +1,319 @@
+"""
+Micro-benchmarks of the POST /webhooks/pix hot path, one stage at a time, so a
+latency change can be pinned to the layer that caused it.
+
+Runs offline: in-memory SQLite and fakeredis (pip install "fakeredis[lua]"),
+no server, no network.
+
+    python -m benchmarks.webhook_stages                    # run and print
+    python -m benchmarks.webhook_stages --save-baseline    # store the baseline
+    python -m benchmarks.webhook_stages --check            # exit 1 on regressions
+
+--check compares each stage with the stored baseline (fastest round by
+default, the least noisy figure for CPU-bound code; --stat median_us for the
+typical one) and fails when one is more than --threshold (default 25%) slower.
+Baselines are only comparable on the same machine and Python version: the
+baseline file records both and --check warns when they differ. On shared or
+throttled machines every stage drifts together; re-save the baseline there.
+"""
+import argparse
+import gc
+import hashlib
+import hmac
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from flask import Flask, jsonify
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(SERVICE_DIR, "benchmarks", "baselines", "webhook_stages.json")
+
+SECRET = "benchmark-secret"
+DEFAULT_THRESHOLD = 0.25
+DEFAULT_ROUNDS = 200
+DEFAULT_STAT = "min_us"
+
+# Cheap stages are timed in loops of at least this long, so timer resolution
+# and call overhead do not dominate the per-call figure.
+MIN_ROUND_SECONDS = 0.0002
+
+BODY_SIZES = {"256B": 256, "4KiB": 4 * 1024, "64KiB": 64 * 1024}
+
+
+@dataclass
+class Stage:
+    name: str
+    fn: Callable
+    # Untimed, runs before every call (stages that consume state: one charge per call)
+    setup: Optional[Callable] = None
+
+
+def measure(stage, rounds=DEFAULT_ROUNDS, warmup=5):
+    """
+    Per-call timings of `stage` in seconds, one per round.
+    """
+    for _ in range(warmup):
+        stage.fn(stage.setup() if stage.setup else None)
+
+    inner = 1
+    if stage.setup is None:
+        # Calibrate the loop length once
+        while True:
+            started = time.perf_counter()
+            for _ in range(inner):
+                stage.fn(None)
+            if time.perf_counter() - started >= MIN_ROUND_SECONDS or inner >= 1 << 20:
+                break
+            inner *= 2
+
+    timings = []
+    # Collector pauses land on random rounds: keep them out of the timings
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(rounds):
+            arg = stage.setup() if stage.setup else None
+            started = time.perf_counter()
+            for _ in range(inner):
+                stage.fn(arg)
+            timings.append((time.perf_counter() - started) / inner)
+    finally:
+        gc.enable()
+    return timings
+
+
+def stats(timings) -> dict:
+    us = sorted(t * 1e6 for t in timings)
+    return {
+        "min_us": round(us[0], 3),
+        "median_us": round(statistics.median(us), 3),
+        "p95_us": round(us[min(len(us) - 1, int(len(us) * 0.95))], 3),
+        "rounds": len(us),
+    }
+
+
+def find_regressions(results, baseline, threshold=DEFAULT_THRESHOLD, stat=DEFAULT_STAT) -> dict:
+    """
+    {stage: relative change} for every stage whose `stat` is more than
+    `threshold` above the baseline's. Stages missing on either side are ignored.
+    """
+    regressions = {}
+    for name, current in results.items():
+        before = baseline.get("stages", {}).get(name)
+        if not before or not before.get(stat):
+            continue
+        change = current[stat] / before[stat] - 1
+        if change > threshold:
+            regressions[name] = round(change, 3)
+    return regressions
+
+
+def machine() -> dict:
+    return {"python": platform.python_version(), "platform": platform.platform(), "processor": platform.processor()}
+
+
+def _sign(body: bytes):
+    digest = hmac.new(SECRET.encode(), body, hashlib.sha256).hexdigest()
+    return f"sha256={digest}", str(int(time.time()))
+
+
+def _event(external_id, amount_cents=1000):
+    return {"event_id": f"evt_{uuid.uuid4()}", "external_id": external_id, "amount_cents": amount_cents, "status": "PAID"}
+
+
+@contextmanager
+def bench_env():
+    """
+    Flask app with the webhook blueprint, in-memory SQLite and fakeredis wired
+    into the modules that hold a Redis client (restored on exit).
+    """
+    import fakeredis
+
+    import routes.webhooks
+    import security.idempotency
+    from repository.database import db
+    from routes.webhooks import webhooks_bp
+
+    redis = fakeredis.FakeRedis(decode_responses=True)
+    patched = {
+        (routes.webhooks, "redis_client"): redis,
+        (security.idempotency, "redis_client"): redis,
+        (security.idempotency, "_store_script"): None,
+    }
+    saved = {target: getattr(*target) for target in patched}
+    for (module, name), value in patched.items():
+        setattr(module, name, value)
+
+    app = Flask(__name__)
+    app.config.update(
+        TESTING=True,
+        SQLALCHEMY_DATABASE_URI="sqlite:///:memory:",
+        WEBHOOK_SECRET=SECRET,
+    )
+    db.init_app(app)
+    app.register_blueprint(webhooks_bp)
+    app.redis = redis
+
+    try:
+        with app.app_context():
+            db.create_all()
+            yield app
+            db.session.remove()
+    finally:
+        for (module, name), value in saved.items():
+            setattr(module, name, value)
+
+
+def _pending_charge(app):
+    from datetime import datetime, timedelta
+
+    from db_models.charges import Charge
+    from repository.database import db
+
+    charge = Charge(value=10.0, external_id=str(uuid.uuid4()), expires_at=datetime.utcnow() + timedelta(minutes=30))
+    db.session.add(charge)
+    db.session.commit()
+    app.redis.setex(f"charge:ttl:{charge.external_id}", 1800, "PENDING")
+    return charge
+
+
+def build_stages(app) -> list:
+    from db_models.charges import Charge
+    from security.idempotency import idempotent
+    from security.webhook_signature import is_valid_signature
+    from services.charge_state_machine import ChargeState, transition_charge, transition_where
+    from services.money import cents_from_payload
+
+    stages = []
+
+    # 1. HMAC over the raw body (require_webhook_signature)
+    for label, size in BODY_SIZES.items():
+        body = json.dumps({**_event("ext"), "padding": "x" * size}).encode()[:size]
+        signature, timestamp = _sign(body)
+        stages.append(Stage(
+            f"hmac_verify[{label}]",
+            lambda _, body=body, signature=signature, timestamp=timestamp:
+                is_valid_signature(signature, timestamp, body, SECRET),
+        ))
+
+    # 2. JSON parsing of a typical event (request.get_json)
+    raw = json.dumps(_event(str(uuid.uuid4()))).encode()
+    stages.append(Stage("json_parse", lambda _: json.loads(raw)))
+
+    # 3. Amount check against the charge (integer cents; legacy `value` goes through Decimal)
+    stages.append(Stage("amount_check[amount_cents]", lambda _: cents_from_payload({"amount_cents": 1000}) == 1000))
+    stages.append(Stage("amount_check[value]", lambda _: cents_from_payload({"value": 10.0}) == 1000))
+
+    # 4. PENDING -> PAID: ORM transition + commit, and the conditional UPDATE the webhook uses
+    stages.append(Stage(
+        "transition_charge",
+        lambda charge: transition_charge(charge, ChargeState.PAID),
+        setup=lambda: _pending_charge(app),
+    ))
+    stages.append(Stage(
+        "transition_where",
+        lambda charge: transition_where(
+            ChargeState.PAID, Charge.external_id == charge.external_id, Charge.amount_cents == 1000
+        ),
+        setup=lambda: _pending_charge(app),
+    ))
+
+    # 5. Flask dispatch through the test client, bare and behind @idempotent
+    def bare():
+        return jsonify({"message": "ok"}), 200
+
+    app.add_url_rule("/bench/bare", "bench_bare", bare, methods=["POST"])
+    app.add_url_rule("/bench/idempotent", "bench_idempotent", idempotent(ttl=300)(bare), methods=["POST"])
+    client = app.test_client()
+    headers = {"Content-Type": "application/json"}
+
+    stages.append(Stage("flask_dispatch", lambda _: client.post("/bench/bare", data=raw, headers=headers)))
+    stages.append(Stage(
+        "idempotent_dispatch",
+        lambda key: client.post("/bench/idempotent", data=raw, headers={**headers, "Idempotency-Key": key}),
+        setup=lambda: str(uuid.uuid4()),
+    ))
+
+    # 6. The whole route: signature, idempotency, Redis gate, UPDATE, cache write-through
+    def signed_webhook():
+        body = json.dumps(_event(_pending_charge(app).external_id)).encode()
+        signature, timestamp = _sign(body)
+        return body, {**headers, "X-Signature": signature, "X-Timestamp": timestamp, "Idempotency-Key": str(uuid.uuid4())}
+
+    def pix_webhook(request):
+        response = client.post("/webhooks/pix", data=request[0], headers=request[1])
+        assert response.status_code == 200, response.get_json()
+
+    stages.append(Stage("pix_webhook", pix_webhook, setup=signed_webhook))
+    return stages
+
+
+def run(rounds=DEFAULT_ROUNDS, only=None) -> dict:
+    results = {}
+    with bench_env() as app:
+        for stage in build_stages(app):
+            if only and not any(pattern in stage.name for pattern in only):
+                continue
+            results[stage.name] = stats(measure(stage, rounds))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=DEFAULT_ROUNDS)
+    parser.add_argument("--only", nargs="+", help="run only stages whose name contains one of these")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--check", action="store_true", help="exit 1 when a stage regressed beyond --threshold")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="allowed slowdown (0.25 = 25%%)")
+    parser.add_argument("--stat", default=DEFAULT_STAT, choices=["min_us", "median_us", "p95_us"])
+    parser.add_argument("--output", help="write results as JSON to this path")
+    args = parser.parse_args()
+
+    results = run(args.rounds, args.only)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    print(f"{'stage':28} {'min_us':>10} {'median_us':>10} {'p95_us':>10} {'vs base':>8}")
+    for name, current in results.items():
+        before = baseline.get("stages", {}).get(name, {}).get(args.stat)
+        change = f"{(current[args.stat] / before - 1) * 100:+.1f}%" if before else "-"
+        print(f"{name:28} {current['min_us']:>10} {current['median_us']:>10} {current['p95_us']:>10} {change:>8}")
+
+    report = {"machine": machine(), "stages": results}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+        print(f"Baseline saved to {args.baseline}")
+
+    if args.check:
+        if not baseline:
+            print(f"No baseline at {args.baseline} (run with --save-baseline first)")
+            sys.exit(2)
+        if baseline.get("machine") != report["machine"]:
+            print("WARNING: baseline recorded on a different machine / Python version")
+        regressions = find_regressions(results, baseline, args.threshold, args.stat)
+        for name, change in regressions.items():
+            print(f"REGRESSION {name}: {args.stat} {change * 100:+.1f}% (threshold {args.threshold * 100:.0f}%)")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import os
+
+from repository.engine import database_url
+
+
+def _csv(value) -> list:
+    return [item for item in value.split(",") if item]
+
+
+def load_config(env=os.environ) -> dict:
+    """
+    App configuration read from the environment (see README, "Variáveis de
+    Ambiente"). create_app(config) applies its own overrides on top.
+    """
+    config = {}
+
+    # Database configuration
+    # DATABASE_URL selects the backend (SQLite by default, PostgreSQL supported);
+    # pool sizing / pre-ping / recycle / timeouts (DB_* variables) are derived
+    # from the final URL by create_app().
+    config["SQLALCHEMY_DATABASE_URI"] = database_url(env)
+
+    # Local: redis://localhost:6379/0 | Docker: redis://redis:6379/0
+    config["REDIS_URL"] = env.get("REDIS_URL", "redis://localhost:6379/0")
+
+    # Per-worker LRU of immutable (PAID / EXPIRED) charges
+    config["TERMINAL_CACHE_SIZE"] = int(env.get("TERMINAL_CACHE_SIZE", "10000"))
+
+    # Proactive expiry: background sweeper (one leader across workers via Redis lock)
+    config["EXPIRY_SWEEPER_ENABLED"] = env.get("EXPIRY_SWEEPER_ENABLED", "1") == "1"
+    config["EXPIRY_SWEEP_INTERVAL_SECONDS"] = float(env.get("EXPIRY_SWEEP_INTERVAL_SECONDS", "5"))
+    config["EXPIRY_SWEEP_CHUNK"] = int(env.get("EXPIRY_SWEEP_CHUNK", "500"))
+    # Readiness: dependencies checked in the background, /ready serves the last snapshot
+    config["HEALTH_MONITOR_ENABLED"] = env.get("HEALTH_MONITOR_ENABLED", "1") == "1"
+    config["HEALTH_CHECK_INTERVAL_SECONDS"] = float(env.get("HEALTH_CHECK_INTERVAL_SECONDS", "2"))
+    config["HEALTH_CHECK_TIMEOUT_SECONDS"] = float(env.get("HEALTH_CHECK_TIMEOUT_SECONDS", "0.5"))
+
+    # Set by gunicorn.conf.py: the app is built in the master, background threads
+    # are started in each worker after fork (app.reinit_after_fork)
+    config["DEFER_BACKGROUND_WORKERS"] = env.get("DEFER_BACKGROUND_WORKERS", "0") == "1"
+
+    # Webhook ingestion: "sync" applies the event inside the request; "stream" appends
+    # it to a Redis Stream, answers 202 and leaves it to webhook_worker.py
+    config["WEBHOOK_INGESTION_MODE"] = env.get("WEBHOOK_INGESTION_MODE", "sync")
+    config["WEBHOOK_STREAM_MAXLEN"] = int(env.get("WEBHOOK_STREAM_MAXLEN", "100000"))
+    config["WEBHOOK_WORKERS"] = int(env.get("WEBHOOK_WORKERS", "4"))
+    config["WEBHOOK_WORKER_BATCH"] = int(env.get("WEBHOOK_WORKER_BATCH", "50"))
+    config["WEBHOOK_WORKER_MIN_IDLE_MS"] = int(env.get("WEBHOOK_WORKER_MIN_IDLE_MS", "30000"))
+
+    # Event dedupe store: "keys" (one key per event) or "buckets" (one hash per time
+    # bucket, dropped wholesale; optional Bloom prefilter). Same 24h window.
+    config["WEBHOOK_DEDUPE_BACKEND"] = env.get("WEBHOOK_DEDUPE_BACKEND", "keys")
+    config["WEBHOOK_DEDUPE_BUCKET_SECONDS"] = int(env.get("WEBHOOK_DEDUPE_BUCKET_SECONDS", "3600"))
+    config["WEBHOOK_DEDUPE_PREFILTER_BITS"] = int(env.get("WEBHOOK_DEDUPE_PREFILTER_BITS", "0"))
+
+    # Rate limiting: "redis" (one INCR per limited request) or "hybrid" (local
+    # counters reconciled in the background, see infrastructure/hybrid_rate_limit.py)
+    config["RATELIMIT_BACKEND"] = env.get("RATELIMIT_BACKEND", "redis")
+    config["RATELIMIT_MAX_UNSYNCED"] = int(env.get("RATELIMIT_MAX_UNSYNCED", "2"))
+    config["RATELIMIT_SYNC_INTERVAL_MS"] = float(env.get("RATELIMIT_SYNC_INTERVAL_MS", "50"))
+
+    # Audit log (see audit/logger.py)
+    config["AUDIT_LOG_MODE"] = env.get("AUDIT_LOG_MODE", "sync")
+    config["AUDIT_LOG_FORMAT"] = env.get("AUDIT_LOG_FORMAT", "text")
+    config["AUDIT_LOG_FLUSH_RECORDS"] = int(env.get("AUDIT_LOG_FLUSH_RECORDS", "1"))
+    config["AUDIT_LOG_FLUSH_INTERVAL_SECONDS"] = float(env.get("AUDIT_LOG_FLUSH_INTERVAL_SECONDS", "0"))
+
+    # Security-related configuration
+    config["EXTERNAL_API_KEY"] = env.get("EXTERNAL_API_KEY")
+    config["WEBHOOK_SECRET"] = env.get("WEBHOOK_SECRET")
+    # Rotation: secrets still accepted besides WEBHOOK_SECRET (comma-separated),
+    # until webhook_signature_matches_total{secret="previous"} stops growing.
+    config["WEBHOOK_SECRET_PREVIOUS"] = _csv(env.get("WEBHOOK_SECRET_PREVIOUS", ""))
+
+    # Ops-only profiling: cProfile for signed / sampled requests, tracemalloc
+    # snapshots under /ops. Off by default: no hooks, no routes.
+    config["PROFILING_ENABLED"] = env.get("PROFILING_ENABLED", "0") == "1"
+    config["PROFILING_TOKEN"] = env.get("PROFILING_TOKEN")
+    config["PROFILING_SAMPLE_RATE"] = float(env.get("PROFILING_SAMPLE_RATE", "0"))
+    config["PROFILING_DIR"] = env.get("PROFILING_DIR", os.path.join("logs", "profiles"))
+    config["PROFILING_KEEP"] = int(env.get("PROFILING_KEEP", "200"))
+
+    return config
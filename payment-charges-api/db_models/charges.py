@@ -1,7 +1,10 @@
 import uuid
 from datetime import datetime
 from enum import Enum
+from sqlalchemy.orm import validates
+
 from repository.database import db
+from services.money import to_cents
 
 class ChargeStatus(str, Enum):
     PENDING = "PENDING"
@@ -9,10 +12,35 @@ class ChargeStatus(str, Enum):
     EXPIRED = "EXPIRED"
 
 class Charge(db.Model):
+    # Composite indexes backing keyset pagination of GET /payment/charges:
+    # newest-first listing seeks on (created_at, id), optionally after an equality on status.
+    __table_args__ = (
+        db.Index("ix_charge_created_at_id", "created_at", "id"),
+        db.Index("ix_charge_status_created_at_id", "status", "created_at", "id"),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
+    # Legacy major-unit amount, still written during the transition to integer cents.
     value = db.Column(db.Float, nullable=False)
+    # Amount in integer minor units (centavos): exact comparisons and aggregates.
+    # Nullable only until migrate_schema() backfills rows created before the column existed.
+    amount_cents = db.Column(db.BigInteger, nullable=True)
     status = db.Column(db.String(20), default=ChargeStatus.PENDING)
     external_id = db.Column(db.String(36), unique=True, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     expires_at = db.Column(db.DateTime)
     paid_at = db.Column(db.DateTime, nullable=True)
+
+    @validates("value")
+    def _sync_amount_cents(self, _key, value):
+        # Writers still assigning the legacy `value` keep amount_cents in step
+        cents = to_cents(value)
+        if cents is not None:
+            self.amount_cents = cents
+        return value
+
+    @property
+    def cents(self) -> int:
+        if self.amount_cents is not None:
+            return self.amount_cents
+        return to_cents(self.value)
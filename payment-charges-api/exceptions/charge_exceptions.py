@@ -12,3 +12,10 @@ class ChargeNotPayable(ChargeError):
 
 class InvalidChargeValue(ChargeError):
     pass
+
+
+class ChargeTemporarilyUnavailable(ChargeError):
+    """
+    The charge is being recomputed by another caller and there is no stale copy
+    to serve: answered with 503 + Retry-After instead of a DB read without the lock.
+    """
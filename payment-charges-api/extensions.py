@@ -1,18 +1,54 @@
 from flask_limiter import Limiter
 from flask import request
 from flask_limiter.util import get_remote_address
-import os
+
+from infrastructure.metrics import RATE_LIMIT_REJECTIONS
 
 def rate_limit_key():
     # Prefer API key (melhor p/ endpoints "externos"), fallback pra IP
     return request.headers.get("x-api-key") or get_remote_address()
 
-# Local: redis://localhost:6379
-# Docker: redis://redis:6379
-REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
 
+def storage_uri(backend, redis_url):
+    # "redis": one synchronous INCR per rate-limited request (exact).
+    # "hybrid": counted in process memory, reconciled with Redis in the background;
+    #   at most RATELIMIT_MAX_UNSYNCED extra hits per process, key and window.
+    if backend == "hybrid":
+        # Registers the "hybrid+redis://" storage scheme
+        import infrastructure.hybrid_rate_limit  # noqa: F401
+
+        return f"hybrid+{redis_url}"
+    if backend == "redis":
+        return redis_url
+    raise ValueError(f"Unknown rate limit backend: {backend}")
+
+
+def storage_config(config) -> dict:
+    """
+    RATELIMIT_STORAGE_* settings for `config` (read by limiter.init_app).
+    """
+    backend = config["RATELIMIT_BACKEND"]
+    options = {}
+    if backend == "hybrid":
+        options = {
+            "max_unsynced": config["RATELIMIT_MAX_UNSYNCED"],
+            "sync_interval": config["RATELIMIT_SYNC_INTERVAL_MS"] / 1000,
+        }
+    return {
+        "RATELIMIT_STORAGE_URI": storage_uri(backend, config["REDIS_URL"]),
+        "RATELIMIT_STORAGE_OPTIONS": options,
+    }
+
+
+def _on_breach(request_limit):
+    RATE_LIMIT_REJECTIONS.labels(request.endpoint or "unknown").inc()
+    # None: Flask-Limiter answers with its default 429
+
+
+# Storage comes from the app config in init_app() (see create_app): nothing
+# connects, and no storage backend is imported, until an app is built.
 limiter = Limiter(
     key_func=rate_limit_key,
-    storage_uri=REDIS_URL,
-    default_limits=[]
-)
\ No newline at end of file
+    default_limits=[],
+    on_breach=_on_breach,
+)
@@ -0,0 +1,90 @@
+"""
+Production WSGI server:
+
+    gunicorn -c gunicorn.conf.py
+
+The app is built once in the master (preload_app) and shared copy-on-write by
+the forked workers; each worker then drops the connections it inherited and
+starts its own background threads (app.reinit_after_fork). Every setting can
+be tuned from the environment (GUNICORN_*, PORT).
+"""
+import os
+import shutil
+import tempfile
+
+
+def _cpus() -> int:
+    # CPUs this process may run on (container cpusets included)
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+wsgi_app = "app:create_app()"
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+
+# Requests spend most of their time on Redis / the database: a few threads per
+# process overlap that wait, processes use the cores.
+worker_class = "gthread"
+workers = int(os.getenv("GUNICORN_WORKERS", str(2 * _cpus() + 1)))
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+
+preload_app = True
+
+# Longer than the idle timeout of the load balancer in front (60s on most),
+# so it never reuses a connection gunicorn already closed. gthread parks idle
+# keep-alive connections without holding a thread.
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "75"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "30"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+
+# Recycle workers to bound slow leaks; the jitter keeps them from all
+# restarting at once. A new worker is a cheap fork of the preloaded master.
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "2000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "200"))
+
+# Worker heartbeat files on tmpfs: a slow disk cannot make the master kill workers
+if os.path.isdir("/dev/shm"):
+    worker_tmp_dir = "/dev/shm"
+
+# Requests are already in the audit log and in /metrics: access log off unless asked for
+accesslog = os.getenv("GUNICORN_ACCESS_LOG") or None
+errorlog = "-"
+
+# Read when the master builds the app (preload), i.e. after this file: set here.
+os.environ["DEFER_BACKGROUND_WORKERS"] = "1"
+
+# /metrics merges the samples of every worker from this directory. It must be
+# set before prometheus_client is imported and start empty on every start.
+_metrics_dir = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "payment-charges-api-metrics")
+)
+shutil.rmtree(_metrics_dir, ignore_errors=True)
+os.makedirs(_metrics_dir, exist_ok=True)
+
+
+def on_starting(server):
+    # Master, app already loaded, no worker yet: schema once per deploy, not per worker
+    from app import init_schema
+
+    init_schema(server.app.wsgi())
+
+
+def pre_fork(server, worker):
+    from audit.logger import flush_audit_log
+
+    flush_audit_log()
+
+
+def post_fork(server, worker):
+    from app import reinit_after_fork
+
+    reinit_after_fork(server.app.wsgi())
+
+
+def child_exit(server, worker):
+    # Master: drop the live samples (gauges) of the worker that exited
+    from infrastructure.metrics import mark_process_dead
+
+    mark_process_dead(worker.pid)
@@ -0,0 +1,264 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from sqlalchemy import text
+
+from audit.logger import logger
+from infrastructure.metrics import observe_health_check
+
+# Probes (/ready) never touch a dependency: a background monitor checks each one
+# every interval, every check bounded by the timeout, and the probe answers from
+# the last snapshot. A slow database or Redis costs one monitor thread, not one
+# request thread per probe.
+DEFAULT_CHECK_INTERVAL_SECONDS = 2.0
+DEFAULT_CHECK_TIMEOUT_SECONDS = 0.5
+
+# No completed round for this many intervals: the monitor itself is stuck, and
+# a snapshot that old says nothing about the dependencies any more.
+STALE_AFTER_INTERVALS = 3
+
+_lock = threading.Lock()
+
+
+class HealthState:
+    """
+    Last check result per dependency. Written by a single monitor, read by every
+    probe: each write swaps in a new dict, so a reader never sees half a round.
+    """
+
+    def __init__(self, names, interval=DEFAULT_CHECK_INTERVAL_SECONDS, timeout=DEFAULT_CHECK_TIMEOUT_SECONDS):
+        self.names = tuple(names)
+        self.interval = interval
+        self.timeout = timeout
+        self._results = {}
+        self._round_at = None
+
+    def record(self, name, outcome, seconds, error=None) -> None:
+        """
+        outcome: "ok", "failed" (error = exception class) or "timeout".
+        """
+        now = time.monotonic()
+        observe_health_check(name, outcome, seconds)
+        previous = self._results.get(name, {})
+        self._results = {
+            **self._results,
+            name: {
+                "outcome": outcome,
+                "seconds": seconds,
+                "error": "timeout" if outcome == "timeout" else error,
+                "last_success": now if outcome == "ok" else previous.get("last_success"),
+            },
+        }
+
+    def finish_round(self) -> None:
+        self._round_at = time.monotonic()
+
+    @property
+    def checked(self) -> bool:
+        return self._round_at is not None
+
+    def is_stale(self, now=None) -> bool:
+        now = time.monotonic() if now is None else now
+        return self._round_at is None or now - self._round_at > self.interval
+
+    def report(self, now=None):
+        """
+        (body, is_ready) for /ready. Cost depends only on the number of
+        dependencies; nothing here waits on I/O.
+        """
+        now = time.monotonic() if now is None else now
+        results = self._results
+        round_age = None if self._round_at is None else now - self._round_at
+        fresh = round_age is not None and round_age <= STALE_AFTER_INTERVALS * self.interval + self.timeout
+
+        body = {}
+        checks = {}
+        for name in self.names:
+            result = results.get(name)
+            if result is None:
+                body[name] = "unknown"
+                checks[name] = {"status": "unknown", "latency_ms": None, "last_success_age_seconds": None, "error": None}
+                continue
+            last_success = result["last_success"]
+            body[name] = "ok" if result["outcome"] == "ok" else "failed"
+            checks[name] = {
+                "status": body[name],
+                "latency_ms": round(result["seconds"] * 1000, 3),
+                "last_success_age_seconds": None if last_success is None else round(now - last_success, 3),
+                "error": result["error"],
+            }
+
+        is_ready = fresh and all(body[name] == "ok" for name in self.names)
+        body["status"] = "ready" if is_ready else "not_ready"
+        body["checked_age_seconds"] = None if round_age is None else round(round_age, 3)
+        body["checks"] = checks
+        return body, is_ready
+
+
+def _timed(check):
+    started = time.perf_counter()
+    try:
+        check()
+    except Exception as exc:
+        return time.perf_counter() - started, exc.__class__.__name__
+    return time.perf_counter() - started, None
+
+
+class HealthMonitor(threading.Thread):
+    """
+    Background thread started by every worker: runs all checks in parallel every
+    `interval` seconds and waits at most `timeout` for them.
+
+    A check that hangs past its timeout keeps its pool thread and is reported
+    as timed out, round after round, until it returns; it is never started a
+    second time meanwhile, so a dead dependency holds exactly one thread.
+    """
+
+    def __init__(self, checks, interval=DEFAULT_CHECK_INTERVAL_SECONDS, timeout=DEFAULT_CHECK_TIMEOUT_SECONDS):
+        super().__init__(name="health-monitor", daemon=True)
+        self.checks = dict(checks)
+        self.interval = interval
+        self.timeout = timeout
+        self.state = HealthState(self.checks, interval, timeout)
+        self._executor = None
+        self._pending = {}
+        self._round_lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def check_all(self) -> None:
+        with self._round_lock:
+            self._round()
+
+    def _round(self) -> None:
+        if self._executor is None:
+            # Created on first use, never in the process that forks the workers
+            self._executor = ThreadPoolExecutor(max_workers=len(self.checks), thread_name_prefix="health-check")
+
+        now = time.perf_counter()
+        for name, check in self.checks.items():
+            pending = self._pending.get(name)
+            if pending is None or pending[0].done():
+                self._pending[name] = (self._executor.submit(_timed, check), now)
+
+        deadline = now + self.timeout
+        for name, (future, started) in self._pending.items():
+            try:
+                seconds, error = future.result(timeout=max(0.0, deadline - time.perf_counter()))
+            except FutureTimeout:
+                self.state.record(name, "timeout", time.perf_counter() - started)
+            else:
+                self.state.record(name, "ok" if error is None else "failed", seconds, error)
+        self.state.finish_round()
+
+    def refresh_if_stale(self) -> None:
+        """
+        Without the thread (dev server, tests) a probe runs the round itself
+        when the snapshot is older than one interval; concurrent probes keep
+        answering from the previous snapshot instead of queueing behind it.
+        """
+        if self.is_alive() or not self.state.is_stale():
+            return
+        # Nothing to answer with before the first round: wait for it
+        if not self._round_lock.acquire(blocking=not self.state.checked):
+            return
+        try:
+            if self.state.is_stale():
+                self._round()
+        finally:
+            self._round_lock.release()
+
+    def run(self):
+        while True:
+            try:
+                self.check_all()
+            except Exception:
+                logger.exception("Health check round failed")
+            if self._stopped.wait(self.interval):
+                return
+
+    def stop(self):
+        self._stopped.set()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            self._pending = {}
+
+
+def database_check(engine):
+    def check():
+        with engine.connect() as conn:
+            if conn.execute(text("SELECT 1")).scalar_one() != 1:
+                raise RuntimeError("DB healthcheck returned unexpected result")
+
+    return check
+
+
+def get_health_monitor(app) -> HealthMonitor:
+    """
+    Monitor of a Flask app (database + Redis), created on first use. Started
+    by start_health_monitor(); otherwise /ready drives it (refresh_if_stale).
+    """
+    monitor = app.extensions.get("health_monitor")
+    if monitor is not None:
+        return monitor
+
+    from infrastructure.redis_client import get_redis
+    from repository.database import db
+
+    with _lock:
+        monitor = app.extensions.get("health_monitor")
+        if monitor is None:
+            with app.app_context():
+                checks = {"database": database_check(db.engine), "redis": get_redis().ping}
+            monitor = app.extensions["health_monitor"] = HealthMonitor(
+                checks,
+                interval=app.config.get("HEALTH_CHECK_INTERVAL_SECONDS", DEFAULT_CHECK_INTERVAL_SECONDS),
+                timeout=app.config.get("HEALTH_CHECK_TIMEOUT_SECONDS", DEFAULT_CHECK_TIMEOUT_SECONDS),
+            )
+    return monitor
+
+
+def start_health_monitor(app):
+    """
+    Starts the monitor thread for a Flask app when HEALTH_MONITOR_ENABLED is set.
+    """
+    if not app.config.get("HEALTH_MONITOR_ENABLED"):
+        return None
+
+    monitor = get_health_monitor(app)
+    monitor.start()
+    return monitor
+
+
+async def check_all_async(state, checks, timeout=DEFAULT_CHECK_TIMEOUT_SECONDS) -> None:
+    """
+    asyncio counterpart of HealthMonitor.check_all(): checks run concurrently
+    and a timed-out one is cancelled.
+    """
+    async def run(name, check):
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(check(), timeout)
+        except asyncio.TimeoutError:
+            state.record(name, "timeout", time.perf_counter() - started)
+        except Exception as exc:
+            state.record(name, "failed", time.perf_counter() - started, exc.__class__.__name__)
+        else:
+            state.record(name, "ok", time.perf_counter() - started)
+
+    await asyncio.gather(*(run(name, check) for name, check in checks.items()))
+    state.finish_round()
+
+
+async def run_health_monitor_async(state, checks, interval=DEFAULT_CHECK_INTERVAL_SECONDS, timeout=DEFAULT_CHECK_TIMEOUT_SECONDS):
+    """
+    asyncio counterpart of HealthMonitor.run() (started as a task by the ASGI app).
+    """
+    while True:
+        try:
+            await check_all_async(state, checks, timeout)
+        except Exception:
+            logger.exception("Health check round failed")
+        await asyncio.sleep(interval)
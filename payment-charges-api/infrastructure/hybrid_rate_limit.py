@@ -0,0 +1,222 @@
+import threading
+import time
+from urllib.parse import parse_qsl, urlsplit, urlunsplit
+
+import redis
+from limits.storage import Storage
+
+from audit.logger import logger
+
+# Hits counted locally before an inline (blocking) sync with Redis. Bounds the
+# over-admission to (processes x MAX_UNSYNCED) hits per key and window, on top
+# of what the background sync has not yet published.
+DEFAULT_MAX_UNSYNCED = 2
+
+# Background reconciliation period and how many keys go in one pipeline.
+DEFAULT_SYNC_INTERVAL_SECONDS = 0.05
+SYNC_BATCH_SIZE = 100
+
+# After a failed sync, requests stop trying inline syncs for this long.
+SYNC_BACKOFF_SECONDS = 1.0
+
+KEY_PREFIX = "LIMITS:hybrid:"
+
+
+class _Window:
+    """
+    Local view of one fixed-window counter:
+    value = known global count + hits in flight to Redis + hits not yet sent.
+    """
+
+    __slots__ = ("expires_at", "expiry", "synced", "inflight", "pending")
+
+    def __init__(self, expiry, now):
+        self.expiry = expiry
+        self.expires_at = now + expiry
+        self.synced = 0
+        self.inflight = 0
+        self.pending = 0
+
+    @property
+    def value(self):
+        return self.synced + self.inflight + self.pending
+
+
+class HybridRedisStorage(Storage):
+    """
+    Flask-Limiter storage (storage_uri "hybrid+redis://...") that counts hits in
+    process memory and reconciles with Redis in small pipelined batches.
+
+    - A hit is a dict update under a lock (microseconds); the request never
+      waits for Redis unless the key already has `max_unsynced` hits that no
+      other process has seen, which bounds the over-admission.
+    - A background thread publishes pending hits (SET NX EX + INCRBY per key)
+      and reads back the global count and the window TTL, so all processes
+      converge on the same count and window.
+    - If Redis is unavailable the limit is still enforced per process (no
+      inline syncs for SYNC_BACKOFF_SECONDS); hits are kept and published once
+      Redis is back.
+
+    Only the fixed-window strategy (Flask-Limiter's default) is supported.
+    """
+
+    STORAGE_SCHEME = ["hybrid+redis", "hybrid+rediss"]
+
+    def __init__(self, uri=None, wrap_exceptions=False, max_unsynced=DEFAULT_MAX_UNSYNCED, sync_interval=DEFAULT_SYNC_INTERVAL_SECONDS, client=None, **options):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        parts = urlsplit(uri or "hybrid+redis://localhost:6379")
+        query = dict(parse_qsl(parts.query))
+        self.max_unsynced = int(query.pop("max_unsynced", max_unsynced))
+        self.sync_interval = float(query.pop("sync_interval", sync_interval))
+
+        self._redis_url = urlunsplit((parts.scheme.replace("hybrid+", "", 1), parts.netloc, parts.path, "", ""))
+        self._client = client
+        self._windows = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._backoff_until = 0.0
+
+    @property
+    def base_exceptions(self):
+        return redis.RedisError
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = redis.Redis.from_url(self._redis_url, decode_responses=True)
+        return self._client
+
+    def _window(self, key, now, expiry=None):
+        window = self._windows.get(key)
+        if window is not None and window.expires_at <= now:
+            window = None
+            del self._windows[key]
+        if window is None and expiry is not None:
+            window = self._windows[key] = _Window(expiry, now)
+        return window
+
+    def incr(self, key, expiry, amount=1):
+        now = time.time()
+        with self._lock:
+            window = self._window(key, now, expiry)
+            window.pending += amount
+            value = window.value
+            must_sync = window.pending >= self.max_unsynced and now >= self._backoff_until
+
+        if must_sync:
+            # Too many hits only this process has seen: publish before admitting more
+            self._sync([key])
+            with self._lock:
+                window = self._window(key, time.time())
+                value = window.value if window is not None else value
+        else:
+            self._ensure_thread()
+            self._wakeup.set()
+        return value
+
+    def get(self, key):
+        with self._lock:
+            window = self._window(key, time.time())
+            return window.value if window is not None else 0
+
+    def get_expiry(self, key):
+        with self._lock:
+            window = self._window(key, time.time())
+            return window.expires_at if window is not None else time.time()
+
+    def check(self):
+        try:
+            return bool(self.client.ping())
+        except redis.RedisError:
+            return False
+
+    def reset(self):
+        with self._lock:
+            self._windows.clear()
+        keys = list(self.client.scan_iter(match=f"{KEY_PREFIX}*", count=1000))
+        if keys:
+            self.client.delete(*keys)
+        return len(keys)
+
+    def clear(self, key):
+        with self._lock:
+            self._windows.pop(key, None)
+        self.client.delete(KEY_PREFIX + key)
+
+    def sync_pending(self) -> int:
+        """
+        Publishes every key with unsent hits (what the background thread does
+        every sync_interval). Returns how many keys were synced.
+        """
+        now = time.time()
+        with self._lock:
+            # Drop closed windows: keys of clients that went quiet
+            for key in [key for key, window in self._windows.items() if window.expires_at <= now]:
+                del self._windows[key]
+            keys = [key for key, window in self._windows.items() if window.pending]
+        for start in range(0, len(keys), SYNC_BATCH_SIZE):
+            self._sync(keys[start:start + SYNC_BATCH_SIZE])
+        return len(keys)
+
+    def _sync(self, keys):
+        with self._lock:
+            batch = []
+            for key in keys:
+                window = self._windows.get(key)
+                if window is None or not window.pending:
+                    continue
+                delta, window.pending = window.pending, 0
+                window.inflight += delta
+                batch.append((key, window, delta))
+        if not batch:
+            return
+
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            for key, window, delta in batch:
+                # The first process to publish opens the window for everyone
+                pipe.set(KEY_PREFIX + key, 0, ex=window.expiry, nx=True)
+                pipe.incrby(KEY_PREFIX + key, delta)
+                pipe.pttl(KEY_PREFIX + key)
+            replies = pipe.execute()
+        except redis.RedisError:
+            logger.warning("Rate limit sync with Redis failed, counting locally", extra={"keys": len(batch)})
+            with self._lock:
+                self._backoff_until = time.time() + SYNC_BACKOFF_SECONDS
+                for _, window, delta in batch:
+                    window.inflight -= delta
+                    window.pending += delta
+            return
+
+        now = time.time()
+        with self._lock:
+            for index, (key, window, delta) in enumerate(batch):
+                count, ttl_ms = replies[index * 3 + 1], replies[index * 3 + 2]
+                window.inflight -= delta
+                # Replies of overlapping syncs (inline + background) may arrive out of order
+                window.synced = max(window.synced, int(count))
+                if ttl_ms and ttl_ms > 0:
+                    # Align the local window with the shared one
+                    window.expires_at = now + ttl_ms / 1000
+
+    def _ensure_thread(self):
+        # Started lazily and again after fork (threads do not survive it)
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="rate-limit-sync", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait()
+            # Let hits accumulate: one pipeline per interval, not one per hit
+            time.sleep(self.sync_interval)
+            self._wakeup.clear()
+            try:
+                self.sync_pending()
+            except Exception:
+                logger.exception("Rate limit sync iteration failed")
@@ -0,0 +1,153 @@
+import threading
+from collections import OrderedDict
+
+from flask import current_app
+
+from infrastructure.metrics import TERMINAL_CACHE_CAPACITY, TERMINAL_CACHE_ENTRIES, TERMINAL_CACHE_LOOKUPS
+from services.charge_state_machine import TERMINAL_STATES
+from services.money import from_cents, to_cents
+
+DEFAULT_TERMINAL_CACHE_SIZE = 10_000
+
+# Bound once: lookups are on the hottest read path
+_LOOKUP_HIT = TERMINAL_CACHE_LOOKUPS.labels("hit")
+_LOOKUP_MISS = TERMINAL_CACHE_LOOKUPS.labels("miss")
+
+
+class TerminalChargeCache:
+    """
+    Bounded, process-local LRU of charges in a terminal state (PAID / EXPIRED).
+
+    Terminal charges never change again (ALLOWED_TRANSITIONS gives them no exits),
+    so entries never need invalidation and are safe to keep per worker without
+    any cross-process coordination. Entries are indexed by id and by external_id.
+
+    Size, capacity and hits / misses are exported on /metrics (terminal_cache_*);
+    stats() gives the same numbers for this instance.
+    """
+
+    def __init__(self, maxsize=DEFAULT_TERMINAL_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._by_id = OrderedDict()
+        self._id_by_external_id = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        TERMINAL_CACHE_CAPACITY.inc(max(maxsize, 0))
+
+    def get_by_id(self, charge_id):
+        with self._lock:
+            snapshot = self._by_id.get(charge_id)
+            return self._record(charge_id, snapshot)
+
+    def get_by_external_id(self, external_id):
+        with self._lock:
+            charge_id = self._id_by_external_id.get(external_id)
+            snapshot = self._by_id.get(charge_id) if charge_id is not None else None
+            return self._record(charge_id, snapshot)
+
+    def put(self, snapshot) -> bool:
+        """
+        Stores a charge snapshot ({"id", "external_id", "amount_cents", "value", "status"}).
+        Non-terminal snapshots are ignored. external_id may be None when unknown.
+        """
+        if snapshot.get("status") not in TERMINAL_STATES or self.maxsize <= 0:
+            return False
+
+        charge_id = snapshot["id"]
+        with self._lock:
+            previous = self._by_id.get(charge_id)
+            self._by_id[charge_id] = dict(snapshot)
+            self._by_id.move_to_end(charge_id)
+
+            external_id = snapshot.get("external_id")
+            if external_id:
+                self._id_by_external_id[external_id] = charge_id
+            elif previous and previous.get("external_id"):
+                self._by_id[charge_id]["external_id"] = previous["external_id"]
+
+            added = 0 if previous else 1
+            while len(self._by_id) > self.maxsize:
+                _, evicted = self._by_id.popitem(last=False)
+                self._id_by_external_id.pop(evicted.get("external_id"), None)
+                added -= 1
+        if added:
+            TERMINAL_CACHE_ENTRIES.inc(added)
+        return True
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._by_id),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            TERMINAL_CACHE_ENTRIES.dec(len(self._by_id))
+            self._by_id.clear()
+            self._id_by_external_id.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def _record(self, charge_id, snapshot):
+        if snapshot is None:
+            self.misses += 1
+            _LOOKUP_MISS.inc()
+            return None
+        self.hits += 1
+        _LOOKUP_HIT.inc()
+        self._by_id.move_to_end(charge_id)
+        return dict(snapshot)
+
+
+def terminal_cache_for(app) -> TerminalChargeCache:
+    """
+    Returns the app's cache, creating it on first use (size from TERMINAL_CACHE_SIZE).
+    Scoping it to the app keeps independent app instances (e.g. tests) isolated.
+    """
+    cache = app.extensions.get("terminal_charge_cache")
+    if cache is None:
+        cache = app.extensions.setdefault(
+            "terminal_charge_cache",
+            TerminalChargeCache(app.config.get("TERMINAL_CACHE_SIZE", DEFAULT_TERMINAL_CACHE_SIZE)),
+        )
+    return cache
+
+
+def get_terminal_cache() -> TerminalChargeCache:
+    return terminal_cache_for(current_app)
+
+
+def charge_snapshot(charge) -> dict:
+    """
+    Plain-dict view of a Charge, or of a row returned by a conditional transition
+    (same column names, see TRANSITION_RETURNING).
+    """
+    cents = charge.amount_cents if charge.amount_cents is not None else to_cents(charge.value)
+    return {
+        "id": charge.id,
+        "external_id": charge.external_id,
+        "amount_cents": cents,
+        "value": from_cents(cents),
+        # Freshly created objects still hold the ChargeStatus enum
+        "status": getattr(charge.status, "value", charge.status),
+    }
+
+
+def charge_response(snapshot) -> dict:
+    """
+    Public representation of a charge snapshot (GET /payment/charges/<id>, the
+    charge:{id} cache entry). Both forms of the amount are returned while
+    clients migrate from `value` to `amount_cents`.
+    """
+    return {
+        "id": snapshot["id"],
+        "value": snapshot["value"],
+        "amount_cents": snapshot.get("amount_cents"),
+        "status": snapshot["status"],
+    }
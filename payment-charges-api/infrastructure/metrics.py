@@ -0,0 +1,243 @@
+import os
+import time
+
+import redis
+import redis.asyncio
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event
+
+# With several worker processes (gunicorn), each one writes its samples to
+# mmap files in this directory and /metrics merges all of them. Must be set
+# (and emptied) before the workers start; unset, samples live in process
+# memory and /metrics only sees the process that answers it.
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+# Request and dependency latencies are in the 1ms - 1s range; the default
+# buckets start at 5ms, too coarse for Redis round trips.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by blueprint route",
+    ["method", "blueprint", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+REDIS_COMMAND_SECONDS = Histogram(
+    "redis_command_duration_seconds",
+    "Redis round trip latency by command (PIPELINE for a whole pipeline)",
+    ["command"],
+    buckets=LATENCY_BUCKETS,
+)
+DB_QUERY_SECONDS = Histogram(
+    "db_query_duration_seconds",
+    "SQL statement latency by statement type",
+    ["statement"],
+    buckets=LATENCY_BUCKETS,
+)
+CHARGE_CACHE_LOOKUPS = Counter(
+    "charge_cache_lookups_total",
+    "charge:{id} cache lookups (hit: fresh entry; stale/miss: recomputed or waited for)",
+    ["result"],
+)
+# Per-worker LRU of PAID / EXPIRED charges (infrastructure/local_cache.py). Its
+# hits are answered before charge:{id} is read, so they never reach
+# charge_cache_lookups_total.
+TERMINAL_CACHE_LOOKUPS = Counter(
+    "terminal_cache_lookups_total",
+    "In-process terminal charge cache lookups (by id or external_id)",
+    ["result"],
+)
+TERMINAL_CACHE_ENTRIES = Gauge(
+    "terminal_cache_entries",
+    "Charges held in the in-process terminal cache (sum over live workers)",
+    multiprocess_mode="livesum",
+)
+TERMINAL_CACHE_CAPACITY = Gauge(
+    "terminal_cache_capacity",
+    "Maximum entries of the in-process terminal cache (sum over live workers)",
+    multiprocess_mode="livesum",
+)
+WEBHOOK_EVENTS = Counter(
+    "webhook_events_total",
+    "Webhook events by outcome",
+    ["outcome"],
+)
+WEBHOOK_SIGNATURE_MATCHES = Counter(
+    "webhook_signature_matches_total",
+    "Valid webhook signatures by the secret that matched (previous at zero: safe to retire)",
+    ["secret"],
+)
+RATE_LIMIT_REJECTIONS = Counter(
+    "rate_limit_rejections_total",
+    "Requests rejected by the rate limiter",
+    ["endpoint"],
+)
+HEALTH_CHECK_SECONDS = Histogram(
+    "health_check_duration_seconds",
+    "Dependency check latency by outcome (ok, failed, timeout), from the health monitor",
+    ["dependency", "outcome"],
+    buckets=LATENCY_BUCKETS,
+)
+
+_SQL_STATEMENTS = {"SELECT", "INSERT", "UPDATE", "DELETE", "BEGIN", "COMMIT", "ROLLBACK"}
+
+
+def metrics_payload():
+    """
+    Returns (body, content_type) for the /metrics endpoint.
+    """
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead(pid) -> None:
+    """
+    Drops the live samples of a worker that exited (gunicorn child_exit hook).
+    """
+    if MULTIPROC_DIR:
+        multiprocess.mark_process_dead(pid)
+
+
+# HTTP
+
+def observe_request(method, blueprint, rule, status, seconds) -> None:
+    # The route template (/charges/<int:charge_id>), never the raw path: bounded label values
+    HTTP_REQUEST_SECONDS.labels(method, blueprint or "none", rule or "unmatched", str(status)).observe(seconds)
+
+
+# Webhooks
+
+def webhook_outcome(body, status) -> str:
+    """
+    Maps a webhook (or batch item) response to confirmed / duplicate / expired /
+    accepted / ignored / invalid / error.
+    """
+    message = body.get("message") if isinstance(body, dict) else None
+    if message == "Payment confirmed":
+        return "confirmed"
+    if message == "Duplicate event ignored":
+        return "duplicate"
+    if message == "Expired charge ignored":
+        return "expired"
+    if message == "Event accepted":
+        return "accepted"
+    if status >= 500:
+        return "error"
+    if status >= 400:
+        return "invalid"
+    return "ignored"
+
+
+def observe_webhook(body, status, replayed=False) -> None:
+    # An idempotent replay is the bank delivering the same event again
+    WEBHOOK_EVENTS.labels("duplicate" if replayed else webhook_outcome(body, status)).inc()
+
+
+def observe_signature_match(secret) -> None:
+    WEBHOOK_SIGNATURE_MATCHES.labels(secret).inc()
+
+
+# Health checks
+
+def observe_health_check(dependency, outcome, seconds) -> None:
+    HEALTH_CHECK_SECONDS.labels(dependency, outcome).observe(seconds)
+
+
+# Redis
+
+def _command_name(args) -> str:
+    return str(args[0]).split(" ", 1)[0].upper() if args else "UNKNOWN"
+
+
+class InstrumentedPipeline(redis.client.Pipeline):
+    def execute(self, raise_on_error=True):
+        started = time.perf_counter()
+        try:
+            return super().execute(raise_on_error)
+        finally:
+            REDIS_COMMAND_SECONDS.labels("PIPELINE").observe(time.perf_counter() - started)
+
+
+class InstrumentedRedis(redis.Redis):
+    """
+    redis.Redis that records the latency of every command (and of every
+    pipeline as a whole) in redis_command_duration_seconds.
+    """
+
+    def execute_command(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            return super().execute_command(*args, **options)
+        finally:
+            REDIS_COMMAND_SECONDS.labels(_command_name(args)).observe(time.perf_counter() - started)
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        return InstrumentedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+class InstrumentedAsyncPipeline(redis.asyncio.client.Pipeline):
+    async def execute(self, raise_on_error=True):
+        started = time.perf_counter()
+        try:
+            return await super().execute(raise_on_error)
+        finally:
+            REDIS_COMMAND_SECONDS.labels("PIPELINE").observe(time.perf_counter() - started)
+
+
+class InstrumentedAsyncRedis(redis.asyncio.Redis):
+    """
+    Same as InstrumentedRedis for redis.asyncio (ASGI mode).
+    """
+
+    async def execute_command(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            return await super().execute_command(*args, **options)
+        finally:
+            REDIS_COMMAND_SECONDS.labels(_command_name(args)).observe(time.perf_counter() - started)
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        return InstrumentedAsyncPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+# SQLAlchemy
+
+def _statement_type(statement) -> str:
+    words = statement.split(None, 1)
+    verb = words[0].upper() if words else ""
+    return verb if verb in _SQL_STATEMENTS else "OTHER"
+
+
+def instrument_engine(engine) -> None:
+    """
+    Records every statement run on `engine` (a sync Engine; pass
+    AsyncEngine.sync_engine in the ASGI mode) in db_query_duration_seconds.
+    """
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_started"].pop()
+        DB_QUERY_SECONDS.labels(_statement_type(statement)).observe(time.perf_counter() - started)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(exception_context):
+        # Failed statements never reach after_cursor_execute
+        conn = exception_context.connection
+        if conn is not None and exception_context.cursor is not None and conn.info.get("query_started"):
+            conn.info["query_started"].pop()
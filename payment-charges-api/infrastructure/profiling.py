@@ -0,0 +1,201 @@
+import cProfile
+import io
+import os
+import pstats
+import random
+import re
+import threading
+import time
+import tracemalloc
+
+from flask import current_app, g, request
+
+from audit.logger import logger
+from security.webhook_signature import is_valid_signature
+
+# A request is profiled when it carries a valid signature of
+# "{timestamp}.METHOD /path?query" (same HMAC + freshness check as the webhooks,
+# keyed with PROFILING_TOKEN). The timestamp is signed: a captured signature
+# cannot be replayed with a fresh X-Profile-Timestamp.
+PROFILE_SIGNATURE_HEADER = "X-Profile-Signature"
+PROFILE_TIMESTAMP_HEADER = "X-Profile-Timestamp"
+# Name of the stored profile, on the responses of profiled requests
+PROFILE_ID_HEADER = "X-Profile-Id"
+
+DEFAULT_PROFILE_DIR = os.path.join("logs", "profiles")
+DEFAULT_KEEP_PROFILES = 200
+TRACEMALLOC_FRAMES = 10
+
+_UNSAFE_NAME_CHARS = re.compile(r"[^A-Za-z0-9_.-]")
+
+
+def profile_signature_payload(timestamp, method, full_path) -> bytes:
+    return f"{timestamp}.{method.upper()} {full_path}".encode()
+
+
+class RequestProfiler:
+    """
+    Runs selected requests under cProfile and keeps the last `keep` profiles
+    (pstats files, newest first by name) in `directory`.
+
+    Requests are selected by a signed header (on demand) or at random with
+    probability `sample_rate` (changed at runtime through POST /ops/profiling;
+    the value is per worker process).
+    """
+
+    def __init__(self, secret, directory=DEFAULT_PROFILE_DIR, sample_rate=0.0, keep=DEFAULT_KEEP_PROFILES):
+        self.secret = secret
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.keep = keep
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def is_requested(self, method, full_path, headers) -> bool:
+        signature = headers.get(PROFILE_SIGNATURE_HEADER)
+        timestamp = headers.get(PROFILE_TIMESTAMP_HEADER)
+        if not signature or not timestamp or not self.secret:
+            return False
+        return is_valid_signature(
+            signature,
+            timestamp,
+            profile_signature_payload(timestamp, method, full_path),
+            self.secret,
+        )
+
+    def is_sampled(self) -> bool:
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def start(self):
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12+: only one profiler at a time per process
+            return None
+        return profile
+
+    def finish(self, profile, endpoint, request_id) -> str:
+        profile.disable()
+        name = _UNSAFE_NAME_CHARS.sub("_", f"{time.time_ns()}-{endpoint or 'unmatched'}-{request_id}")[:120] + ".prof"
+        profile.dump_stats(os.path.join(self.directory, name))
+        self._prune()
+        return name
+
+    def _prune(self) -> None:
+        with self._lock:
+            for name in self.profiles()[self.keep:]:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass
+
+    def profiles(self) -> list:
+        # Names start with time_ns(): newest first
+        return sorted((name for name in os.listdir(self.directory) if name.endswith(".prof")), reverse=True)
+
+    def path_for(self, name):
+        if name not in self.profiles():
+            return None
+        return os.path.join(self.directory, name)
+
+    def render(self, name, sort="cumulative", limit=40):
+        path = self.path_for(name)
+        if path is None:
+            return None
+        out = io.StringIO()
+        pstats.Stats(path, stream=out).sort_stats(sort).print_stats(limit)
+        return out.getvalue()
+
+
+class MemoryTracker:
+    """
+    tracemalloc snapshots of this worker: the first snapshot() starts tracing,
+    each later one returns the allocation growth since the previous snapshot.
+    """
+
+    def __init__(self):
+        self._previous = None
+        self._lock = threading.Lock()
+
+    def snapshot(self, limit=20) -> dict:
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(TRACEMALLOC_FRAMES)
+                self._previous = tracemalloc.take_snapshot()
+                return {"tracing": "started", "pid": os.getpid()}
+
+            snapshot = tracemalloc.take_snapshot()
+            stats = snapshot.compare_to(self._previous, "lineno")
+            self._previous = snapshot
+            current, peak = tracemalloc.get_traced_memory()
+
+        return {
+            "tracing": "running",
+            "pid": os.getpid(),
+            "traced_bytes": current,
+            "peak_bytes": peak,
+            "top_growth": [
+                {
+                    "location": str(stat.traceback[0]),
+                    "size_diff": stat.size_diff,
+                    "size": stat.size,
+                    "count_diff": stat.count_diff,
+                }
+                for stat in stats[:limit]
+            ],
+        }
+
+    def stop(self) -> None:
+        with self._lock:
+            tracemalloc.stop()
+            self._previous = None
+
+
+def get_profiler() -> RequestProfiler:
+    return current_app.extensions["profiler"]
+
+
+def get_memory_tracker() -> MemoryTracker:
+    return current_app.extensions["memory_tracker"]
+
+
+def install_profiling(app) -> None:
+    """
+    Adds the profiling hooks to `app`. Only called when PROFILING_ENABLED is
+    set: otherwise no hook is registered and requests pay nothing.
+    """
+    profiler = app.extensions["profiler"] = RequestProfiler(
+        secret=app.config.get("PROFILING_TOKEN"),
+        directory=app.config.get("PROFILING_DIR", DEFAULT_PROFILE_DIR),
+        sample_rate=app.config.get("PROFILING_SAMPLE_RATE", 0.0),
+        keep=app.config.get("PROFILING_KEEP", DEFAULT_KEEP_PROFILES),
+    )
+    app.extensions["memory_tracker"] = MemoryTracker()
+
+    @app.before_request
+    def _start_profile():
+        requested = profiler.is_requested(request.method, request.full_path.rstrip("?"), request.headers)
+        if requested or profiler.is_sampled():
+            g.profile = profiler.start()
+            g.profile_requested = requested
+
+    @app.after_request
+    def _finish_profile(response):
+        profile = g.pop("profile", None)
+        if profile is not None:
+            try:
+                name = profiler.finish(profile, request.endpoint, getattr(g, "request_id", "unknown"))
+            except Exception:
+                logger.exception("Failed to store request profile")
+            else:
+                if g.get("profile_requested"):
+                    response.headers[PROFILE_ID_HEADER] = name
+        return response
+
+    @app.teardown_request
+    def _discard_profile(_exc):
+        # after_request did not run (unhandled error in another hook)
+        profile = g.pop("profile", None)
+        if profile is not None:
+            profile.disable()
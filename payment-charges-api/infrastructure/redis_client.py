@@ -1,9 +1,57 @@
-import redis
 import os
+import threading
+
+from flask import current_app, has_app_context
+from werkzeug.local import LocalProxy
+
+from infrastructure.metrics import InstrumentedRedis
 
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 
-redis_client = redis.Redis.from_url(
-    REDIS_URL,
-    decode_responses=True
-)
+_default_client = None
+_lock = threading.Lock()
+
+
+def create_redis_client(url=REDIS_URL):
+    # Plain redis.Redis plus per-command latency histograms (see infrastructure/metrics.py)
+    return InstrumentedRedis.from_url(url, decode_responses=True)
+
+
+def get_redis():
+    """
+    Redis client of the current app: app.extensions["redis"] (tests put a fake
+    there), created from REDIS_URL on first use. Outside an app context
+    (scripts, background threads without one) a process-wide client.
+    """
+    global _default_client
+    if has_app_context():
+        extensions = current_app.extensions
+        client = extensions.get("redis")
+        if client is None:
+            with _lock:
+                client = extensions.get("redis")
+                if client is None:
+                    client = extensions["redis"] = create_redis_client(current_app.config.get("REDIS_URL", REDIS_URL))
+        return client
+
+    if _default_client is None:
+        with _lock:
+            if _default_client is None:
+                _default_client = create_redis_client()
+    return _default_client
+
+
+def reset_after_fork(app) -> None:
+    """
+    Forgets the Redis connections inherited from the parent process (the app's
+    client and the process-wide one) without closing them: they belong to the
+    parent. The pools reconnect on next use.
+    """
+    for client in (app.extensions.get("redis"), _default_client):
+        pool = getattr(client, "connection_pool", None)
+        if pool is not None:
+            pool.reset()
+
+
+# Module-level handle kept for the call sites: resolves to get_redis() on every use
+redis_client = LocalProxy(get_redis)
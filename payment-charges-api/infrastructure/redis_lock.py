@@ -0,0 +1,71 @@
+import uuid
+
+# Deletes the lock only if it is still held by the caller's token, so a worker
+# whose lock already expired can never release a lock acquired by another one.
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+_release_script = None
+_release_script_async = None
+
+
+def acquire_lock(client, key, ttl_ms):
+    """
+    Tries to take a short-lived lock (SET NX PX). Returns the owner token, or None
+    if the lock is held by someone else.
+    """
+    token = uuid.uuid4().hex
+    if client.set(key, token, nx=True, px=ttl_ms):
+        return token
+    return None
+
+
+def release_lock(client, key, token) -> bool:
+    global _release_script
+    if _release_script is None:
+        _release_script = client.register_script(RELEASE_LOCK_SCRIPT)
+    return bool(_release_script(keys=[key], args=[token], client=client))
+
+
+async def acquire_lock_async(client, key, ttl_ms):
+    token = uuid.uuid4().hex
+    if await client.set(key, token, nx=True, px=ttl_ms):
+        return token
+    return None
+
+
+async def release_lock_async(client, key, token) -> bool:
+    global _release_script_async
+    if _release_script_async is None:
+        _release_script_async = client.register_script(RELEASE_LOCK_SCRIPT)
+    return bool(await _release_script_async(keys=[key], args=[token], client=client))
+
+
+# Extends the lock only if it is still held by the caller's token (leader heartbeat).
+RENEW_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+_renew_script = None
+_renew_script_async = None
+
+
+def renew_lock(client, key, token, ttl_ms) -> bool:
+    global _renew_script
+    if _renew_script is None:
+        _renew_script = client.register_script(RENEW_LOCK_SCRIPT)
+    return bool(_renew_script(keys=[key], args=[token, ttl_ms], client=client))
+
+
+async def renew_lock_async(client, key, token, ttl_ms) -> bool:
+    global _renew_script_async
+    if _renew_script_async is None:
+        _renew_script_async = client.register_script(RENEW_LOCK_SCRIPT)
+    return bool(await _renew_script_async(keys=[key], args=[token, ttl_ms], client=client))
@@ -1,3 +1,39 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import inspect, text
 
-db = SQLAlchemy()
\ No newline at end of file
+db = SQLAlchemy()
+
+
+def create_missing_indexes(connection) -> None:
+    """
+    create_all() skips tables that already exist, so indexes added to a model later
+    never reach an existing database. This creates the missing ones (no-op otherwise).
+    """
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+
+
+def migrate_amounts_to_cents(connection) -> int:
+    """
+    Adds charge.amount_cents to databases created before it existed and backfills
+    it from the legacy float `value` (rounded to the nearest cent). Idempotent;
+    returns the number of rows backfilled.
+    """
+    columns = {column["name"] for column in inspect(connection).get_columns("charge")}
+    if "amount_cents" not in columns:
+        connection.execute(text("ALTER TABLE charge ADD COLUMN amount_cents BIGINT"))
+
+    result = connection.execute(text(
+        "UPDATE charge SET amount_cents = CAST(ROUND(value * 100) AS BIGINT) "
+        "WHERE amount_cents IS NULL"
+    ))
+    return result.rowcount
+
+
+def migrate_schema(connection) -> None:
+    """
+    Brings an existing database up to date after create_all(). Safe to run on every start.
+    """
+    create_missing_indexes(connection)
+    migrate_amounts_to_cents(connection)
@@ -1,21 +1,46 @@
 from flask import Blueprint, request, jsonify
+from sqlalchemy import insert
 from repository.database import db
 from db_models.charges import Charge, ChargeStatus
-from datetime import datetime
+from datetime import datetime, timedelta
+import time
 import uuid
 from infrastructure.redis_client import redis_client
-import json
 from extensions import limiter
+from infrastructure.local_cache import charge_response, charge_snapshot, get_terminal_cache
+from security.auth import require_api_key
+from services.charge_listing import InvalidListQuery, build_list_query, page_response, parse_list_params
+from services.charge_cache import cache_ttl_for, get_charge_cached, write_through
+from services.charge_expiry import payment_queued, schedule_expiry
+from services.money import cents_from_payload, from_cents
 
 from audit.logger import logger
 from services.charge_state_machine import (
     ChargeState,
     InvalidChargeTransition,
-    transition_charge,
+    transition_where,
 )
 
 charges_bp = Blueprint("charges", __name__, url_prefix="/payment")
 
+# Lifetime of a PENDING charge. Stored as expires_at, scheduled in the expiry set
+# (services/charge_expiry.py) and mirrored by the Redis TTL key used by the webhook gate.
+CHARGE_TTL_SECONDS = 1800  # 30 minutes
+
+# Upper bound for POST /charges/batch to keep a single transaction (and the
+# Redis pipeline) reasonably small.
+MAX_BATCH_SIZE = 500
+
+
+def _amount_cents(item):
+    """
+    Positive amount in cents from {"amount_cents": ...} or legacy {"value": ...}; None if invalid.
+    """
+    cents = cents_from_payload(item) if isinstance(item, dict) else None
+    if cents is None or cents <= 0:
+        return None
+    return cents
+
 
 @charges_bp.route("/charges", methods=["POST"])
 @limiter.limit("10 per minute")
@@ -25,89 +50,256 @@ def create_charge():
     data = request.get_json()
 
     # Basic validation: ensure required fields exist and are valid
-    if not data or "value" not in data:
+    if not data or ("value" not in data and "amount_cents" not in data):
         return jsonify({"error": "Value is required"}), 400
 
-    if data["value"] <= 0:
+    amount_cents = _amount_cents(data)
+    if amount_cents is None:
         return jsonify({"error": "Invalid value"}), 400
 
     # Charges start as PENDING. Payment confirmation must happen asynchronously via webhook.
+    created_at = datetime.utcnow()
     charge = Charge(
-        value=data["value"],
+        value=from_cents(amount_cents),
+        amount_cents=amount_cents,
         status=ChargeStatus.PENDING,
         external_id=str(uuid.uuid4()),  # Public identifier shared with the bank / external systems
-        created_at=datetime.utcnow(),
+        created_at=created_at,
+        expires_at=created_at + timedelta(seconds=CHARGE_TTL_SECONDS),
     )
 
     db.session.add(charge)
+    db.session.flush()
+    # Snapshot taken before commit: reading attributes afterwards would reload the row.
+    snapshot = charge_snapshot(charge)
     db.session.commit()
 
-    # Redis TTL acts as the "source of truth" for charge expiration:
-    # - If the TTL key expires, a PENDING charge becomes EXPIRED on next read (lazy expiration).
-    # - This avoids periodic cron jobs and keeps expiration logic consistent across services.
-    redis_client.setex(
-        f"charge:ttl:{charge.external_id}",
-        1800,  # 30 minutes
+    # One pipeline for everything Redis needs to know about the new charge:
+    # - TTL key: checked by the webhook gate, so payments after the deadline are ignored.
+    # - Expiry set: the sweeper marks the charge EXPIRED in the DB once the deadline passes.
+    # - Read cache (write-through): the first GET after creation is served from Redis.
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.setex(
+        f"charge:ttl:{snapshot['external_id']}",
+        CHARGE_TTL_SECONDS,
         "PENDING",
     )
+    schedule_expiry(pipe, {snapshot["external_id"]: time.time() + CHARGE_TTL_SECONDS})
+    write_through(pipe, charge_response(snapshot), CHARGE_TTL_SECONDS)
+    pipe.execute()
 
     # Structured log: keeps operational traceability (request_id injected by LoggerAdapter)
     logger.info(
-        f"Charge created | charge_id={charge.id} | external_id={charge.external_id}"
+        "Charge created",
+        extra={"charge_id": snapshot["id"], "external_id": snapshot["external_id"]}
     )
 
     return jsonify({
-        "id": charge.id,
-        "external_id": charge.external_id,
-        "status": charge.status,
+        "id": snapshot["id"],
+        "external_id": snapshot["external_id"],
+        "status": snapshot["status"],
+    }), 201
+
+
+@charges_bp.route("/charges", methods=["GET"])
+@require_api_key
+def list_charges():
+    """
+    Lists charges newest first, with optional filters:
+    status, created_from / created_to (ISO 8601, [from, to)), limit and cursor.
+
+    Pagination is keyset-based: pass back `next_cursor` to get the following page.
+    """
+    try:
+        params = parse_list_params(request.args)
+    except InvalidListQuery as e:
+        return jsonify({"error": str(e)}), 400
+
+    charges = db.session.execute(build_list_query(**params)).scalars().all()
+    return jsonify(page_response(charges, params["limit"]))
+
+
+@charges_bp.route("/charges/batch", methods=["POST"])
+@limiter.limit("10 per minute")
+def create_charges_batch():
+    """
+    Creates many charges in a single request.
+
+    Payload: {"charges": [{"value": 100.0}, ...]}
+
+    Valid items are inserted with one bulk INSERT inside a single transaction and
+    their TTL keys are written with one Redis pipeline, so the cost per charge is
+    independent of network round trips. Invalid items do not abort the batch:
+    each item gets its own entry in "results", in request order.
+    """
+    data = request.get_json(silent=True)
+
+    if not isinstance(data, dict) or not isinstance(data.get("charges"), list):
+        return jsonify({"error": "charges must be a list"}), 400
+
+    items = data["charges"]
+    if not items:
+        return jsonify({"error": "charges must not be empty"}), 400
+
+    if len(items) > MAX_BATCH_SIZE:
+        return jsonify({"error": f"Batch too large (max {MAX_BATCH_SIZE})"}), 400
+
+    now = datetime.utcnow()
+    expires_at = now + timedelta(seconds=CHARGE_TTL_SECONDS)
+    results = [None] * len(items)
+    rows = []
+
+    for index, item in enumerate(items):
+        amount_cents = _amount_cents(item)
+        if amount_cents is None:
+            results[index] = {"index": index, "error": "Invalid value"}
+            continue
+
+        rows.append({
+            "value": from_cents(amount_cents),
+            "amount_cents": amount_cents,
+            "status": ChargeStatus.PENDING.value,
+            "external_id": str(uuid.uuid4()),
+            "created_at": now,
+            "expires_at": expires_at,
+        })
+        results[index] = {"index": index, "external_id": rows[-1]["external_id"]}
+
+    if not rows:
+        return jsonify({"created": 0, "failed": len(items), "results": results}), 400
+
+    # TTL keys and deadlines are written BEFORE the DB commit: external ids are generated
+    # here, so if Redis is unavailable nothing is persisted; if the commit fails instead,
+    # the orphan TTL keys simply expire and the sweeper finds no row to update.
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        for row in rows:
+            pipe.setex(f"charge:ttl:{row['external_id']}", CHARGE_TTL_SECONDS, "PENDING")
+        deadline = time.time() + CHARGE_TTL_SECONDS
+        schedule_expiry(pipe, {row["external_id"]: deadline for row in rows})
+        pipe.execute()
+    except Exception:
+        logger.exception("Failed to write TTL keys for charge batch", extra={"size": len(rows)})
+        return jsonify({"error": "Service unavailable"}), 503
+
+    try:
+        inserted = db.session.execute(
+            insert(Charge).returning(Charge.id, Charge.external_id),
+            rows,
+        ).all()
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        logger.exception("Failed to insert charge batch", extra={"size": len(rows)})
+        return jsonify({"error": "Internal server error"}), 500
+
+    ids_by_external_id = {external_id: charge_id for charge_id, external_id in inserted}
+    cents_by_external_id = {row["external_id"]: row["amount_cents"] for row in rows}
+
+    for result in results:
+        if "external_id" in result:
+            result["id"] = ids_by_external_id[result["external_id"]]
+            result["status"] = ChargeStatus.PENDING.value
+
+    # Write-through of the read cache for the whole batch (one pipeline). Best effort:
+    # a miss only costs one DB read later.
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        for external_id, charge_id in ids_by_external_id.items():
+            write_through(
+                pipe,
+                pending_payload(charge_id, cents_by_external_id[external_id]),
+                CHARGE_TTL_SECONDS,
+            )
+        pipe.execute()
+    except Exception:
+        logger.exception("Failed to warm charge cache for batch", extra={"size": len(rows)})
+
+    logger.info(
+        "Charge batch created",
+        extra={"charges_created": len(rows), "charges_failed": len(items) - len(rows)}
+    )
+
+    return jsonify({
+        "created": len(rows),
+        "failed": len(items) - len(rows),
+        "results": results,
     }), 201
 
 
 @charges_bp.route("/charges/<int:charge_id>", methods=["GET"])
 def get_charge(charge_id):
-    # Read-through caching: speed up repeated reads of the same charge for short periods.
+    # Terminal charges (PAID / EXPIRED) are immutable: serve them from process memory
+    # without touching Redis or the DB.
+    terminal_cache = get_terminal_cache()
+    terminal = terminal_cache.get_by_id(charge_id)
+    if terminal:
+        return jsonify(charge_response(terminal))
+
+    # Read-through caching with stampede protection: when `charge:{id}` is missing or
+    # stale, a single caller reloads it (per-process Future + short Redis lock) while
+    # concurrent pollers wait briefly or receive the stale representation.
     # IMPORTANT: Cache is treated as ephemeral — DB remains the persistent store.
-    cache_key = f"charge:{charge_id}"
+    loaded = []
 
-    cached = redis_client.get(cache_key)
-    if cached:
-        # Cached payload is JSON encoded; return it directly to avoid unnecessary DB hits.
-        return jsonify(json.loads(cached))
+    def load():
+        # _load_charge stores the DB snapshot (with external_id) in the terminal cache
+        loaded.append(charge_id)
+        return _load_charge(charge_id)
 
+    response = get_charge_cached(redis_client, charge_id, load)
+    if response is None:
+        return jsonify({"error": "Charge not found"}), 404
+
+    if not loaded:
+        # Served from Redis: this read has not stored it yet
+        terminal_cache.put(response)
+    return jsonify(response)
+
+
+def _load_charge(charge_id):
+    """
+    Builds the charge representation from the DB, applying lazy expiration.
+    Returns (representation, cache TTL), or (None, None) when the charge does not exist.
+    """
     charge = Charge.query.get(charge_id)
     if not charge:
-        return jsonify({"error": "Charge not found"}), 404
+        return None, None
 
-    ttl_key = f"charge:ttl:{charge.external_id}"
-
-    # Lazy expiration strategy:
-    # If the TTL key no longer exists and the charge is still PENDING, we mark it EXPIRED.
-    # This ensures the API reflects expiration without relying on background schedulers.
-    if not redis_client.exists(ttl_key):
-        logger.warning(f"TTL missing for charge | id={charge.id} | status={charge.status}")
-
-        if charge.status == ChargeState.PENDING.value:
-            try:
-                transition_charge(charge, ChargeState.EXPIRED)
-                # Invalidate cache (if any) to avoid serving stale state after status transition.
-                redis_client.delete(cache_key)
-                logger.info(f"Charge expired via TTL check | id={charge.id}")
-            except Exception:
-                logger.exception(f"Failed to expire charge via TTL check | id={charge.id}")
-
-    response = {
-        "id": charge.id,
-        "value": charge.value,
-        "status": charge.status,
-        # Optional: expires_at could be derived if you store created_at + TTL, but Redis TTL is the authority here.
-    }
-
-    # Short TTL cache to reduce load under read bursts (e.g., polling clients).
-    redis_client.setex(
-        cache_key,
-        60,  # cache for 60 seconds
-        json.dumps(response),
-    )
+    # The expiry sweeper keeps the DB status current, so no Redis round trip is needed.
+    # Safety net for the few seconds between a deadline and the next sweep (and for
+    # rows created before deadlines were scheduled): expire on read when past due,
+    # unless a payment accepted in time is still queued (stream mode).
+    remaining_ttl = seconds_until_deadline(charge)
+    row = None
+    if (
+        charge.status == ChargeState.PENDING.value
+        and remaining_ttl <= 0
+        and not payment_queued(redis_client, charge.external_id)
+    ):
+        # Conditional UPDATE: a payment committed in the meantime wins (row is None)
+        try:
+            row = transition_where(ChargeState.EXPIRED, Charge.id == charge.id)
+            if row is not None:
+                logger.info("Charge expired on read past its deadline", extra={"charge_id": charge.id})
+        except Exception:
+            logger.exception("Failed to expire charge on read", extra={"charge_id": charge.id})
+
+    snapshot = charge_snapshot(row if row is not None else charge)
+    get_terminal_cache().put(snapshot)
+    response = charge_response(snapshot)
+    return response, cache_ttl_for(response, remaining_ttl)
+
+
+def pending_payload(charge_id, amount_cents):
+    return charge_response({
+        "id": charge_id,
+        "value": from_cents(amount_cents),
+        "amount_cents": amount_cents,
+        "status": ChargeStatus.PENDING.value,
+    })
 
-    return jsonify(response)
 
+def seconds_until_deadline(charge, now=None) -> float:
+    deadline = charge.expires_at or (charge.created_at + timedelta(seconds=CHARGE_TTL_SECONDS))
+    return (deadline - (now or datetime.utcnow())).total_seconds()
@@ -1,7 +1,6 @@
-from flask import Blueprint, jsonify
-from sqlalchemy import text
-from repository.database import db
-from infrastructure.redis_client import redis_client
+from flask import Blueprint, Response, current_app, jsonify
+from infrastructure.health_monitor import get_health_monitor
+from infrastructure.metrics import metrics_payload
 
 health_bp = Blueprint("health", __name__)
 
@@ -12,28 +11,16 @@ def health():
 
 @health_bp.route("/ready", methods=["GET"])
 def ready():
-    database_status = "ok"
-    redis_status = "ok"
-
-    try:
-        # Use SQLAlchemy 2.x textual SQL execution for connectivity check.
-        result = db.session.execute(text("SELECT 1")).scalar_one()
-        if result != 1:
-            raise RuntimeError("DB healthcheck returned unexpected result")
-    except Exception:
-        database_status = "failed"
-
-    try:
-        # Verify Redis is reachable and responsive.
-        redis_client.ping()
-    except Exception:
-        redis_status = "failed"
-
-    is_ready = database_status == "ok" and redis_status == "ok"
-    response = {
-        "status": "ready" if is_ready else "not_ready",
-        "database": database_status,
-        "redis": redis_status,
-    }
-
-    return jsonify(response), 200 if is_ready else 503
+    # Served from the last background check (infrastructure/health_monitor.py):
+    # a slow database or Redis never holds the probe, and many probes cost nothing
+    monitor = get_health_monitor(current_app._get_current_object())
+    monitor.refresh_if_stale()
+    body, is_ready = monitor.state.report()
+    return jsonify(body), 200 if is_ready else 503
+
+
+@health_bp.route("/metrics", methods=["GET"])
+def metrics():
+    # Prometheus text format, merged across workers when PROMETHEUS_MULTIPROC_DIR is set
+    body, content_type = metrics_payload()
+    return Response(body, content_type=content_type)
@@ -0,0 +1,89 @@
+from flask import Blueprint, Response, current_app, jsonify, request, send_file
+from functools import wraps
+
+from infrastructure.profiling import get_memory_tracker, get_profiler
+from security.auth import api_key_error
+
+# Ops-only endpoints (profiles, memory snapshots). Registered only when
+# PROFILING_ENABLED is set; every call needs "Authorization: Bearer <PROFILING_TOKEN>".
+ops_bp = Blueprint("ops", __name__, url_prefix="/ops")
+
+
+def require_ops_token(f):
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        error = api_key_error(request.headers.get("Authorization"), current_app.config.get("PROFILING_TOKEN"))
+        if error:
+            return jsonify({"error": error[0]}), error[1]
+        return f(*args, **kwargs)
+    return decorated
+
+
+@ops_bp.route("/profiling", methods=["GET", "POST"])
+@require_ops_token
+def profiling_settings():
+    """
+    Reads / changes the sampling rate of this worker: {"sample_rate": 0.01}.
+    """
+    profiler = get_profiler()
+    if request.method == "POST":
+        data = request.get_json(silent=True) or {}
+        try:
+            rate = float(data.get("sample_rate"))
+        except (TypeError, ValueError):
+            return jsonify({"error": "sample_rate must be a number between 0 and 1"}), 400
+        if not 0 <= rate <= 1:
+            return jsonify({"error": "sample_rate must be a number between 0 and 1"}), 400
+        profiler.sample_rate = rate
+
+    return jsonify({"sample_rate": profiler.sample_rate, "stored": len(profiler.profiles())}), 200
+
+
+@ops_bp.route("/profiles", methods=["GET"])
+@require_ops_token
+def list_profiles():
+    return jsonify({"profiles": get_profiler().profiles()}), 200
+
+
+@ops_bp.route("/profiles/<name>", methods=["GET"])
+@require_ops_token
+def get_profile(name):
+    """
+    ?format=text: pstats report (sort=cumulative|tottime|..., limit=40);
+    otherwise the raw .prof file (python -m pstats, snakeviz).
+    """
+    profiler = get_profiler()
+    if request.args.get("format") == "text":
+        try:
+            report = profiler.render(
+                name,
+                sort=request.args.get("sort", "cumulative"),
+                limit=request.args.get("limit", 40, type=int),
+            )
+        except KeyError:
+            return jsonify({"error": "Invalid sort key"}), 400
+        if report is None:
+            return jsonify({"error": "Profile not found"}), 404
+        return Response(report, mimetype="text/plain")
+
+    path = profiler.path_for(name)
+    if path is None:
+        return jsonify({"error": "Profile not found"}), 404
+    return send_file(path, mimetype="application/octet-stream", as_attachment=True, download_name=name)
+
+
+@ops_bp.route("/memory/snapshot", methods=["POST"])
+@require_ops_token
+def memory_snapshot():
+    """
+    First call starts tracemalloc in this worker; later calls return the
+    allocation growth since the previous call (?limit=20 locations).
+    """
+    return jsonify(get_memory_tracker().snapshot(request.args.get("limit", 20, type=int))), 200
+
+
+@ops_bp.route("/memory/snapshot", methods=["DELETE"])
+@require_ops_token
+def stop_memory_tracing():
+    get_memory_tracker().stop()
+    return "", 204
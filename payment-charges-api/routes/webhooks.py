@@ -1,27 +1,54 @@
-from flask import Blueprint, request, jsonify
-from repository.database import db
+from functools import wraps
+
+from flask import Blueprint, request, jsonify, current_app, make_response
 from db_models.charges import Charge
 from infrastructure.redis_client import redis_client
+from infrastructure.local_cache import get_terminal_cache
+from infrastructure.metrics import observe_webhook
 from security.idempotency import idempotent
 from audit.logger import logger
 from security.webhook_signature import require_webhook_signature
-from decimal import Decimal, InvalidOperation
-from services.charge_state_machine import (
-    ChargeState,
-    InvalidChargeTransition,
-    transition_charge,
+from security.event_dedupe import get_event_dedupe
+from security.webhook_gate import GateResult, reserve_webhook_event, reserve_webhook_events
+from services.webhook_batch import (
+    InvalidWebhookBatch,
+    candidate_ids,
+    decide_batch,
+    fail_candidates,
+    parse_batch_body,
+    queue_finish,
+    settle_batch,
+    stream_results,
+    summary,
+    validate_events,
 )
+from services.charge_state_machine import ChargeState, transition_rows_where
+from services.webhook_processor import apply_paid_event, release_event, validate_event
+from services.webhook_stream import DEFAULT_STREAM_MAXLEN, enqueue_webhook_event, enqueue_webhook_events
 
 # Blueprint responsible for handling incoming payment webhooks
 webhooks_bp = Blueprint("webhooks", __name__)
 
-def to_decimal(value):
-    try:
-        return Decimal(str(value))
-    except (InvalidOperation, TypeError):
-        return None
+
+def count_outcome(f):
+    """
+    Counts the outcome of a single-event webhook in webhook_events_total
+    (outermost: rejected signatures and idempotent replays are counted too).
+    """
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        response = make_response(f(*args, **kwargs))
+        observe_webhook(
+            response.get_json(silent=True),
+            response.status_code,
+            replayed="Idempotent-Replayed" in response.headers,
+        )
+        return response
+    return wrapper
+
 
 @webhooks_bp.route("/webhooks/pix", methods=["POST"])
+@count_outcome
 @require_webhook_signature
 @idempotent(ttl=300)
 def pix_webhook():
@@ -36,6 +63,7 @@ def pix_webhook():
     - Prevent duplicated event processing (idempotency)
     - Validate payload integrity
     - Ensure charge is still valid using Redis TTL
+      (dedupe + TTL check + event reservation run as one atomic Redis script)
     - Update payment status in the database
     """
 
@@ -44,117 +72,137 @@ def pix_webhook():
     
     if not isinstance(data, dict):
         return jsonify({"error": "Invalid JSON payload"}), 400
-    
-    external_id = data.get("external_id")
-    value = data.get("value")
-    status = data.get("status")
-    event_id = data.get("event_id")
 
-    # Centralized safety guard: catch unexpected exceptions and ensure
-    # we return a controlled 500 while logging the full stack trace.
+    # 🧾 1. Extrai payload e valida campos mínimos (non-PAID events are ignored)
+    invalid = validate_event(data)
+    if invalid:
+        body, status = invalid
+        return jsonify(body), status
+
+    event_id = data["event_id"]
+    stream_mode = current_app.config.get("WEBHOOK_INGESTION_MODE") == "stream"
+
+    # 📤 2. Dedupe + validade da cobrança em UMA ida ao Redis (script Lua atômico).
+    # ✅ Dedupe only for PAID events (avoid blocking a later PAID for same event_id)
+    # The event key is reserved up front, which closes the check-then-set race
+    # between concurrent deliveries; it is released on any non-success outcome.
+    # In stream mode the same script also appends the event to the stream.
     try:
-        # 🧾 1. Extrai payload e valida campos mínimos
-        if not event_id:
-            return jsonify({"error": "event_id is required"}), 400
-
-        if not external_id or not value or not status:
-            return jsonify({"error": "Invalid payload"}), 400
-
-        if status != "PAID":
-            return jsonify({"message": "Ignored"}), 200
-        
-        # 📤 2. Ignora notificações que não representam pagamento concluído
-        # ✅ Dedupe only for PAID events (avoid blocking a later PAID for same event_id)
-        event_key = f"webhook:event:{event_id}"
-        try:
-            if redis_client.exists(event_key):
-                logger.info(
-                    "Duplicate webhook event ignored",
-                    extra={"event_id": event_id, "external_id": external_id}
-                )
-                return jsonify({"message": "Duplicate event ignored"}), 200
-        except Exception:
-            logger.exception(f"Redis check failed for event dedupe key={event_key}")
-            return jsonify({"error": "Service unavailable"}), 503
-
-        # 🔍 3. Busca charges
-        charge = Charge.query.filter_by(external_id=external_id).first()
-
-        if not charge:
-            logger.error(f"Charge not found | external_id={external_id}")
-            return jsonify({"error": "Charge not found"}), 404
-
-        if str(charge.status) in (ChargeState.PAID.value, ChargeState.EXPIRED.value):
-            logger.info(f"Ignored webhook for already finalized charge | id={charge.id} | status={charge.status}")
-            return jsonify({"message": "Charge already processed"}), 200
-
-        # 🔑 Chave Redis usada para controlar TTL/validade da cobrança.
-        ttl_key = f"charge:ttl:{external_id}"
-
-        # Redis é a fonte da verdade para validar se a cobrança ainda pode
-        # ser confirmada por webhook. Tratamos erros de conexão com Redis
-        # de forma explícita: se ocorrer um erro, respondemos 503.
-        try:
-            ttl_exists = redis_client.exists(ttl_key)
-        except Exception:
-            logger.exception(f"Redis check failed for ttl_key={ttl_key}")
-            return jsonify({"error": "Service unavailable"}), 503
-
-        if not ttl_exists:
-            try:
-                logger.warning(f"Webhook received but charge TTL missing/expired | id={charge.id}")
-                return jsonify({"message": "Expired charge ignored"}), 200
-
-            except InvalidChargeTransition:
-                logger.warning(
-                    f"Ignored webhook for non-pending charge | id={charge.id}"
-                )
-                return jsonify({"message": "Charge already processed"}), 200
-            except Exception:
-                logger.exception(f"Failed to mark charge expired | id={charge.id}")
-                return jsonify({"error": "Internal server error"}), 500
-      
-        # ...
-        value_dec = to_decimal(value)
-        charge_value_dec = to_decimal(charge.value)
-
-        if value_dec is None:
-            return jsonify({"error": "Invalid value type"}), 400
-
-        if value_dec != charge_value_dec:
-            logger.warning(f"Invalid value on webhook | charge_id={charge.id} | got={value_dec} expected={charge_value_dec}")
-            return jsonify({"error": "Invalid value"}), 400
-
-
-        try:
-            transition_charge(charge, ChargeState.PAID)
-        except InvalidChargeTransition:
-            logger.warning(f"Ignored webhook for non-pending charge | id={charge.id}")
-            return jsonify({"message": "Charge already processed"}), 200
-        except Exception:
-            logger.exception(f"Failed to commit payment for charge | id={charge.id}")
-            return jsonify({"error": "Internal server error"}), 500
-        
-        # Mark event as processed only after successful state transition
-        try:
-            redis_client.setex(event_key, 86400, "1")
-        except Exception:
-            logger.exception(
-                "Failed to persist webhook dedupe key after successful processing",
-                extra={"event_id": event_id, "external_id": external_id}
+        if stream_mode:
+            gate = enqueue_webhook_event(
+                redis_client,
+                data,
+                current_app.config.get("WEBHOOK_STREAM_MAXLEN", DEFAULT_STREAM_MAXLEN),
+                dedupe=get_event_dedupe(),
             )
+        else:
+            gate = reserve_webhook_event(redis_client, event_id, data["external_id"], dedupe=get_event_dedupe())
+    except Exception:
+        logger.exception("Redis webhook gate failed", extra={"event_id": event_id})
+        return jsonify({"error": "Service unavailable"}), 503
 
-        # Log informativo para auditoria / monitoramento.
+    if gate == GateResult.DUPLICATE:
         logger.info(
-            f"Payment confirmed via webhook", 
-            extra={"charge_id": charge.id, "external_id": external_id}
+            "Duplicate webhook event ignored",
+            extra={"event_id": event_id, "external_id": data["external_id"]}
         )
+        return jsonify({"message": "Duplicate event ignored"}), 200
+
+    if stream_mode:
+        if gate == GateResult.CHARGE_EXPIRED:
+            logger.warning("Webhook received but charge TTL missing/expired", extra={"external_id": data['external_id']})
+            return jsonify({"message": "Expired charge ignored"}), 200
+        # 3. Ack right away: the worker pool (webhook_worker.py) applies the transition
+        return jsonify({"message": "Event accepted"}), 202
 
-        return jsonify({"message": "Payment confirmed"}), 200
+    # 3. Charge lookup, amount check and PENDING -> PAID transition
+    body, status = apply_paid_event(redis_client, data, gate)
+    return jsonify(body), status
 
+
+@webhooks_bp.route("/webhooks/pix/batch", methods=["POST"])
+@require_webhook_signature
+@idempotent(ttl=300)
+def pix_webhook_batch():
+    """
+    Batched PIX webhook: {"events": [...]} under one signature (body may be
+    sent with Content-Encoding: gzip).
+
+    Same rules as /webhooks/pix, per event, but paid for once per batch:
+    one HMAC check, one pipelined dedupe/TTL gate, one query for all
+    external_ids, one commit and one pipeline for cache writes / releases.
+    Always answers 200 with one result per event, in request order; the bank
+    retries the events whose status is 5xx.
+    """
+    try:
+        events = parse_batch_body(request.get_data(), request.headers.get("Content-Encoding"))
+    except InvalidWebhookBatch as e:
+        return jsonify({"error": str(e)}), e.status
+
+    results, accepted = validate_events(events)
+    if not accepted:
+        return jsonify(summary(results)), 200
+
+    stream_mode = current_app.config.get("WEBHOOK_INGESTION_MODE") == "stream"
+    dedupe = get_event_dedupe()
+
+    try:
+        if stream_mode:
+            gates = enqueue_webhook_events(
+                redis_client,
+                [data for _, data in accepted],
+                current_app.config.get("WEBHOOK_STREAM_MAXLEN", DEFAULT_STREAM_MAXLEN),
+                dedupe=dedupe,
+            )
+        else:
+            gates = reserve_webhook_events(
+                redis_client, [(data["event_id"], data["external_id"]) for _, data in accepted], dedupe=dedupe
+            )
     except Exception:
-        # Fallback: log completo e resposta genérica. Não vaza detalhes.
-        logger.exception("Unhandled error processing PIX webhook")
-        return jsonify({"error": "Internal server error"}), 500
+        logger.exception("Redis webhook gate failed for batch", extra={"events": len(events)})
+        return jsonify({"error": "Service unavailable"}), 503
 
+    if stream_mode:
+        return jsonify(summary(stream_results(results, accepted, gates))), 200
 
+    try:
+        external_ids = {data["external_id"] for _, data in accepted}
+        charges = {
+            charge.external_id: charge
+            for charge in Charge.query.filter(Charge.external_id.in_(external_ids)).all()
+        }
+
+        terminal_cache = get_terminal_cache()
+        release, candidates = decide_batch(results, accepted, gates, charges, terminal_cache)
+
+        confirmed = []
+        if candidates:
+            # One conditional UPDATE for the whole batch: race-free against the
+            # sweeper, and only the rows it really moved are confirmed
+            try:
+                rows = transition_rows_where(ChargeState.PAID, Charge.id.in_(candidate_ids(candidates)))
+            except Exception:
+                logger.exception("Failed to commit webhook batch", extra={"events": len(candidates)})
+                fail_candidates(results, candidates, release)
+            else:
+                confirmed = settle_batch(results, candidates, rows, release)
+    except Exception:
+        logger.exception("Unhandled error processing PIX webhook batch")
+        for (_, data), gate in zip(accepted, gates):
+            release_event(redis_client, data["event_id"], gate == GateResult.RESERVED)
+        return jsonify({"error": "Internal server error"}), 500
+
+    # Releases + write-through of the new PAID representations in one round trip
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        if queue_finish(pipe, release, confirmed, terminal_cache, dedupe):
+            pipe.execute()
+    except Exception:
+        logger.exception("Failed to release reservations / write cache for webhook batch")
+
+    body = summary(results)
+    logger.info(
+        "Webhook batch processed",
+        extra={"events": len(events), "confirmed": body["confirmed"]}
+    )
+    return jsonify(body), 200
@@ -5,24 +5,31 @@ import os
 
 load_dotenv()
 
-def require_api_key(f):
-    @wraps(f)
-    def decorated(*args, **kwargs):
-        auth_header = request.headers.get("Authorization")
+def api_key_error(auth_header, expected_key):
+    """
+    Returns (message, status) when the Authorization header is not accepted, None otherwise.
+    Shared by the sync and asyncio decorators.
+    """
+    if not auth_header:
+        return "API key missing", 401
 
-        if not auth_header:
-            return jsonify({"error": "API key missing"}), 401
+    # Aceita padrão: Authorization: Bearer TOKEN
+    if auth_header.startswith("Bearer "):
+        api_key = auth_header.replace("Bearer ", "").strip()
+    else:
+        api_key = auth_header.strip()
 
-        # Aceita padrão: Authorization: Bearer TOKEN
-        if auth_header.startswith("Bearer "):
-            api_key = auth_header.replace("Bearer ", "").strip()
-        else:
-            api_key = auth_header.strip()
+    if not expected_key or api_key != expected_key:
+        return "Invalid API key", 403
 
-        expected_key = current_app.config.get("EXTERNAL_API_KEY")
+    return None
 
-        if api_key != expected_key:
-            return jsonify({"error": "Invalid API key"}), 403
+def require_api_key(f):
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        error = api_key_error(request.headers.get("Authorization"), current_app.config.get("EXTERNAL_API_KEY"))
+        if error:
+            return jsonify({"error": error[0]}), error[1]
 
         return f(*args, **kwargs)
-    return decorated
\ No newline at end of file
+    return decorated
@@ -0,0 +1,274 @@
+import hashlib
+import json
+import math
+import os
+import time
+
+from flask import current_app
+from redis.exceptions import ResponseError
+
+# Dedupe window for processed webhook events.
+EVENT_DEDUPE_TTL_SECONDS = 86400  # 24 hours
+
+DEFAULT_BUCKET_SECONDS = 3600
+BUCKET_KEY_PREFIX = "webhook:dedupe"
+
+# Bloom prefilter (bucketed backend only): bits per bucket, 0 disables it.
+# 2^20 bits (128 KiB) per bucket keeps ~1% false positives at 100k events/bucket.
+DEFAULT_PREFILTER_BITS = 0
+PREFILTER_HASHES = 4
+
+# How many keys the per-key report measures with MEMORY USAGE (all are counted).
+REPORT_SAMPLE_SIZE = 1000
+
+# Both backends are plugged into the gate / ingest scripts as two Lua functions,
+# called with the index of their first key and first argument:
+#   dedupe_seen(k, a)    -> true if the event was reserved within the window
+#   dedupe_reserve(k, a) -> marks the event as reserved now
+#
+# Per-key: KEYS[k] = webhook:event:{event_id}; ARGV[a] = dedupe TTL in seconds.
+KEY_DEDUPE_LUA = """
+local function dedupe_seen(k, a)
+    return redis.call('EXISTS', KEYS[k]) == 1
+end
+local function dedupe_reserve(k, a)
+    redis.call('SET', KEYS[k], '1', 'EX', ARGV[a])
+end
+"""
+
+# Bucketed: KEYS[k..] = bucket hashes (event_id -> reserved_at), newest first,
+# followed by one Bloom bitmap per bucket when the prefilter is on.
+# ARGV[a..] = event_id, now, window, expire_at of the newest bucket,
+#             number of Bloom bits, bit offsets...
+#
+# An entry counts only if reserved_at > now - window, which is exactly when the
+# per-key scheme's key would still exist; older entries in the oldest bucket
+# are ignored until the bucket is dropped wholesale by its EXPIREAT.
+BUCKET_DEDUPE_LUA = """
+local function dedupe_buckets(k, a)
+    local bits = tonumber(ARGV[a + 4])
+    local n = #KEYS - k + 1
+    if bits > 0 then
+        n = math.floor(n / 2)
+    end
+    return n, bits
+end
+local function dedupe_seen(k, a)
+    local n, bits = dedupe_buckets(k, a)
+    local cutoff = tonumber(ARGV[a + 1]) - tonumber(ARGV[a + 2])
+    for i = 0, n - 1 do
+        local maybe = true
+        for b = 1, bits do
+            if redis.call('GETBIT', KEYS[k + n + i], ARGV[a + 4 + b]) == 0 then
+                maybe = false
+                break
+            end
+        end
+        if maybe then
+            local reserved_at = redis.call('HGET', KEYS[k + i], ARGV[a])
+            if reserved_at and tonumber(reserved_at) > cutoff then
+                return true
+            end
+        end
+    end
+    return false
+end
+local function dedupe_reserve(k, a)
+    local n, bits = dedupe_buckets(k, a)
+    redis.call('HSET', KEYS[k], ARGV[a], ARGV[a + 1])
+    redis.call('EXPIREAT', KEYS[k], ARGV[a + 3])
+    for b = 1, bits do
+        redis.call('SETBIT', KEYS[k + n], ARGV[a + 4 + b], 1)
+    end
+    if bits > 0 then
+        redis.call('EXPIREAT', KEYS[k + n], ARGV[a + 3])
+    end
+end
+"""
+
+
+def event_key(event_id) -> str:
+    return f"webhook:event:{event_id}"
+
+
+class KeyEventDedupe:
+    """
+    One key per event (webhook:event:{event_id}, EX window). Simple, but each
+    event pays a full Redis key plus its expire entry.
+    """
+
+    name = "keys"
+    lua = KEY_DEDUPE_LUA
+
+    def __init__(self, window=EVENT_DEDUPE_TTL_SECONDS):
+        self.window = window
+
+    def keys(self, event_id, now) -> list:
+        return [event_key(event_id)]
+
+    def args(self, event_id, now) -> list:
+        return [self.window]
+
+    def release(self, pipe, event_id) -> None:
+        """Queues the removal of a reservation on a (sync or asyncio) pipeline."""
+        pipe.delete(event_key(event_id))
+
+    def memory_report(self, client, sample=REPORT_SAMPLE_SIZE) -> dict:
+        entries = 0
+        sampled = []
+        for key in client.scan_iter(match=event_key("*"), count=1000):
+            entries += 1
+            if len(sampled) < sample:
+                sampled.append(key)
+
+        sizes = [_memory_usage(client, key) for key in sampled]
+        sizes = [size for size in sizes if size is not None]
+        per_entry = sum(sizes) / len(sizes) if sizes else None
+        return {
+            "backend": self.name,
+            "window_seconds": self.window,
+            "entries": entries,
+            "bytes": round(per_entry * entries) if per_entry is not None else None,
+            "bytes_per_entry": round(per_entry, 1) if per_entry is not None else None,
+        }
+
+
+class BucketedEventDedupe:
+    """
+    One Redis hash per time bucket (webhook:dedupe:{bucket_start}), holding
+    event_id -> reserved_at. A bucket expires as a whole once its newest
+    possible entry left the window, so the keyspace holds window / bucket + 1
+    keys instead of one key per event.
+
+    Duplicate detection is the same as the per-key scheme: an event is a
+    duplicate iff it was reserved less than `window` seconds ago.
+    """
+
+    name = "buckets"
+    lua = BUCKET_DEDUPE_LUA
+
+    def __init__(self, window=EVENT_DEDUPE_TTL_SECONDS, bucket_seconds=DEFAULT_BUCKET_SECONDS, prefilter_bits=DEFAULT_PREFILTER_BITS):
+        if bucket_seconds <= 0:
+            raise ValueError("bucket_seconds must be positive")
+        self.window = window
+        self.bucket_seconds = bucket_seconds
+        self.prefilter_bits = prefilter_bits
+
+    def bucket_key(self, bucket) -> str:
+        return f"{BUCKET_KEY_PREFIX}:{bucket * self.bucket_seconds}"
+
+    def buckets(self, now) -> list:
+        """Bucket indexes overlapping [now - window, now], newest first."""
+        newest = math.floor(now / self.bucket_seconds)
+        oldest = math.floor((now - self.window) / self.bucket_seconds)
+        return list(range(newest, oldest - 1, -1))
+
+    def keys(self, event_id, now) -> list:
+        keys = [self.bucket_key(bucket) for bucket in self.buckets(now)]
+        if self.prefilter_bits:
+            keys += [f"{key}:bf" for key in keys]
+        return keys
+
+    def args(self, event_id, now) -> list:
+        newest = self.buckets(now)[0]
+        # The newest bucket's last entry must survive a full window
+        expire_at = (newest + 1) * self.bucket_seconds + self.window
+        offsets = self.prefilter_offsets(event_id) if self.prefilter_bits else []
+        return [event_id, f"{now:.3f}", self.window, expire_at, len(offsets), *offsets]
+
+    def prefilter_offsets(self, event_id) -> list:
+        digest = hashlib.sha256(str(event_id).encode()).digest()
+        return [
+            int.from_bytes(digest[i * 8:(i + 1) * 8], "big") % self.prefilter_bits
+            for i in range(PREFILTER_HASHES)
+        ]
+
+    def release(self, pipe, event_id, now=None) -> None:
+        """
+        Queues the removal of a reservation on a (sync or asyncio) pipeline.
+        The reservation may sit in any bucket of the window (stream workers
+        release late), so the field is dropped from all of them. Prefilter bits
+        stay set: a false positive only costs one HGET.
+        """
+        now = time.time() if now is None else now
+        for bucket in self.buckets(now):
+            pipe.hdel(self.bucket_key(bucket), event_id)
+
+    def memory_report(self, client, now=None) -> dict:
+        now = time.time() if now is None else now
+        buckets = []
+        for bucket in self.buckets(now):
+            key = self.bucket_key(bucket)
+            size = _memory_usage(client, key)
+            if self.prefilter_bits:
+                prefilter = _memory_usage(client, f"{key}:bf")
+                size = size + prefilter if size is not None and prefilter is not None else size
+            buckets.append({"key": key, "entries": client.hlen(key), "bytes": size, "ttl": client.ttl(key)})
+
+        entries = sum(bucket["entries"] for bucket in buckets)
+        sizes = [bucket["bytes"] for bucket in buckets if bucket["bytes"] is not None]
+        total = sum(sizes) if len(sizes) == len(buckets) else None
+        return {
+            "backend": self.name,
+            "window_seconds": self.window,
+            "bucket_seconds": self.bucket_seconds,
+            "prefilter_bits": self.prefilter_bits,
+            "entries": entries,
+            "bytes": total,
+            "bytes_per_entry": round(total / entries, 1) if total is not None and entries else None,
+            "buckets": buckets,
+        }
+
+
+def _memory_usage(client, key):
+    # MEMORY USAGE is not available everywhere (managed Redis, emulators)
+    try:
+        return client.memory_usage(key)
+    except ResponseError:
+        return None
+
+
+DEFAULT_EVENT_DEDUPE = KeyEventDedupe()
+
+
+def build_event_dedupe(backend="keys", bucket_seconds=DEFAULT_BUCKET_SECONDS, prefilter_bits=DEFAULT_PREFILTER_BITS):
+    if backend == "keys":
+        return DEFAULT_EVENT_DEDUPE
+    if backend == "buckets":
+        return BucketedEventDedupe(bucket_seconds=bucket_seconds, prefilter_bits=prefilter_bits)
+    raise ValueError(f"Unknown webhook dedupe backend: {backend}")
+
+
+def event_dedupe_for(app):
+    """
+    Returns the app's dedupe backend (WEBHOOK_DEDUPE_BACKEND, default "keys"),
+    creating it on first use.
+    """
+    dedupe = app.extensions.get("webhook_event_dedupe")
+    if dedupe is None:
+        dedupe = app.extensions.setdefault(
+            "webhook_event_dedupe",
+            build_event_dedupe(
+                app.config.get("WEBHOOK_DEDUPE_BACKEND", "keys"),
+                app.config.get("WEBHOOK_DEDUPE_BUCKET_SECONDS", DEFAULT_BUCKET_SECONDS),
+                app.config.get("WEBHOOK_DEDUPE_PREFILTER_BITS", DEFAULT_PREFILTER_BITS),
+            ),
+        )
+    return dedupe
+
+
+def get_event_dedupe():
+    return event_dedupe_for(current_app)
+
+
+if __name__ == "__main__":
+    # Memory report of the configured backend:
+    #   python -m security.event_dedupe
+    from infrastructure.redis_client import redis_client
+
+    dedupe = build_event_dedupe(
+        os.getenv("WEBHOOK_DEDUPE_BACKEND", "keys"),
+        int(os.getenv("WEBHOOK_DEDUPE_BUCKET_SECONDS", str(DEFAULT_BUCKET_SECONDS))),
+        int(os.getenv("WEBHOOK_DEDUPE_PREFILTER_BITS", str(DEFAULT_PREFILTER_BITS))),
+    )
+    print(json.dumps(dedupe.memory_report(redis_client), indent=2))
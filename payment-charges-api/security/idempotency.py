@@ -1,17 +1,126 @@
 from flask import request, jsonify, make_response
 from functools import wraps
+from audit.logger import logger
 from infrastructure.redis_client import redis_client
+from infrastructure.redis_lock import release_lock
 import json
+import time
+import uuid
 
+# While the first request for a key runs, the key holds this marker (+ owner token).
+IN_PROGRESS_PREFIX = "in_progress:"
 
-def idempotent(ttl=300):
+# How long an in-progress marker survives a worker that died mid-request.
+DEFAULT_LOCK_TTL_SECONDS = 30
+
+# Concurrent duplicates wait this long for the first request to finish, then get 409.
+DEFAULT_WAIT_SECONDS = 2.0
+WAIT_POLL_SECONDS = 0.05
+
+# Headers replayed together with status code and body.
+REPLAYED_HEADERS = ("Content-Type", "Location", "Retry-After")
+
+# Stores the final response only if the caller still owns the in-progress marker,
+# so a request whose marker already expired cannot overwrite another one's result.
+#
+# KEYS[1] = idempotency:{key}
+# ARGV[1] = in-progress marker
+# ARGV[2] = encoded response
+# ARGV[3] = TTL in seconds
+STORE_RESPONSE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+    return 1
+end
+return 0
+"""
+
+_store_script = None
+
+
+def idempotency_key(key) -> str:
+    return f"idempotency:{key}"
+
+
+def new_marker() -> str:
+    return f"{IN_PROGRESS_PREFIX}{uuid.uuid4().hex}"
+
+
+def is_in_progress(raw) -> bool:
+    return raw is not None and raw.startswith(IN_PROGRESS_PREFIX)
+
+
+def encode_response(status, headers, body: str) -> str:
+    return json.dumps({
+        "v": 1,
+        "status": status,
+        "headers": {name: headers[name] for name in REPLAYED_HEADERS if name in headers},
+        "body": body,
+    })
+
+
+def decode_response(raw):
+    """
+    Returns (status, headers, body) of a stored response.
+    Entries written before status/headers were stored only hold the JSON body.
     """
-    Idempotency decorator using Redis as the response cache.
+    record = json.loads(raw)
+    if isinstance(record, dict) and record.get("v") == 1:
+        return record["status"], record["headers"], record["body"]
+    return 200, {"Content-Type": "application/json"}, json.dumps(record)
+
+
+def should_store(status) -> bool:
+    # 5xx are not final: the key is released so the client can retry it
+    return status < 500
+
+
+def conflict_response():
+    return {"error": "A request with this Idempotency-Key is already in progress"}, 409, {"Retry-After": "1"}
+
+
+def _replay(raw):
+    status, headers, body = decode_response(raw)
+    response = make_response(body, status)
+    response.headers.update(headers)
+    response.headers["Idempotent-Replayed"] = "true"
+    return response
+
+
+def _store(redis_key, marker, response, ttl):
+    global _store_script
+    if _store_script is None:
+        _store_script = redis_client.register_script(STORE_RESPONSE_SCRIPT)
+    encoded = encode_response(response.status_code, response.headers, response.get_data(as_text=True))
+    try:
+        _store_script(keys=[redis_key], args=[marker, encoded, ttl], client=redis_client)
+    except Exception:
+        # The handler already ran: answer anyway, the marker expires after lock_ttl
+        logger.exception("Failed to store idempotent response", extra={"idempotency_key": redis_key})
+
+
+def _release(redis_key, marker):
+    try:
+        release_lock(redis_client, redis_key, marker)
+    except Exception:
+        logger.exception("Failed to release idempotency key", extra={"idempotency_key": redis_key})
+
+
+def idempotent(ttl=300, wait=DEFAULT_WAIT_SECONDS, lock_ttl=DEFAULT_LOCK_TTL_SECONDS):
+    """
+    Idempotency decorator using Redis as the response store.
 
     Contract:
     - Client MUST send 'Idempotency-Key' header for mutating operations.
-    - Same key within the TTL returns the same response payload, preventing duplicate side effects
-      (e.g., creating the same charge twice).
+    - The first request atomically reserves the key (SET NX with an in-progress
+      marker) and runs the handler; its status code, selected headers and body
+      are stored for `ttl` seconds.
+    - Same key within the TTL replays the stored response (same status code),
+      with `Idempotent-Replayed: true`.
+    - A duplicate arriving while the first one still runs waits up to `wait`
+      seconds for its result, then gets 409 (Retry-After: 1). The handler never
+      runs twice concurrently for the same key.
+    - 5xx responses are not stored: the key is released and a retry runs again.
     """
     def decorator(f):
         @wraps(f)
@@ -22,38 +131,37 @@ def idempotent(ttl=300):
             if not key:
                 return jsonify({"error": "Idempotency-Key missing"}), 400
 
-            redis_key = f"idempotency:{key}"
-
-            # If we have a cached response, return it immediately (idempotent replay)
-            cached = redis_client.get(redis_key)
-            if cached:
-                return jsonify(json.loads(cached))
+            redis_key = idempotency_key(key)
+            marker = new_marker()
+            deadline = time.monotonic() + wait
 
-            # Execute the original handler (first-time request for this key)
-            response = f(*args, **kwargs)
+            # Reserve the key, or replay / wait for the request that holds it
+            while not redis_client.set(redis_key, marker, nx=True, ex=lock_ttl):
+                cached = redis_client.get(redis_key)
+                if cached is not None and not is_in_progress(cached):
+                    return _replay(cached)
+                if cached is None:
+                    # Released (5xx) or expired meanwhile: try to take it
+                    continue
+                if time.monotonic() >= deadline:
+                    body, status, headers = conflict_response()
+                    return jsonify(body), status, headers
+                time.sleep(WAIT_POLL_SECONDS)
 
-            # Normalize Flask responses:
-            # - View functions may return (json, status), Response objects, etc.
-            # - make_response ensures we always have a proper Response to inspect.
-            flask_response = make_response(response)
+            try:
+                # Execute the original handler (first-time request for this key)
+                # make_response normalizes (json, status), Response objects, etc.
+                flask_response = make_response(f(*args, **kwargs))
+            except Exception:
+                _release(redis_key, marker)
+                raise
 
-            # NOTE: We cache only the JSON body. If you need strict replay semantics,
-            # you may also store the status code and headers.
-            data = flask_response.get_json()
-
-            # Store the response for a limited time:
-            # - Prevents duplicate side effects within TTL
-            # - Keeps Redis usage bounded
-            redis_client.setex(
-                redis_key,
-                ttl,
-                json.dumps(data)
-            )
+            if should_store(flask_response.status_code):
+                _store(redis_key, marker, flask_response, ttl)
+            else:
+                _release(redis_key, marker)
 
             return flask_response
 
         return wrapper
     return decorator
-
-
-
@@ -0,0 +1,130 @@
+import time
+from enum import IntEnum
+
+from security.event_dedupe import (  # noqa: F401 (EVENT_DEDUPE_TTL_SECONDS / event_key re-exported)
+    DEFAULT_EVENT_DEDUPE,
+    EVENT_DEDUPE_TTL_SECONDS,
+    KEY_DEDUPE_LUA,
+    event_key,
+)
+
+# Server-side gate executed atomically by Redis (single round trip):
+# 1. event already seen      -> DUPLICATE (nothing is written)
+# 2. charge TTL key missing  -> CHARGE_EXPIRED (nothing is written)
+# 3. otherwise the event is reserved for the dedupe window -> RESERVED
+#
+# Because check and reservation happen inside one script, two concurrent
+# deliveries of the same event can never both get RESERVED.
+#
+# Only the event gate is a single round trip: @idempotent (security/idempotency.py)
+# still reserves the Idempotency-Key and stores the response with calls of its own.
+#
+# KEYS[1]  = charge:ttl:{external_id}
+# KEYS[2..], ARGV[1..] = dedupe backend (see security/event_dedupe.py)
+GATE_LUA = """
+if dedupe_seen(2, 1) then
+    return 0
+end
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 2
+end
+dedupe_reserve(2, 1)
+return 1
+"""
+
+# Gate with the default (per-key) dedupe backend
+WEBHOOK_GATE_SCRIPT = KEY_DEDUPE_LUA + GATE_LUA
+
+
+class GateResult(IntEnum):
+    DUPLICATE = 0
+    RESERVED = 1
+    CHARGE_EXPIRED = 2
+
+
+# redis-py Script objects (EVALSHA with automatic fallback to EVAL on NOSCRIPT),
+# by source. Created lazily and always invoked with an explicit client.
+_scripts = {}
+_scripts_async = {}
+
+
+def registered(cache, client, source):
+    script = cache.get(source)
+    if script is None:
+        script = cache[source] = client.register_script(source)
+    return script
+
+
+def charge_ttl_key(external_id) -> str:
+    return f"charge:ttl:{external_id}"
+
+
+def _gate(client, cache, event_id, external_id, dedupe, now):
+    script = registered(cache, client, dedupe.lua + GATE_LUA)
+    call = {
+        "keys": [charge_ttl_key(external_id), *dedupe.keys(event_id, now)],
+        "args": dedupe.args(event_id, now),
+    }
+    return script, call
+
+
+def reserve_webhook_event(client, event_id, external_id, dedupe=DEFAULT_EVENT_DEDUPE) -> GateResult:
+    """
+    Runs the dedupe check, the charge TTL check and the event reservation in one
+    atomic Redis call.
+
+    A RESERVED event is already marked as processed for the whole dedupe window:
+    callers MUST call release_webhook_event() if processing does not end in a
+    successful state transition, so the bank can retry the same event.
+    """
+    script, call = _gate(client, _scripts, event_id, external_id, dedupe, time.time())
+    return GateResult(int(script(client=client, **call)))
+
+
+async def reserve_webhook_event_async(client, event_id, external_id, dedupe=DEFAULT_EVENT_DEDUPE) -> GateResult:
+    """
+    Same as reserve_webhook_event() for a redis.asyncio client (ASGI mode).
+    """
+    script, call = _gate(client, _scripts_async, event_id, external_id, dedupe, time.time())
+    return GateResult(int(await script(client=client, **call)))
+
+
+def reserve_webhook_events(client, events, dedupe=DEFAULT_EVENT_DEDUPE) -> list:
+    """
+    Batch form of reserve_webhook_event(): one pipelined round trip for all
+    (event_id, external_id) pairs. Scripts run in order, so a repeated event_id
+    inside the same batch comes back as DUPLICATE.
+    """
+    now = time.time()
+    pipe = client.pipeline(transaction=False)
+    for event_id, external_id in events:
+        script, call = _gate(client, _scripts, event_id, external_id, dedupe, now)
+        script(client=pipe, **call)
+    return [GateResult(int(result)) for result in pipe.execute()]
+
+
+async def reserve_webhook_events_async(client, events, dedupe=DEFAULT_EVENT_DEDUPE) -> list:
+    """
+    Same as reserve_webhook_events() for a redis.asyncio client (ASGI mode).
+    """
+    now = time.time()
+    async with client.pipeline(transaction=False) as pipe:
+        for event_id, external_id in events:
+            script, call = _gate(client, _scripts_async, event_id, external_id, dedupe, now)
+            await script(client=pipe, **call)
+        return [GateResult(int(result)) for result in await pipe.execute()]
+
+
+def release_webhook_event(client, event_id, dedupe=DEFAULT_EVENT_DEDUPE) -> None:
+    """
+    Drops a reservation made by reserve_webhook_event().
+    """
+    pipe = client.pipeline(transaction=False)
+    dedupe.release(pipe, event_id)
+    pipe.execute()
+
+
+async def release_webhook_event_async(client, event_id, dedupe=DEFAULT_EVENT_DEDUPE) -> None:
+    async with client.pipeline(transaction=False) as pipe:
+        dedupe.release(pipe, event_id)
+        await pipe.execute()
@@ -2,7 +2,9 @@ import hmac
 import hashlib
 import time
 from flask import request, current_app, jsonify
-from functools import wraps
+from functools import lru_cache, wraps
+
+from infrastructure.metrics import observe_signature_match
 
 # Maximum allowed time difference (in seconds) between
 # the webhook event timestamp and the server time.
@@ -10,9 +12,66 @@ from functools import wraps
 TOLERANCE_SECONDS = 300  # 5 minutes
 
 
-def verify_webhook_signature():
+def secret_label(index) -> str:
+    # Position in the active set, never the secret itself: "current", "previous", "previous_2"...
+    if index == 0:
+        return "current"
+    return "previous" if index == 1 else f"previous_{index}"
+
+
+class Keyring:
+    """
+    Ordered set of active HMAC secrets (current first, then the previous ones
+    still accepted during a rotation).
+
+    Each secret is keyed once into an HMAC object; a check copy()-es it and
+    only hashes the body. The secret that matched last is tried first, so
+    while the bank still signs with the previous secret the common case is
+    still a single HMAC.
+    """
+
+    def __init__(self, secrets):
+        self._keyed = [hmac.new(secret.encode(), digestmod=hashlib.sha256) for secret in secrets]
+        self._last = 0
+
+    def __len__(self):
+        return len(self._keyed)
+
+    def match(self, signature, payload: bytes):
+        """
+        Index of the secret that produced `signature` over `payload`, or None.
+        """
+        last = self._last
+        for index in (last, *(i for i in range(len(self._keyed)) if i != last)):
+            mac = self._keyed[index].copy()
+            mac.update(payload)
+            # Constant-time comparison to prevent timing attacks
+            if hmac.compare_digest(signature, f"sha256={mac.hexdigest()}"):
+                self._last = index
+                return index
+        return None
+
+
+@lru_cache(maxsize=16)
+def _keyring(secrets: tuple) -> Keyring:
+    # One per process and secret set: keyed once, reused by every request
+    return Keyring(secrets)
+
+
+def webhook_secrets(config) -> tuple:
+    """
+    Active webhook secrets from the app config: WEBHOOK_SECRET first, then
+    WEBHOOK_SECRET_PREVIOUS (kept while the bank moves to the new secret).
+    """
+    return (config["WEBHOOK_SECRET"], *config.get("WEBHOOK_SECRET_PREVIOUS", ()))
+
+
+def signature_match(signature, timestamp, payload: bytes, secrets):
     """
-    Verifies the authenticity and freshness of a webhook request.
+    Framework-agnostic signature check shared by the Flask and ASGI modes.
+    `secrets` is one secret or an ordered sequence of them.
+
+    Returns the index of the matching secret, or None when the request is rejected.
 
     Security checks:
     - Validates the presence of required headers
@@ -20,12 +79,9 @@ def verify_webhook_signature():
     - Validates the HMAC signature using the raw request body
     """
 
-    signature = request.headers.get("X-Signature")
-    timestamp = request.headers.get("X-Timestamp")
-
     # Required headers must be present
     if not signature or not timestamp:
-        return False
+        return None
 
     # ⏱ Replay attack protection
     # Reject requests outside the allowed time window
@@ -33,27 +89,36 @@ def verify_webhook_signature():
     try:
         timestamp = int(timestamp)
     except ValueError:
-        return False
+        return None
 
     if abs(now - timestamp) > TOLERANCE_SECONDS:
-        return False
+        return None
+
+    if isinstance(secrets, str):
+        secrets = (secrets,)
+    return _keyring(tuple(secrets)).match(signature, payload)
+
+
+def is_valid_signature(signature, timestamp, payload: bytes, secret) -> bool:
+    return signature_match(signature, timestamp, payload, secret) is not None
+
+
+def verify_webhook_signature():
+    """
+    Verifies the authenticity and freshness of the current Flask request.
+    """
 
     # Raw request body must be used for signature validation
-    payload = request.get_data()
-    secret = current_app.config["WEBHOOK_SECRET"].encode()
-
-    # Generate expected HMAC signature
-    expected_signature = hmac.new(
-        secret,
-        payload,
-        hashlib.sha256
-    ).hexdigest()
-
-    # Constant-time comparison to prevent timing attacks
-    return hmac.compare_digest(
-        signature,
-        f"sha256={expected_signature}"
+    index = signature_match(
+        request.headers.get("X-Signature"),
+        request.headers.get("X-Timestamp"),
+        request.get_data(),
+        webhook_secrets(current_app.config),
     )
+    if index is None:
+        return False
+    observe_signature_match(secret_label(index))
+    return True
 
 
 def require_webhook_signature(f):
@@ -69,6 +134,3 @@ def require_webhook_signature(f):
         return f(*args, **kwargs)
 
     return decorated
-
-
-
@@ -0,0 +1,245 @@
+import asyncio
+import json
+import math
+import random
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from dataclasses import dataclass
+
+from exceptions.charge_exceptions import ChargeTemporarilyUnavailable
+from infrastructure.metrics import CHARGE_CACHE_LOOKUPS
+from infrastructure.redis_lock import (
+    acquire_lock,
+    acquire_lock_async,
+    release_lock,
+    release_lock_async,
+)
+
+# Freshness window of a cached charge representation. Every state change writes the
+# new representation through (see write_through), so this only bounds how long an
+# untouched entry lives. PENDING entries are additionally capped by the time left
+# until the charge deadline, so they never outlive the charge.
+CACHE_TTL_SECONDS = 3600
+
+# Entries stay in Redis this long after going stale, so they can be served while
+# a single caller recomputes them.
+STALE_GRACE_SECONDS = 30
+
+# Cross-process recompute lock (one recompute per key across all workers).
+RECOMPUTE_LOCK_MS = 2000
+
+# How long a caller waits for someone else's recompute before giving up.
+FOLLOWER_WAIT_SECONDS = 0.25
+_POLL_INTERVAL_SECONDS = 0.02
+
+# XFetch beta: >0 enables probabilistic early refresh (refresh probability grows as
+# the entry approaches expiry, scaled by how long the last recompute took); 0 disables it.
+EARLY_REFRESH_BETA = 1.0
+
+
+def cache_key(charge_id) -> str:
+    return f"charge:{charge_id}"
+
+
+@dataclass
+class CacheEntry:
+    payload: dict
+    soft_expires_at: float
+    delta: float
+
+    def is_fresh(self, now, beta=EARLY_REFRESH_BETA) -> bool:
+        if beta <= 0 or self.delta <= 0:
+            return now < self.soft_expires_at
+        # -log(U) is exponentially distributed: most callers see the entry as fresh
+        # until very close to expiry, and only a few refresh it early.
+        return now + self.delta * beta * -math.log(1.0 - random.random()) < self.soft_expires_at
+
+
+def encode_entry(payload, delta, ttl=CACHE_TTL_SECONDS, now=None) -> str:
+    now = time.time() if now is None else now
+    return json.dumps({"data": payload, "soft_exp": now + ttl, "delta": delta})
+
+
+def decode_entry(raw):
+    if not raw:
+        return None
+    obj = json.loads(raw)
+    if isinstance(obj, dict) and "data" in obj and "soft_exp" in obj:
+        return CacheEntry(obj["data"], float(obj["soft_exp"]), float(obj.get("delta", 0)))
+    # Entry written before the envelope format: fresh until its Redis TTL expires.
+    return CacheEntry(obj, math.inf, 0.0)
+
+
+def write_entry(client, charge_id, payload, delta=0.0, ttl=CACHE_TTL_SECONDS) -> None:
+    client.setex(cache_key(charge_id), ttl + STALE_GRACE_SECONDS, encode_entry(payload, delta, ttl))
+
+
+def cache_ttl_for(payload, remaining_charge_ttl=None) -> int:
+    """
+    Cache TTL for a representation. `remaining_charge_ttl` is the time (seconds) left
+    until the charge deadline; only relevant while the charge is PENDING.
+    """
+    if payload.get("status") == "PENDING" and remaining_charge_ttl is not None:
+        return max(1, min(CACHE_TTL_SECONDS, int(remaining_charge_ttl)))
+    return CACHE_TTL_SECONDS
+
+
+def write_through(client, payload, remaining_charge_ttl=None) -> None:
+    """
+    Stores the fresh representation after a create or a state transition, so readers
+    never see the previous state and never need the DB to learn the new one.
+    """
+    write_entry(client, payload["id"], payload, ttl=cache_ttl_for(payload, remaining_charge_ttl))
+
+
+async def write_through_async(client, payload, remaining_charge_ttl=None) -> None:
+    ttl = cache_ttl_for(payload, remaining_charge_ttl)
+    await client.setex(cache_key(payload["id"]), ttl + STALE_GRACE_SECONDS, encode_entry(payload, 0.0, ttl))
+
+
+# In-process single flight: one Future per key being recomputed by this worker.
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+
+def get_charge_cached(client, charge_id, loader, beta=EARLY_REFRESH_BETA):
+    """
+    Read-through cache for a charge representation with stampede protection.
+
+    `loader()` rebuilds the representation from the DB and returns (payload, ttl),
+    or (None, None) when the charge does not exist. When
+    the entry is missing or stale, only one caller per process runs it (others wait
+    on its Future) and only one process at a time (short Redis lock); callers that
+    lose the race get the stale value when there is one, or wait briefly for the
+    fresh one. The DB is never read without holding the lock: a caller left with
+    nothing to serve raises ChargeTemporarilyUnavailable (503, client retries).
+    """
+    key = cache_key(charge_id)
+    entry = decode_entry(client.get(key))
+    if entry and entry.is_fresh(time.time(), beta):
+        CHARGE_CACHE_LOOKUPS.labels("hit").inc()
+        return entry.payload
+    CHARGE_CACHE_LOOKUPS.labels("stale" if entry else "miss").inc()
+
+    with _inflight_lock:
+        future = _inflight.get(key)
+        leader = future is None
+        if leader:
+            future = _inflight[key] = Future()
+
+    if not leader:
+        try:
+            return future.result(timeout=FOLLOWER_WAIT_SECONDS)
+        except FutureTimeout:
+            return _stale_or_unavailable(charge_id, entry)
+
+    try:
+        payload = _recompute(client, charge_id, loader, entry)
+    except BaseException as exc:
+        future.set_exception(exc)
+        raise
+    else:
+        future.set_result(payload)
+        return payload
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+
+
+def _recompute(client, charge_id, loader, stale):
+    key = cache_key(charge_id)
+    lock_key = f"lock:{key}"
+
+    token = acquire_lock(client, lock_key, RECOMPUTE_LOCK_MS)
+    if token is None:
+        # Another worker is already recomputing this key.
+        if stale:
+            return stale.payload
+        deadline = time.monotonic() + FOLLOWER_WAIT_SECONDS
+        while time.monotonic() < deadline:
+            time.sleep(_POLL_INTERVAL_SECONDS)
+            entry = decode_entry(client.get(key))
+            if entry:
+                return entry.payload
+        return _stale_or_unavailable(charge_id, None)
+
+    try:
+        started = time.perf_counter()
+        payload, ttl = loader()
+        if payload is not None:
+            write_entry(client, charge_id, payload, delta=time.perf_counter() - started, ttl=ttl)
+        return payload
+    finally:
+        release_lock(client, lock_key, token)
+
+
+def _stale_or_unavailable(charge_id, stale):
+    # Lost the race and the winner is still loading: never a second DB read
+    if stale:
+        return stale.payload
+    raise ChargeTemporarilyUnavailable(f"Charge {charge_id} is being refreshed, retry shortly")
+
+
+# asyncio flavour for the ASGI mode: same protocol, asyncio Futures instead of threads.
+_inflight_async = {}
+
+
+async def get_charge_cached_async(client, charge_id, loader, beta=EARLY_REFRESH_BETA):
+    key = cache_key(charge_id)
+    entry = decode_entry(await client.get(key))
+    if entry and entry.is_fresh(time.time(), beta):
+        CHARGE_CACHE_LOOKUPS.labels("hit").inc()
+        return entry.payload
+    CHARGE_CACHE_LOOKUPS.labels("stale" if entry else "miss").inc()
+
+    future = _inflight_async.get(key)
+    if future is not None:
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), FOLLOWER_WAIT_SECONDS)
+        except asyncio.TimeoutError:
+            return _stale_or_unavailable(charge_id, entry)
+
+    future = _inflight_async[key] = asyncio.get_running_loop().create_future()
+    try:
+        payload = await _recompute_async(client, charge_id, loader, entry)
+    except BaseException as exc:
+        future.set_exception(exc)
+        # Mark the exception as retrieved when nobody was waiting for it
+        future.exception()
+        raise
+    else:
+        future.set_result(payload)
+        return payload
+    finally:
+        _inflight_async.pop(key, None)
+
+
+async def _recompute_async(client, charge_id, loader, stale):
+    key = cache_key(charge_id)
+    lock_key = f"lock:{key}"
+
+    token = await acquire_lock_async(client, lock_key, RECOMPUTE_LOCK_MS)
+    if token is None:
+        if stale:
+            return stale.payload
+        deadline = time.monotonic() + FOLLOWER_WAIT_SECONDS
+        while time.monotonic() < deadline:
+            await asyncio.sleep(_POLL_INTERVAL_SECONDS)
+            entry = decode_entry(await client.get(key))
+            if entry:
+                return entry.payload
+        return _stale_or_unavailable(charge_id, None)
+
+    try:
+        started = time.perf_counter()
+        payload, ttl = await loader()
+        if payload is not None:
+            await client.setex(
+                cache_key(charge_id),
+                ttl + STALE_GRACE_SECONDS,
+                encode_entry(payload, time.perf_counter() - started, ttl),
+            )
+        return payload
+    finally:
+        await release_lock_async(client, lock_key, token)
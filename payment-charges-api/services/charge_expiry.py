@@ -0,0 +1,326 @@
+import asyncio
+import threading
+import time
+
+
+from audit.logger import logger
+from db_models.charges import Charge
+from infrastructure.redis_lock import (
+    acquire_lock,
+    acquire_lock_async,
+    release_lock,
+    release_lock_async,
+    renew_lock,
+    renew_lock_async,
+)
+from services.charge_cache import STALE_GRACE_SECONDS, cache_key, cache_ttl_for, encode_entry, write_through
+from services.charge_state_machine import ChargeState, try_transition_rows
+from services.money import from_cents
+
+# Sorted set of pending deadlines: member = external_id, score = expiry epoch (seconds).
+EXPIRY_ZSET_KEY = "charge:expiry"
+
+# Leader lock: only one worker (across processes / hosts) sweeps at a time.
+SWEEPER_LOCK_KEY = "lock:charge-expiry-sweeper"
+
+# Set while a PAID event accepted in stream mode waits for the worker pool; the
+# sweeper postpones those charges instead of expiring them (see webhook_stream.py).
+PAYING_RECHECK_SECONDS = 30
+
+DEFAULT_SWEEP_INTERVAL_SECONDS = 5.0
+DEFAULT_SWEEP_CHUNK = 500
+
+# Upper bound of chunks per tick, so a large backlog never starves the heartbeat.
+MAX_CHUNKS_PER_TICK = 20
+
+# Atomically takes up to ARGV[2] members whose deadline is <= ARGV[1].
+# Popping (instead of reading) makes a chunk owned by exactly one sweeper even
+# if two of them ever overlap during a leader change.
+#
+# KEYS[1] = charge:expiry
+# ARGV[1] = now (epoch seconds)
+# ARGV[2] = chunk size
+POP_DUE_SCRIPT = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+if #due > 0 then
+    redis.call('ZREM', KEYS[1], unpack(due))
+end
+return due
+"""
+
+_pop_script = None
+_pop_script_async = None
+
+
+def paying_key(external_id) -> str:
+    return f"charge:paying:{external_id}"
+
+
+def payment_queued(client, external_id) -> bool:
+    """
+    True while a PAID event for the charge waits in the stream (marker set at
+    ingestion). Read paths must not expire such a charge on their own. A Redis
+    error counts as queued: the sweeper decides once Redis is back.
+    """
+    try:
+        return any(client.mget([paying_key(external_id)]))
+    except Exception:
+        logger.exception("Failed to read in-flight payment marker", extra={"external_id": external_id})
+        return True
+
+
+async def payment_queued_async(client, external_id) -> bool:
+    try:
+        return any(await client.mget([paying_key(external_id)]))
+    except Exception:
+        logger.exception("Failed to read in-flight payment marker", extra={"external_id": external_id})
+        return True
+
+
+def _postponed(popped, markers, now) -> dict:
+    # Charges with a queued payment are re-checked later instead of expired
+    return {
+        external_id: now + PAYING_RECHECK_SECONDS
+        for external_id, marker in zip(popped, markers)
+        if marker
+    }
+
+
+def schedule_expiry(client, deadlines) -> None:
+    """
+    Records {external_id: deadline_epoch} in the expiry set.
+    Works on a client or a pipeline (one ZADD for the whole mapping).
+    """
+    client.zadd(EXPIRY_ZSET_KEY, deadlines)
+
+
+def pop_due(client, now, chunk_size=DEFAULT_SWEEP_CHUNK):
+    global _pop_script
+    if _pop_script is None:
+        _pop_script = client.register_script(POP_DUE_SCRIPT)
+    return list(_pop_script(keys=[EXPIRY_ZSET_KEY], args=[now, chunk_size], client=client))
+
+
+async def pop_due_async(client, now, chunk_size=DEFAULT_SWEEP_CHUNK):
+    global _pop_script_async
+    if _pop_script_async is None:
+        _pop_script_async = client.register_script(POP_DUE_SCRIPT)
+    return list(await _pop_script_async(keys=[EXPIRY_ZSET_KEY], args=[now, chunk_size], client=client))
+
+
+def expire_pending(connection, external_ids):
+    """
+    Expires every charge of the chunk that is still PENDING with ONE bulk UPDATE.
+    Charges paid in the meantime are left untouched by the status filter.
+
+    Returns [(id, amount_cents)] of the rows actually expired. Takes a sync Connection,
+    so the asyncio mode reuses it through AsyncConnection.run_sync().
+    """
+    if not external_ids:
+        return []
+
+    # Same conditional UPDATE as every other transition (status IN the allowed sources)
+    rows = try_transition_rows(
+        connection,
+        ChargeState.EXPIRED,
+        Charge.external_id.in_(external_ids),
+        returning=(Charge.id, Charge.amount_cents),
+    )
+    return [tuple(row) for row in rows]
+
+
+def _expired_payload(charge_id, amount_cents):
+    return {
+        "id": charge_id,
+        "value": from_cents(amount_cents),
+        "amount_cents": amount_cents,
+        "status": ChargeState.EXPIRED.value,
+    }
+
+
+def sweep_due_charges(client, engine, now=None, chunk_size=DEFAULT_SWEEP_CHUNK) -> int:
+    """
+    Pops due deadlines in chunks and expires them (one UPDATE per chunk). The new
+    EXPIRED representation is written over charge:{id}, replacing the cached PENDING one.
+
+    If the UPDATE fails the chunk is put back as due, so no deadline is lost.
+    Returns the number of charges expired.
+    """
+    now = now or time.time()
+    expired = 0
+
+    for _ in range(MAX_CHUNKS_PER_TICK):
+        popped = pop_due(client, now, chunk_size)
+        if not popped:
+            break
+
+        postponed = _postponed(popped, client.mget([paying_key(external_id) for external_id in popped]), now)
+        if postponed:
+            schedule_expiry(client, postponed)
+        due = [external_id for external_id in popped if external_id not in postponed]
+
+        try:
+            with engine.begin() as connection:
+                rows = expire_pending(connection, due)
+        except Exception:
+            schedule_expiry(client, {external_id: now for external_id in due})
+            raise
+
+        if rows:
+            pipe = client.pipeline(transaction=False)
+            for charge_id, amount_cents in rows:
+                write_through(pipe, _expired_payload(charge_id, amount_cents))
+            pipe.execute()
+
+        expired += len(rows)
+        if len(popped) < chunk_size:
+            break
+
+    return expired
+
+
+async def sweep_due_charges_async(client, engine, now=None, chunk_size=DEFAULT_SWEEP_CHUNK) -> int:
+    """
+    Same as sweep_due_charges() for redis.asyncio + an AsyncEngine (ASGI mode).
+    """
+    now = now or time.time()
+    expired = 0
+
+    for _ in range(MAX_CHUNKS_PER_TICK):
+        popped = await pop_due_async(client, now, chunk_size)
+        if not popped:
+            break
+
+        postponed = _postponed(popped, await client.mget([paying_key(external_id) for external_id in popped]), now)
+        if postponed:
+            await client.zadd(EXPIRY_ZSET_KEY, postponed)
+        due = [external_id for external_id in popped if external_id not in postponed]
+
+        try:
+            async with engine.begin() as connection:
+                rows = await connection.run_sync(expire_pending, due)
+        except Exception:
+            await client.zadd(EXPIRY_ZSET_KEY, {external_id: now for external_id in due})
+            raise
+
+        if rows:
+            async with client.pipeline(transaction=False) as pipe:
+                for charge_id, amount_cents in rows:
+                    payload = _expired_payload(charge_id, amount_cents)
+                    ttl = cache_ttl_for(payload)
+                    pipe.setex(cache_key(charge_id), ttl + STALE_GRACE_SECONDS, encode_entry(payload, 0.0, ttl))
+                await pipe.execute()
+
+        expired += len(rows)
+        if len(popped) < chunk_size:
+            break
+
+    return expired
+
+
+def _lock_ttl_ms(interval) -> int:
+    # Survives a couple of missed heartbeats before another worker takes over
+    return int(max(interval * 3, 10) * 1000)
+
+
+class ExpirySweeper(threading.Thread):
+    """
+    Background thread started by every worker; the Redis lock elects one leader
+    that sweeps every `interval` seconds and renews its lock on each tick.
+    The others only retry the lock, so a dead leader is replaced within the lock TTL.
+    """
+
+    def __init__(self, client, engine, interval=DEFAULT_SWEEP_INTERVAL_SECONDS, chunk_size=DEFAULT_SWEEP_CHUNK):
+        super().__init__(name="charge-expiry-sweeper", daemon=True)
+        self.client = client
+        self.engine = engine
+        self.interval = interval
+        self.chunk_size = chunk_size
+        self._token = None
+        self._stopped = threading.Event()
+
+    def is_leader(self) -> bool:
+        ttl_ms = _lock_ttl_ms(self.interval)
+        if self._token and not renew_lock(self.client, SWEEPER_LOCK_KEY, self._token, ttl_ms):
+            self._token = None
+        if not self._token:
+            self._token = acquire_lock(self.client, SWEEPER_LOCK_KEY, ttl_ms)
+        return self._token is not None
+
+    def tick(self) -> int:
+        if not self.is_leader():
+            return 0
+        expired = sweep_due_charges(self.client, self.engine, chunk_size=self.chunk_size)
+        if expired:
+            logger.info("Charges expired by sweeper", extra={"count": expired})
+        return expired
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.tick()
+            except Exception:
+                # Redis or DB unavailable: keep the loop alive, the next tick retries
+                logger.exception("Expiry sweep failed")
+
+    def stop(self):
+        self._stopped.set()
+        if self._token:
+            try:
+                release_lock(self.client, SWEEPER_LOCK_KEY, self._token)
+            except Exception:
+                pass
+            self._token = None
+
+
+def start_expiry_sweeper(app, client):
+    """
+    Starts the sweeper thread for a Flask app when EXPIRY_SWEEPER_ENABLED is set.
+    """
+    if not app.config.get("EXPIRY_SWEEPER_ENABLED"):
+        return None
+
+    from repository.database import db
+
+    with app.app_context():
+        engine = db.engine
+
+    sweeper = ExpirySweeper(
+        client,
+        engine,
+        interval=app.config.get("EXPIRY_SWEEP_INTERVAL_SECONDS", DEFAULT_SWEEP_INTERVAL_SECONDS),
+        chunk_size=app.config.get("EXPIRY_SWEEP_CHUNK", DEFAULT_SWEEP_CHUNK),
+    )
+    sweeper.start()
+    app.extensions["expiry_sweeper"] = sweeper
+    return sweeper
+
+
+async def run_expiry_sweeper_async(client, engine, interval=DEFAULT_SWEEP_INTERVAL_SECONDS, chunk_size=DEFAULT_SWEEP_CHUNK):
+    """
+    asyncio counterpart of ExpirySweeper.run() (started as a task by the ASGI app).
+    """
+    token = None
+    ttl_ms = _lock_ttl_ms(interval)
+    try:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if token and not await renew_lock_async(client, SWEEPER_LOCK_KEY, token, ttl_ms):
+                    token = None
+                if not token:
+                    token = await acquire_lock_async(client, SWEEPER_LOCK_KEY, ttl_ms)
+                if not token:
+                    continue
+
+                expired = await sweep_due_charges_async(client, engine, chunk_size=chunk_size)
+                if expired:
+                    logger.info("Charges expired by sweeper", extra={"count": expired})
+            except Exception:
+                logger.exception("Expiry sweep failed")
+    finally:
+        if token:
+            try:
+                await release_lock_async(client, SWEEPER_LOCK_KEY, token)
+            except Exception:
+                pass
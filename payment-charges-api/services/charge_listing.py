@@ -0,0 +1,118 @@
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import select, tuple_
+
+from db_models.charges import Charge, ChargeStatus
+from services.money import from_cents
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class InvalidListQuery(ValueError):
+    """Raised for malformed listing parameters (mapped to HTTP 400 by the routes)."""
+
+
+def encode_cursor(created_at, charge_id) -> str:
+    raw = json.dumps([created_at.isoformat(), charge_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, charge_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(created_at), int(charge_id)
+    except (ValueError, TypeError):
+        raise InvalidListQuery("Invalid cursor")
+
+
+def _parse_datetime(value, name):
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise InvalidListQuery(f"{name} must be an ISO 8601 datetime")
+
+
+def parse_list_params(args) -> dict:
+    """
+    Validates the query string of GET /payment/charges.
+    `args` is any mapping with .get() (Flask / Quart request.args).
+    """
+    status = args.get("status")
+    if status is not None and status not in {s.value for s in ChargeStatus}:
+        raise InvalidListQuery("Invalid status")
+
+    created_from = args.get("created_from")
+    created_to = args.get("created_to")
+
+    try:
+        limit = int(args.get("limit", DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise InvalidListQuery("limit must be an integer")
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise InvalidListQuery(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+
+    cursor = args.get("cursor")
+
+    return {
+        "status": status,
+        "created_from": _parse_datetime(created_from, "created_from") if created_from else None,
+        "created_to": _parse_datetime(created_to, "created_to") if created_to else None,
+        "after": decode_cursor(cursor) if cursor else None,
+        "limit": limit,
+    }
+
+
+def build_list_query(status=None, created_from=None, created_to=None, after=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    Newest-first page of charges using keyset pagination over (created_at, id).
+
+    The cursor condition `(created_at, id) < (last_created_at, last_id)` lets the
+    database seek straight into the composite index (see Charge.__table_args__),
+    so every page costs O(limit) no matter how deep the client paginates — unlike
+    OFFSET, which scans and discards all previous rows.
+
+    One extra row is fetched to know whether there is a next page.
+    """
+    stmt = select(Charge)
+
+    if status is not None:
+        stmt = stmt.where(Charge.status == status)
+    if created_from is not None:
+        stmt = stmt.where(Charge.created_at >= created_from)
+    if created_to is not None:
+        stmt = stmt.where(Charge.created_at < created_to)
+    if after is not None:
+        stmt = stmt.where(tuple_(Charge.created_at, Charge.id) < tuple_(*after))
+
+    return stmt.order_by(Charge.created_at.desc(), Charge.id.desc()).limit(limit + 1)
+
+
+def page_response(charges, limit) -> dict:
+    """
+    Builds the response body from the rows returned by build_list_query().
+    """
+    page = charges[:limit]
+    next_cursor = None
+    if len(charges) > limit:
+        last = page[-1]
+        next_cursor = encode_cursor(last.created_at, last.id)
+
+    return {
+        "items": [
+            {
+                "id": charge.id,
+                "external_id": charge.external_id,
+                "value": from_cents(charge.cents),
+                "amount_cents": charge.cents,
+                "status": getattr(charge.status, "value", charge.status),
+                "created_at": charge.created_at.isoformat() if charge.created_at else None,
+                "paid_at": charge.paid_at.isoformat() if charge.paid_at else None,
+            }
+            for charge in page
+        ],
+        "next_cursor": next_cursor,
+    }
@@ -6,20 +6,24 @@ from exceptions.charge_exceptions import (
     InvalidChargeValue
 )
 from audit.logger import logger
+from services.money import to_cents
 from infrastructure.redis_client import redis_client
 
 
 def confirm_payment(charge, value):
+    # `value` in major units (legacy callers); compared as integer cents
 
     if charge.status != ChargeStatus.PENDING:
         logger.warning(
-            f"Invalid payment attempt | charge_id={charge.id} | status={charge.status}"
+            "Invalid payment attempt",
+            extra={"charge_id": charge.id, "status": charge.status}
         )
         raise ChargeNotPayable("Charge not payable")
 
-    if charge.value != value:
+    if to_cents(value) != charge.cents:
         logger.warning(
-            f"Payment value mismatch | charge_id={charge.id} | expected={charge.value} | received={value}"
+            "Payment value mismatch",
+            extra={"charge_id": charge.id, "expected": charge.value, "received": value}
         )
         raise InvalidChargeValue("Invalid value")
 
@@ -32,5 +36,6 @@ def confirm_payment(charge, value):
     redis_client.delete(f"charge:ttl:{charge.id}")
     
     logger.info(
-        f"Payment confirmed | charge_id={charge.id} | external_id={charge.external_id} | value={charge.value}"
+        "Payment confirmed",
+        extra={"charge_id": charge.id, "external_id": charge.external_id, "value": charge.value}
     )
\ No newline at end of file
@@ -1,6 +1,9 @@
 from datetime import datetime
 from enum import Enum
 
+from sqlalchemy import select, update
+
+from db_models.charges import Charge
 from repository.database import db
 
 
@@ -16,6 +19,22 @@ ALLOWED_TRANSITIONS = {
     ChargeState.EXPIRED: set(),
 }
 
+# States without exits: a charge in one of them is immutable.
+TERMINAL_STATES = frozenset(
+    state.value for state, targets in ALLOWED_TRANSITIONS.items() if not targets
+)
+
+
+# ALLOWED_TRANSITIONS compiled the other way around: target -> states allowed to
+# move into it. Becomes the `status IN (...)` guard of the conditional UPDATE.
+SOURCE_STATES = {
+    target: tuple(sorted(state.value for state, targets in ALLOWED_TRANSITIONS.items() if target in targets))
+    for target in ChargeState
+}
+
+# Columns returned by a conditional transition (enough for charge_snapshot()).
+TRANSITION_RETURNING = (Charge.id, Charge.external_id, Charge.amount_cents, Charge.value, Charge.status, Charge.paid_at)
+
 
 class InvalidChargeTransition(Exception):
     pass
@@ -27,7 +46,11 @@ def _normalize_state(raw_state) -> ChargeState:
     return ChargeState(str(raw_state))
 
 
-def transition_charge(charge, new_state) -> None:
+def apply_transition(charge, new_state) -> None:
+    """
+    Validates and applies a transition in memory, without committing.
+    Shared by the sync (Flask-SQLAlchemy) and async (AsyncSession) paths.
+    """
     current_state = _normalize_state(charge.status)
     target_state = _normalize_state(new_state)
 
@@ -40,8 +63,111 @@ def transition_charge(charge, new_state) -> None:
     if target_state == ChargeState.PAID and charge.paid_at is None:
         charge.paid_at = datetime.utcnow()
 
+
+def transition_charge(charge, new_state) -> None:
+    apply_transition(charge, new_state)
+
     try:
         db.session.commit()
     except Exception:
         db.session.rollback()
         raise
+
+
+async def transition_charge_async(session, charge, new_state) -> None:
+    apply_transition(charge, new_state)
+
+    try:
+        await session.commit()
+    except Exception:
+        await session.rollback()
+        raise
+
+
+def transition_statement(new_state, *criteria, now=None):
+    """
+    UPDATE charge SET status = :new_state[, paid_at = :now]
+    WHERE <criteria> AND status IN (<states allowed to reach new_state>)
+
+    The guard makes the transition atomic in the database: two concurrent
+    writers (webhook vs. sweeper / lazy expiry) can never both win.
+    """
+    target = _normalize_state(new_state)
+    values = {"status": target.value}
+    if target == ChargeState.PAID:
+        values["paid_at"] = now or datetime.utcnow()
+
+    return (
+        update(Charge)
+        .where(*criteria, Charge.status.in_(SOURCE_STATES[target]))
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _dialect(executor):
+    # Connection exposes .dialect, Session needs its bind
+    dialect = getattr(executor, "dialect", None)
+    return dialect if dialect is not None else executor.get_bind().dialect
+
+
+def try_transition_rows(executor, new_state, *criteria, returning=TRANSITION_RETURNING) -> list:
+    """
+    Runs the conditional UPDATE on a Session or Connection (no commit) and returns
+    the rows it actually moved, in one round trip where UPDATE ... RETURNING is
+    supported (PostgreSQL, SQLite >= 3.35).
+
+    Elsewhere the candidates (criteria + status guard) are locked first with
+    SELECT ... FOR UPDATE and only those ids are updated and read back: reading
+    back by the target status would also return rows that were already in it
+    (e.g. a charge paid earlier in the same batch).
+    """
+    target = _normalize_state(new_state)
+
+    if _dialect(executor).update_returning:
+        return executor.execute(transition_statement(target, *criteria).returning(*returning)).all()
+
+    ids = executor.execute(
+        select(Charge.id).where(*criteria, Charge.status.in_(SOURCE_STATES[target])).with_for_update()
+    ).scalars().all()
+    if not ids:
+        return []
+    executor.execute(transition_statement(target, Charge.id.in_(ids)))
+    return executor.execute(select(*returning).where(Charge.id.in_(ids))).all()
+
+
+def transition_rows_where(new_state, *criteria) -> list:
+    """
+    try_transition_rows() + commit on the Flask-SQLAlchemy session.
+    """
+    try:
+        rows = try_transition_rows(db.session, new_state, *criteria)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return rows
+
+
+def transition_where(new_state, *criteria):
+    """
+    Single-charge form of transition_rows_where(): the race-free replacement for
+    load -> transition_charge(). Returns the moved row or None.
+    """
+    rows = transition_rows_where(new_state, *criteria)
+    return rows[0] if rows else None
+
+
+async def transition_rows_where_async(session, new_state, *criteria) -> list:
+    try:
+        rows = await session.run_sync(lambda sync_session: try_transition_rows(sync_session, new_state, *criteria))
+        await session.commit()
+    except Exception:
+        await session.rollback()
+        raise
+    return rows
+
+
+async def transition_where_async(session, new_state, *criteria):
+    rows = await transition_rows_where_async(session, new_state, *criteria)
+    return rows[0] if rows else None
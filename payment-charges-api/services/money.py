@@ -0,0 +1,50 @@
+from decimal import Decimal, InvalidOperation
+
+# Amounts are stored and compared as integer minor units (centavos).
+CENT = Decimal("0.01")
+
+
+def to_cents(value):
+    """
+    Converts a major-unit amount (100, 100.5, "100.50") to integer cents.
+    Returns None for anything that is not an exact amount with at most 2 decimal places.
+    """
+    # bool is a subclass of int, so it must be rejected explicitly
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, int):
+        return value * 100
+    try:
+        # str() first: Decimal(0.1) would carry the binary float error along
+        amount = Decimal(str(value))
+    except (InvalidOperation, TypeError, ValueError):
+        return None
+    if not amount.is_finite() or amount.quantize(CENT) != amount:
+        return None
+    return int(amount * 100)
+
+
+def from_cents(cents):
+    """
+    Major-unit representation kept in API responses during the transition (100.5).
+    """
+    return cents / 100
+
+
+def cents_from_payload(data):
+    """
+    Reads an amount from a request payload, accepting both forms:
+    {"amount_cents": 10050} (preferred) or the legacy {"value": 100.5}.
+    Returns None when missing, malformed, or when both are sent and disagree.
+    """
+    cents = data.get("amount_cents")
+    if cents is not None and (isinstance(cents, bool) or not isinstance(cents, int)):
+        return None
+
+    if "value" in data:
+        from_value = to_cents(data["value"])
+        if from_value is None or (cents is not None and cents != from_value):
+            return None
+        return from_value
+
+    return cents
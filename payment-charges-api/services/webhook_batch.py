@@ -0,0 +1,230 @@
+import json
+import zlib
+
+from audit.logger import logger
+from infrastructure.local_cache import charge_response, charge_snapshot
+from infrastructure.metrics import observe_webhook
+from security.webhook_gate import GateResult
+from services.charge_cache import write_through
+from services.charge_state_machine import ChargeState
+from services.money import cents_from_payload
+from services.webhook_processor import validate_event
+
+# Same bound as POST /payment/charges/batch
+MAX_WEBHOOK_BATCH_SIZE = 500
+
+# Upper bound of the (decompressed) batch body, checked while inflating.
+MAX_BATCH_BODY_BYTES = 2 * 1024 * 1024
+
+
+class InvalidWebhookBatch(ValueError):
+    """Malformed batch body; carries the HTTP status the routes answer with."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_batch_body(raw: bytes, content_encoding=None) -> list:
+    """
+    Decodes {"events": [...]} from the raw body, optionally gzip-encoded.
+
+    The HMAC covers the bytes on the wire, so the signature is verified before
+    anything is inflated, and inflating stops at MAX_BATCH_BODY_BYTES.
+    """
+    if (content_encoding or "").lower() == "gzip":
+        inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        try:
+            raw = inflater.decompress(raw, MAX_BATCH_BODY_BYTES + 1)
+        except zlib.error:
+            raise InvalidWebhookBatch("Invalid gzip body")
+        if len(raw) > MAX_BATCH_BODY_BYTES or inflater.unconsumed_tail:
+            raise InvalidWebhookBatch("Batch body too large", 413)
+    elif content_encoding and content_encoding.lower() != "identity":
+        raise InvalidWebhookBatch("Unsupported Content-Encoding", 415)
+
+    try:
+        data = json.loads(raw)
+    except ValueError:
+        raise InvalidWebhookBatch("Invalid JSON payload")
+
+    events = data.get("events") if isinstance(data, dict) else None
+    if not isinstance(events, list) or not events:
+        raise InvalidWebhookBatch("events must be a non-empty list")
+    if len(events) > MAX_WEBHOOK_BATCH_SIZE:
+        raise InvalidWebhookBatch(f"Batch size must be <= {MAX_WEBHOOK_BATCH_SIZE}", 413)
+
+    return events
+
+
+def _result(data, body, status) -> dict:
+    event_id = data.get("event_id") if isinstance(data, dict) else None
+    return {"event_id": event_id, "status": status, **body}
+
+
+def validate_events(events):
+    """
+    Returns (results, accepted): `results` has one slot per event (filled for
+    invalid / ignored ones), `accepted` the (index, event) PAID events left to gate.
+    """
+    results = [None] * len(events)
+    accepted = []
+
+    for index, data in enumerate(events):
+        invalid = validate_event(data) if isinstance(data, dict) else ({"error": "Invalid payload"}, 400)
+        if invalid:
+            results[index] = _result(data, *invalid)
+        else:
+            accepted.append((index, data))
+
+    return results, accepted
+
+
+def stream_results(results, accepted, gates) -> list:
+    """
+    Fills the results of a batch ingested into the stream (WEBHOOK_INGESTION_MODE=stream).
+    """
+    for (index, data), gate in zip(accepted, gates):
+        if gate == GateResult.DUPLICATE:
+            results[index] = _result(data, {"message": "Duplicate event ignored"}, 200)
+        elif gate == GateResult.CHARGE_EXPIRED:
+            results[index] = _result(data, {"message": "Expired charge ignored"}, 200)
+        else:
+            results[index] = _result(data, {"message": "Event accepted"}, 202)
+    return results
+
+
+def decide_batch(results, accepted, gates, charges, terminal_cache):
+    """
+    Applies the per-event rules of apply_paid_event() to a whole batch, in memory.
+
+    `charges` maps external_id -> Charge (loaded with one query). Returns
+    (release, candidates): event_ids whose reservation must be dropped, and
+    (index, event, charge) for the events that may confirm their charge; those
+    are settled by one conditional UPDATE (see settle_batch()).
+
+    Shared by the WSGI and ASGI routes, which only differ in how they load the
+    charges, run the UPDATE and talk to Redis.
+    """
+    release = []
+    candidates = []
+    claimed = set()
+
+    for (index, data), gate in zip(accepted, gates):
+        event_id = data["event_id"]
+        external_id = data["external_id"]
+        reserved = gate == GateResult.RESERVED
+
+        def outcome(body, status, release_event=True):
+            results[index] = _result(data, body, status)
+            if reserved and release_event:
+                release.append(event_id)
+
+        if gate == GateResult.DUPLICATE:
+            outcome({"message": "Duplicate event ignored"}, 200)
+            continue
+
+        if terminal_cache.get_by_external_id(external_id):
+            outcome({"message": "Charge already processed"}, 200)
+            continue
+
+        charge = charges.get(external_id)
+        if charge is None:
+            logger.error("Charge not found", extra={"external_id": external_id})
+            outcome({"error": "Charge not found"}, 404)
+            continue
+
+        # A second event for a charge already claimed earlier in this batch
+        if str(charge.status) in (ChargeState.PAID.value, ChargeState.EXPIRED.value) or charge.id in claimed:
+            if charge.id not in claimed:
+                terminal_cache.put(charge_snapshot(charge))
+            outcome({"message": "Charge already processed"}, 200)
+            continue
+
+        if gate == GateResult.CHARGE_EXPIRED:
+            outcome({"message": "Expired charge ignored"}, 200, release_event=False)
+            continue
+
+        amount_cents = cents_from_payload(data)
+        if amount_cents is None:
+            outcome({"error": "Invalid value type"}, 400)
+            continue
+
+        if amount_cents != charge.cents:
+            logger.warning("Invalid value on webhook", extra={"charge_id": charge.id, "got": amount_cents, "expected": charge.cents})
+            outcome({"error": "Invalid value"}, 400)
+            continue
+
+        claimed.add(charge.id)
+        candidates.append((index, data, charge))
+
+    return release, candidates
+
+
+def candidate_ids(candidates) -> list:
+    return [charge.id for _, _, charge in candidates]
+
+
+def settle_batch(results, candidates, rows, release) -> list:
+    """
+    Maps the rows moved by the single conditional UPDATE
+    (status IN ('PENDING') AND id IN (...)) back to the events. A candidate whose
+    charge was not moved lost a race (paid / expired in the meantime).
+
+    Returns the confirmed (index, event, snapshot) triples.
+    """
+    moved = {row.id: row for row in rows}
+    confirmed = []
+
+    for index, data, charge in candidates:
+        row = moved.get(charge.id)
+        if row is None:
+            results[index] = _result(data, {"message": "Charge already processed"}, 200)
+            release.append(data["event_id"])
+            continue
+
+        results[index] = _result(data, {"message": "Payment confirmed"}, 200)
+        confirmed.append((index, data, charge_snapshot(row)))
+
+    return confirmed
+
+
+def fail_candidates(results, candidates, release) -> None:
+    """
+    The UPDATE / commit failed: every candidate becomes a 500 and its
+    reservation is released, so the bank retries it.
+    """
+    for index, data, _ in candidates:
+        results[index] = _result(data, {"error": "Internal server error"}, 500)
+        release.append(data["event_id"])
+
+
+def queue_finish(pipe, release, confirmed, terminal_cache, dedupe) -> bool:
+    """
+    Queues all reservation releases and the write-through of the confirmed
+    charges on one pipeline (sync or asyncio). Returns False when there is
+    nothing to send.
+    """
+    snapshots = [snapshot for _, _, snapshot in confirmed]
+    for snapshot in snapshots:
+        terminal_cache.put(snapshot)
+
+    for event_id in release:
+        dedupe.release(pipe, event_id)
+    for snapshot in snapshots:
+        write_through(pipe, charge_response(snapshot))
+
+    return bool(release or snapshots)
+
+
+def summary(results) -> dict:
+    """
+    Response body of a batch; also counts each event's outcome in
+    webhook_events_total (every batch response goes through here once).
+    """
+    for result in results:
+        observe_webhook(result, result["status"])
+    return {
+        "results": results,
+        "confirmed": sum(1 for result in results if result.get("message") == "Payment confirmed"),
+    }
@@ -0,0 +1,158 @@
+from audit.logger import logger
+from db_models.charges import Charge
+from infrastructure.local_cache import charge_response, charge_snapshot, get_terminal_cache
+from security.event_dedupe import get_event_dedupe
+from security.webhook_gate import GateResult, release_webhook_event
+from services.charge_cache import write_through
+from services.money import cents_from_payload
+from services.charge_state_machine import (
+    ChargeState,
+    transition_where,
+)
+
+
+def has_amount(data) -> bool:
+    # Either form is accepted during the transition to integer cents
+    return bool(data.get("amount_cents") or data.get("value"))
+
+
+def validate_event(data):
+    """
+    Minimal payload validation shared by both ingestion modes.
+    Returns (body, status) for an invalid or ignorable event, None otherwise.
+    """
+    if not data.get("event_id"):
+        return {"error": "event_id is required"}, 400
+
+    if not data.get("external_id") or not has_amount(data) or not data.get("status"):
+        return {"error": "Invalid payload"}, 400
+
+    if data.get("status") != "PAID":
+        return {"message": "Ignored"}, 200
+
+    return None
+
+
+def release_event(client, event_id, reserved):
+    """
+    Releases the gate reservation so the bank can retry the same event.
+    Best effort: a failure here only delays retries until the dedupe TTL expires.
+    """
+    if not reserved:
+        return
+    try:
+        release_webhook_event(client, event_id, get_event_dedupe())
+    except Exception:
+        logger.exception("Failed to release webhook event reservation", extra={"event_id": event_id})
+
+
+def apply_paid_event(client, data, gate, release_on_error=True):
+    """
+    Applies a validated PAID event after the Redis gate (sync mode: inside the
+    webhook request; stream mode: in the worker, with the gate run at ingestion).
+
+    Requires an app context (Flask-SQLAlchemy session). Returns (body, status);
+    on any non-success outcome the event reservation is released, except on a
+    5xx with release_on_error=False: the stream worker keeps it while the entry
+    is pending for retry, so a re-sent event is not queued a second time.
+    """
+    external_id = data["external_id"]
+    event_id = data["event_id"]
+    reserved = gate == GateResult.RESERVED
+
+    try:
+        # Retries for charges already finalized in this worker never reach the DB.
+        terminal_cache = get_terminal_cache()
+        terminal = terminal_cache.get_by_external_id(external_id)
+        if terminal:
+            logger.info("Ignored webhook for already finalized charge (local cache)", extra={"charge_id": terminal['id'], "status": terminal['status']})
+            release_event(client, event_id, reserved)
+            return {"message": "Charge already processed"}, 200
+
+        amount_cents = cents_from_payload(data)
+
+        # Hot path: one conditional UPDATE confirms a PENDING charge with the right
+        # amount (no SELECT first, race-free against the sweeper / lazy expiry).
+        row = None
+        if gate != GateResult.CHARGE_EXPIRED and amount_cents is not None:
+            try:
+                row = transition_where(
+                    ChargeState.PAID,
+                    Charge.external_id == external_id,
+                    Charge.amount_cents == amount_cents,
+                )
+            except Exception:
+                logger.exception("Failed to commit payment for charge", extra={"external_id": external_id})
+                release_event(client, event_id, reserved and release_on_error)
+                return {"error": "Internal server error"}, 500
+
+        # Slow path (no row moved): read the charge only to tell why
+        if row is None:
+            # 🔍 Busca charges
+            charge = Charge.query.filter_by(external_id=external_id).first()
+
+            if not charge:
+                logger.error("Charge not found", extra={"external_id": external_id})
+                release_event(client, event_id, reserved)
+                return {"error": "Charge not found"}, 404
+
+            if str(charge.status) in (ChargeState.PAID.value, ChargeState.EXPIRED.value):
+                logger.info("Ignored webhook for already finalized charge", extra={"charge_id": charge.id, "status": charge.status})
+                terminal_cache.put(charge_snapshot(charge))
+                release_event(client, event_id, reserved)
+                return {"message": "Charge already processed"}, 200
+
+            # Redis TTL é a fonte da verdade para validar se a cobrança ainda pode
+            # ser confirmada por webhook (verificado pelo gate).
+            if gate == GateResult.CHARGE_EXPIRED:
+                logger.warning("Webhook received but charge TTL missing/expired", extra={"charge_id": charge.id})
+                return {"message": "Expired charge ignored"}, 200
+
+            if amount_cents is None:
+                release_event(client, event_id, reserved)
+                return {"error": "Invalid value type"}, 400
+
+            # Integer minor units on both sides: exact, no Decimal round trip per event
+            if amount_cents != charge.cents:
+                logger.warning("Invalid value on webhook", extra={"charge_id": charge.id, "got": amount_cents, "expected": charge.cents})
+                release_event(client, event_id, reserved)
+                return {"error": "Invalid value"}, 400
+
+            # Amount matches but the hot path did not apply: legacy row without
+            # amount_cents, or the charge changed state in between
+            try:
+                row = transition_where(ChargeState.PAID, Charge.id == charge.id)
+            except Exception:
+                logger.exception("Failed to commit payment for charge", extra={"charge_id": charge.id})
+                release_event(client, event_id, reserved and release_on_error)
+                return {"error": "Internal server error"}, 500
+
+            if row is None:
+                logger.warning("Ignored webhook for non-pending charge", extra={"charge_id": charge.id})
+                release_event(client, event_id, reserved)
+                return {"message": "Charge already processed"}, 200
+
+        # Event key was reserved by the gate: it now marks the event as processed.
+        reserved = False
+        snapshot = charge_snapshot(row)
+        terminal_cache.put(snapshot)
+
+        # Write-through: pollers see PAID straight from Redis, without a DB read.
+        try:
+            write_through(client, charge_response(snapshot))
+        except Exception:
+            logger.exception("Failed to write charge cache", extra={"charge_id": row.id})
+
+        # Log informativo para auditoria / monitoramento.
+        logger.info(
+            "Payment confirmed via webhook",
+            extra={"charge_id": row.id, "external_id": external_id}
+        )
+
+        return {"message": "Payment confirmed"}, 200
+
+    except Exception:
+        # Fallback: log completo e resposta genérica. Não vaza detalhes.
+        logger.exception("Unhandled error processing PIX webhook")
+        release_event(client, event_id, reserved and release_on_error)
+        return {"error": "Internal server error"}, 500
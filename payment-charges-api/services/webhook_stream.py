@@ -0,0 +1,325 @@
+import json
+import os
+import signal
+import socket
+import threading
+import time
+
+from redis.exceptions import ResponseError
+
+from audit.logger import logger
+from repository.database import db
+from security.event_dedupe import DEFAULT_EVENT_DEDUPE, KEY_DEDUPE_LUA
+from security.webhook_gate import GateResult, charge_ttl_key, registered
+from services.charge_expiry import paying_key
+from services.webhook_processor import apply_paid_event, release_event
+
+# Stream mode: the webhook endpoint only appends the event here and answers 202;
+# a pool of consumers (webhook_worker.py) applies the transitions.
+WEBHOOK_STREAM_KEY = "webhooks:pix"
+WEBHOOK_CONSUMER_GROUP = "webhook-processors"
+
+# Entries that kept failing with 5xx after MAX_DELIVERIES attempts.
+DEAD_LETTER_STREAM_KEY = "webhooks:pix:dead"
+
+# entry id -> failed attempts (XAUTOCLAIM does not report delivery counts)
+ATTEMPTS_KEY = "webhooks:pix:attempts"
+
+# Approximate cap (XADD MAXLEN ~). Must stay well above the worst expected backlog:
+# trimmed entries are gone even if still pending.
+DEFAULT_STREAM_MAXLEN = 100000
+
+# While an accepted event is queued, charge:paying:{external_id} tells the expiry
+# sweeper to postpone the charge: the payment arrived in time, only its
+# processing is late.
+PAYING_MARKER_TTL_SECONDS = 300
+
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_BLOCK_MS = 2000
+# A pending entry idle for this long belongs to a dead / stuck consumer and is reclaimed.
+DEFAULT_MIN_IDLE_MS = 30000
+DEFAULT_CLAIM_INTERVAL_SECONDS = 10.0
+MAX_DELIVERIES = 5
+
+# Ingestion gate: same checks as GATE_LUA, plus the append to the stream and
+# the in-flight marker, all in one atomic call.
+#
+# KEYS[1] = charge:ttl:{external_id}
+# KEYS[2] = webhooks:pix
+# KEYS[3] = charge:paying:{external_id}
+# KEYS[4..], ARGV[6..] = dedupe backend (see security/event_dedupe.py)
+# ARGV[1] = stream MAXLEN (approximate)
+# ARGV[2] = event_id
+# ARGV[3] = JSON payload
+# ARGV[4] = received_at (epoch seconds)
+# ARGV[5] = in-flight marker TTL in seconds
+INGEST_LUA = """
+if dedupe_seen(4, 6) then
+    return 0
+end
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 2
+end
+dedupe_reserve(4, 6)
+redis.call('XADD', KEYS[2], 'MAXLEN', '~', ARGV[1], '*',
+    'event_id', ARGV[2], 'payload', ARGV[3], 'received_at', ARGV[4])
+redis.call('SET', KEYS[3], ARGV[2], 'EX', ARGV[5])
+return 1
+"""
+
+# Ingestion with the default (per-key) dedupe backend
+INGEST_SCRIPT = KEY_DEDUPE_LUA + INGEST_LUA
+
+_scripts = {}
+_scripts_async = {}
+
+
+def _ingest(client, cache, data, maxlen, dedupe, now):
+    script = registered(cache, client, dedupe.lua + INGEST_LUA)
+    call = {
+        "keys": [
+            charge_ttl_key(data["external_id"]),
+            WEBHOOK_STREAM_KEY,
+            paying_key(data["external_id"]),
+            *dedupe.keys(data["event_id"], now),
+        ],
+        "args": [
+            maxlen,
+            data["event_id"],
+            json.dumps(data, separators=(",", ":")),
+            now,
+            PAYING_MARKER_TTL_SECONDS,
+            *dedupe.args(data["event_id"], now),
+        ],
+    }
+    return script, call
+
+
+def enqueue_webhook_event(client, data, maxlen=DEFAULT_STREAM_MAXLEN, dedupe=DEFAULT_EVENT_DEDUPE) -> GateResult:
+    """
+    Dedupe + charge TTL check + XADD in one atomic Redis call.
+    RESERVED means the event is in the stream and owned by the consumer group.
+    """
+    script, call = _ingest(client, _scripts, data, maxlen, dedupe, time.time())
+    return GateResult(int(script(client=client, **call)))
+
+
+async def enqueue_webhook_event_async(client, data, maxlen=DEFAULT_STREAM_MAXLEN, dedupe=DEFAULT_EVENT_DEDUPE) -> GateResult:
+    """
+    Same as enqueue_webhook_event() for a redis.asyncio client (ASGI mode).
+    """
+    script, call = _ingest(client, _scripts_async, data, maxlen, dedupe, time.time())
+    return GateResult(int(await script(client=client, **call)))
+
+
+def enqueue_webhook_events(client, events, maxlen=DEFAULT_STREAM_MAXLEN, dedupe=DEFAULT_EVENT_DEDUPE) -> list:
+    """
+    Batch form of enqueue_webhook_event(): one pipelined round trip, one GateResult per event.
+    """
+    now = time.time()
+    pipe = client.pipeline(transaction=False)
+    for data in events:
+        script, call = _ingest(client, _scripts, data, maxlen, dedupe, now)
+        script(client=pipe, **call)
+    return [GateResult(int(result)) for result in pipe.execute()]
+
+
+async def enqueue_webhook_events_async(client, events, maxlen=DEFAULT_STREAM_MAXLEN, dedupe=DEFAULT_EVENT_DEDUPE) -> list:
+    """
+    Same as enqueue_webhook_events() for a redis.asyncio client (ASGI mode).
+    """
+    now = time.time()
+    async with client.pipeline(transaction=False) as pipe:
+        for data in events:
+            script, call = _ingest(client, _scripts_async, data, maxlen, dedupe, now)
+            await script(client=pipe, **call)
+        return [GateResult(int(result)) for result in await pipe.execute()]
+
+
+def ensure_consumer_group(client) -> None:
+    try:
+        client.xgroup_create(WEBHOOK_STREAM_KEY, WEBHOOK_CONSUMER_GROUP, id="0", mkstream=True)
+    except ResponseError as e:
+        if "BUSYGROUP" not in str(e):
+            raise
+
+
+class WebhookStreamWorker(threading.Thread):
+    """
+    One consumer of the group. Delivery is at-least-once:
+
+    - an entry is XACKed only after a final outcome (confirmed, ignored, 4xx);
+    - on a 5xx (or an unparseable payload / unexpected error) it stays pending,
+      with its event reservation kept, and is picked up again through XAUTOCLAIM
+      once idle for `min_idle_ms`, by this or any other consumer;
+    - after MAX_DELIVERIES failures it is moved to the dead-letter stream and
+      the reservation is released.
+
+    Re-applying an event is harmless: the state machine only moves PENDING -> PAID
+    once, a redelivery ends as "Charge already processed".
+    """
+
+    def __init__(
+        self,
+        app,
+        client,
+        consumer,
+        batch_size=DEFAULT_BATCH_SIZE,
+        block_ms=DEFAULT_BLOCK_MS,
+        min_idle_ms=DEFAULT_MIN_IDLE_MS,
+        claim_interval=DEFAULT_CLAIM_INTERVAL_SECONDS,
+    ):
+        super().__init__(name=f"webhook-worker-{consumer}", daemon=True)
+        self.app = app
+        self.client = client
+        self.consumer = consumer
+        self.batch_size = batch_size
+        self.block_ms = block_ms
+        self.min_idle_ms = min_idle_ms
+        self.claim_interval = claim_interval
+        self._claim_cursor = "0-0"
+        self._last_claim = 0.0
+        self._stopped = threading.Event()
+
+    def process(self, entries) -> int:
+        """
+        Applies a list of (entry_id, fields). Returns how many were acknowledged.
+        """
+        acked = 0
+        for entry_id, fields in entries:
+            if fields is None:
+                # Trimmed from the stream while pending: nothing left to apply
+                self.client.xack(WEBHOOK_STREAM_KEY, WEBHOOK_CONSUMER_GROUP, entry_id)
+                continue
+
+            data = None
+            try:
+                data = json.loads(fields["payload"])
+                with self.app.app_context():
+                    try:
+                        _, status = apply_paid_event(self.client, data, GateResult.RESERVED, release_on_error=False)
+                    finally:
+                        db.session.remove()
+            except Exception:
+                # Unparseable payload or unexpected error: a failed attempt, so a
+                # poison entry ends in the dead-letter stream instead of aborting
+                # the batch (and every later batch) over and over
+                logger.exception("Webhook stream entry failed", extra={"entry_id": entry_id, "event_id": fields.get("event_id")})
+                status = 500
+
+            if status >= 500 and not self._give_up(entry_id, fields):
+                logger.warning(
+                    "Webhook event processing failed, left pending for retry",
+                    extra={"entry_id": entry_id, "event_id": fields.get("event_id")},
+                )
+                continue
+
+            self._finish(entry_id, data)
+            acked += 1
+
+        return acked
+
+    def _give_up(self, entry_id, fields) -> bool:
+        attempts = self.client.hincrby(ATTEMPTS_KEY, entry_id, 1)
+        if attempts < MAX_DELIVERIES:
+            return False
+
+        self.client.xadd(DEAD_LETTER_STREAM_KEY, {**fields, "entry_id": entry_id})
+        logger.error(
+            "Webhook event moved to dead-letter stream",
+            extra={"entry_id": entry_id, "event_id": fields.get("event_id"), "attempts": attempts},
+        )
+        # Kept while the entry was pending (a re-sent event is not queued twice);
+        # given up now, so the provider may deliver it again
+        if fields.get("event_id"):
+            with self.app.app_context():
+                release_event(self.client, fields["event_id"], True)
+        return True
+
+    def _finish(self, entry_id, data):
+        pipe = self.client.pipeline(transaction=False)
+        pipe.xack(WEBHOOK_STREAM_KEY, WEBHOOK_CONSUMER_GROUP, entry_id)
+        pipe.hdel(ATTEMPTS_KEY, entry_id)
+        if isinstance(data, dict) and data.get("external_id"):
+            pipe.delete(paying_key(data["external_id"]))
+        pipe.execute()
+
+    def claim_stale(self) -> int:
+        """
+        Takes over entries left pending by crashed or stuck consumers (XAUTOCLAIM),
+        walking the pending list across calls.
+        """
+        self._claim_cursor, entries, *_ = self.client.xautoclaim(
+            WEBHOOK_STREAM_KEY,
+            WEBHOOK_CONSUMER_GROUP,
+            self.consumer,
+            min_idle_time=self.min_idle_ms,
+            start_id=self._claim_cursor,
+            count=self.batch_size,
+        )
+        return self.process(entries)
+
+    def poll(self) -> int:
+        """
+        Reads and applies one batch of new entries (blocks up to block_ms).
+        """
+        response = self.client.xreadgroup(
+            WEBHOOK_CONSUMER_GROUP,
+            self.consumer,
+            {WEBHOOK_STREAM_KEY: ">"},
+            count=self.batch_size,
+            block=self.block_ms,
+        )
+        return sum(self.process(entries) for _, entries in response or [])
+
+    def run(self):
+        while not self._stopped.is_set():
+            try:
+                if time.monotonic() - self._last_claim >= self.claim_interval:
+                    self._last_claim = time.monotonic()
+                    self.claim_stale()
+                self.poll()
+            except Exception:
+                # Redis unavailable: back off, pending entries are not lost
+                logger.exception("Webhook stream worker iteration failed")
+                self._stopped.wait(1)
+
+    def stop(self):
+        self._stopped.set()
+
+
+def run_worker_pool(app, client, workers=None):
+    """
+    Starts `workers` consumers (threads) in this process and blocks until
+    SIGINT / SIGTERM. Run more processes / hosts to scale out: consumer names are
+    unique per host, pid and thread.
+    """
+    workers = workers or app.config.get("WEBHOOK_WORKERS", 4)
+    ensure_consumer_group(client)
+
+    prefix = f"{socket.gethostname()}-{os.getpid()}"
+    pool = [
+        WebhookStreamWorker(
+            app,
+            client,
+            f"{prefix}-{i}",
+            batch_size=app.config.get("WEBHOOK_WORKER_BATCH", DEFAULT_BATCH_SIZE),
+            min_idle_ms=app.config.get("WEBHOOK_WORKER_MIN_IDLE_MS", DEFAULT_MIN_IDLE_MS),
+        )
+        for i in range(workers)
+    ]
+
+    stopped = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: stopped.set())
+
+    for worker in pool:
+        worker.start()
+    logger.info("Webhook stream workers started", extra={"workers": workers, "consumer_prefix": prefix})
+
+    stopped.wait()
+    for worker in pool:
+        worker.stop()
+    for worker in pool:
+        # Finish the current batch: unacked entries would only be redelivered later
+        worker.join(timeout=DEFAULT_BLOCK_MS / 1000 + 5)
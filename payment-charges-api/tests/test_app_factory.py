@@ -0,0 +1,108 @@
+import os
+import subprocess
+import sys
+
+import fakeredis
+import pytest
+
+from app import create_app
+from repository.database import db
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _config(**overrides):
+    return {
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+        "WEBHOOK_SECRET": "test-webhook-secret",
+        "EXPIRY_SWEEPER_ENABLED": False,
+        "HEALTH_MONITOR_ENABLED": False,
+        "RATELIMIT_ENABLED": False,
+        **overrides,
+    }
+
+
+def test_importing_the_app_module_has_no_side_effects(tmp_path):
+    script = (
+        "import sys, threading, app\n"
+        "print(threading.active_count(), 'routes.charges' in sys.modules, 'infrastructure.profiling' in sys.modules)\n"
+    )
+    env = {**os.environ, "PYTHONPATH": SERVICE_DIR}
+    env.pop("WEBHOOK_SECRET", None)
+    out = subprocess.run(
+        [sys.executable, "-c", script], cwd=tmp_path, env=env, capture_output=True, text=True, check=True
+    ).stdout.split()
+
+    # No thread, no blueprint / client import, no config check, nothing on disk
+    assert out == ["1", "False", "False"]
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_services_do_not_import_blueprint_modules(tmp_path):
+    script = (
+        "import sys, services.webhook_processor, services.webhook_batch, services.webhook_stream\n"
+        "print(sorted(name for name in sys.modules if name.split('.')[0] in ('routes', 'aio')))\n"
+    )
+    env = {**os.environ, "PYTHONPATH": SERVICE_DIR}
+    out = subprocess.run(
+        [sys.executable, "-c", script], cwd=tmp_path, env=env, capture_output=True, text=True, check=True
+    ).stdout.strip()
+
+    assert out == "[]"
+
+
+def test_each_app_uses_its_own_redis_client():
+    first, second = fakeredis.FakeRedis(decode_responses=True), fakeredis.FakeRedis(decode_responses=True)
+    apps = [create_app(_config(REDIS_CLIENT=client)) for client in (first, second)]
+    for app in apps:
+        with app.app_context():
+            db.create_all()
+
+    created = apps[0].test_client().post("/payment/charges", json={"value": 12.5})
+    assert created.status_code == 201
+
+    charge_id = created.get_json()["id"]
+    assert first.keys("charge:*")
+    assert not second.exists(f"charge:{charge_id}")
+    assert "profiler" not in apps[0].extensions
+
+
+def test_config_overrides_the_environment(monkeypatch):
+    monkeypatch.setenv("WEBHOOK_INGESTION_MODE", "stream")
+    app = create_app(_config(WEBHOOK_INGESTION_MODE="sync"))
+    assert app.config["WEBHOOK_INGESTION_MODE"] == "sync"
+    # Derived from the final URL: in-memory SQLite takes no pool options
+    assert app.config["SQLALCHEMY_ENGINE_OPTIONS"] == {}
+
+    with pytest.raises(RuntimeError, match="WEBHOOK_SECRET"):
+        create_app(_config(WEBHOOK_SECRET=None))
+
+
+def test_preloaded_app_starts_background_workers_after_fork():
+    from app import reinit_after_fork
+
+    client = fakeredis.FakeRedis(decode_responses=True)
+    app = create_app(_config(
+        REDIS_CLIENT=client,
+        EXPIRY_SWEEPER_ENABLED=True,
+        EXPIRY_SWEEP_INTERVAL_SECONDS=60,
+        DEFER_BACKGROUND_WORKERS=True,
+    ))
+    # Built in the gunicorn master: no thread to lose in the fork
+    assert "expiry_sweeper" not in app.extensions
+
+    client.ping()
+    inherited = list(client.connection_pool._available_connections)
+    assert inherited
+    reinit_after_fork(app)
+
+    sweeper = app.extensions["expiry_sweeper"]
+    try:
+        assert sweeper.is_alive()
+        # Inherited connections are forgotten, not reused
+        pool = client.connection_pool
+        assert not set(inherited) & set(pool._available_connections + list(pool._in_use_connections))
+    finally:
+        sweeper.stop()
+        sweeper.join(timeout=5)
@@ -0,0 +1,177 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import time
+
+import fakeredis
+import pytest
+
+pytest.importorskip("quart")
+pytest.importorskip("aiosqlite")
+
+from sqlalchemy.pool import StaticPool
+
+from db_models.charges import ChargeStatus
+
+CHARGES_BASE = "/payment/charges"
+WEBHOOK_SECRET = "test-webhook-secret"
+
+
+def _sign_payload(secret, payload_bytes):
+    digest = hmac.new(secret.encode(), payload_bytes, hashlib.sha256).hexdigest()
+    return f"sha256={digest}"
+
+
+@pytest.fixture
+def app():
+    from aio.app import create_app
+
+    server = fakeredis.FakeServer()
+    app = create_app({
+        "WEBHOOK_SECRET": WEBHOOK_SECRET,
+        "EXPIRY_SWEEPER_ENABLED": False,
+        "HEALTH_MONITOR_ENABLED": False,
+        "SQLALCHEMY_DATABASE_URI": "sqlite://",
+        # One shared in-memory database for every session
+        "SQLALCHEMY_ENGINE_OPTIONS": {"connect_args": {"check_same_thread": False}, "poolclass": StaticPool},
+        "REDIS_CLIENT": fakeredis.FakeAsyncRedis(server=server, decode_responses=True),
+        "TESTING": True,
+    })
+    app.fake_redis = fakeredis.FakeRedis(server=server, decode_responses=True)
+    return app
+
+
+def test_asgi_create_pay_and_get_matches_sync_contract(app):
+    async def scenario():
+        async with app.test_app():
+            client = app.test_client()
+
+            create_response = await client.post(CHARGES_BASE, json={"value": 42.5})
+            assert create_response.status_code == 201
+            charge = await create_response.get_json()
+            assert charge["status"] == ChargeStatus.PENDING.value
+
+            payload = {
+                "event_id": "evt_asgi_001",
+                "external_id": charge["external_id"],
+                "value": 42.5,
+                "status": "PAID",
+            }
+            payload_bytes = json.dumps(payload, separators=(",", ":")).encode()
+            headers = {
+                "Content-Type": "application/json",
+                "X-Timestamp": str(int(time.time())),
+                "X-Signature": _sign_payload(WEBHOOK_SECRET, payload_bytes),
+                "Idempotency-Key": "evt_asgi_001",
+            }
+
+            webhook_response = await client.post("/webhooks/pix", data=payload_bytes, headers=headers)
+            assert webhook_response.status_code == 200
+            assert (await webhook_response.get_json())["message"] == "Payment confirmed"
+
+            # Same key: stored response replayed, handler not run again
+            replay = await client.post("/webhooks/pix", data=payload_bytes, headers=headers)
+            assert replay.headers["Idempotent-Replayed"] == "true"
+            assert (await replay.get_json())["message"] == "Payment confirmed"
+
+            headers["Idempotency-Key"] = "evt_asgi_001-retry"
+            duplicate = await client.post("/webhooks/pix", data=payload_bytes, headers=headers)
+            assert (await duplicate.get_json())["message"] == "Duplicate event ignored"
+
+            app.fake_redis.delete(f"charge:{charge['id']}")
+            status_response = await client.get(f"{CHARGES_BASE}/{charge['id']}")
+            assert status_response.status_code == 200
+            assert (await status_response.get_json())["status"] == ChargeStatus.PAID.value
+
+    asyncio.run(scenario())
+
+
+def test_asgi_webhook_rejects_invalid_signature(app):
+    async def scenario():
+        async with app.test_app():
+            client = app.test_client()
+            response = await client.post(
+                "/webhooks/pix",
+                data=b"{}",
+                headers={
+                    "Content-Type": "application/json",
+                    "X-Timestamp": str(int(time.time())),
+                    "X-Signature": "sha256=invalid",
+                    "Idempotency-Key": "evt_invalid",
+                },
+            )
+            assert response.status_code == 401
+
+    asyncio.run(scenario())
+
+
+def test_asgi_list_charges_pages_with_cursor(app):
+    app.config["EXTERNAL_API_KEY"] = "ops-key"
+    headers = {"Authorization": "Bearer ops-key"}
+
+    async def scenario():
+        async with app.test_app():
+            client = app.test_client()
+            await client.post(f"{CHARGES_BASE}/batch", json={"charges": [{"value": v} for v in (1, 2, 3)]})
+
+            first = await (await client.get(f"{CHARGES_BASE}?limit=2", headers=headers)).get_json()
+            second = await (
+                await client.get(f"{CHARGES_BASE}?limit=2&cursor={first['next_cursor']}", headers=headers)
+            ).get_json()
+
+            ids = [item["id"] for item in first["items"] + second["items"]]
+            assert ids == [3, 2, 1]
+            assert second["next_cursor"] is None
+
+    asyncio.run(scenario())
+
+
+def test_asgi_apps_get_their_own_clients_from_the_config(app, tmp_path):
+    from aio.app import create_app
+
+    url = f"sqlite:///{tmp_path / 'other.db'}"
+    other = create_app({
+        "WEBHOOK_SECRET": WEBHOOK_SECRET,
+        "EXPIRY_SWEEPER_ENABLED": False,
+        "HEALTH_MONITOR_ENABLED": False,
+        "SQLALCHEMY_DATABASE_URI": url,
+        "REDIS_URL": "redis://other-host:6380/2",
+    })
+
+    assert other.extensions["db_engine"] is not app.extensions["db_engine"]
+    assert other.extensions["db_engine"].url.database == str(tmp_path / "other.db")
+    assert other.extensions["redis"].connection_pool.connection_kwargs["host"] == "other-host"
+    # Settings the ASGI factory used to leave out come from config.load_config()
+    assert other.config["AUDIT_LOG_MODE"] and other.config["RATELIMIT_BACKEND"]
+
+    async def scenario():
+        async with app.test_app():
+            client = app.test_client()
+            assert (await client.post(CHARGES_BASE, json={"value": 5})).status_code == 201
+            assert app.fake_redis.keys("charge:*")
+
+    asyncio.run(scenario())
+
+
+def test_asgi_factory_reads_database_and_redis_urls_from_dotenv(monkeypatch, tmp_path):
+    import dotenv
+
+    import aio.app
+
+    env_file = tmp_path / ".env"
+    env_file.write_text(
+        f"DATABASE_URL=sqlite:///{tmp_path / 'from-dotenv.db'}\n"
+        "REDIS_URL=redis://dotenv-host:6390/3\n"
+        f"WEBHOOK_SECRET={WEBHOOK_SECRET}\n"
+    )
+    for key in ("DATABASE_URL", "REDIS_URL", "WEBHOOK_SECRET"):
+        # Registered with monkeypatch so the values loaded below are undone
+        monkeypatch.setenv(key, "unset")
+        monkeypatch.delenv(key)
+    monkeypatch.setattr(aio.app, "load_dotenv", lambda: dotenv.load_dotenv(env_file))
+
+    app = aio.app.create_app()
+
+    assert app.extensions["db_engine"].url.database == str(tmp_path / "from-dotenv.db")
+    assert app.extensions["redis"].connection_pool.connection_kwargs["host"] == "dotenv-host"
@@ -0,0 +1,109 @@
+import json
+import logging
+import queue
+import threading
+from logging.handlers import QueueListener
+
+from audit.logger import (
+    BufferedRotatingFileHandler,
+    JsonLinesFormatter,
+    LazyQueueHandler,
+    RequestIdAdapter,
+    TextFormatter,
+)
+
+
+class _Capture(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.lines = []
+        self.threads = set()
+
+    def emit(self, record):
+        self.threads.add(threading.current_thread().name)
+        self.lines.append(self.format(record))
+
+
+def _logger(name, handler):
+    base = logging.getLogger(name)
+    base.handlers = [handler]
+    base.propagate = False
+    base.setLevel(logging.INFO)
+    return RequestIdAdapter(base, {})
+
+
+def test_json_lines_carry_request_id_and_structured_fields():
+    capture = _Capture()
+    capture.setFormatter(JsonLinesFormatter())
+    logger = _logger("test_audit_json", capture)
+
+    logger.warning("Invalid value on webhook", extra={"charge_id": 7, "got": 100, "expected": 250})
+    try:
+        raise RuntimeError("boom")
+    except RuntimeError:
+        logger.exception("Failed %s", "commit", extra={"charge_id": 7})
+
+    first, second = (json.loads(line) for line in capture.lines)
+    assert first["message"] == "Invalid value on webhook"
+    assert (first["level"], first["request_id"]) == ("WARNING", "unknown")
+    assert (first["charge_id"], first["got"], first["expected"]) == (7, 100, 250)
+    assert second["message"] == "Failed commit"
+    assert "RuntimeError: boom" in second["exc_info"]
+
+
+def test_text_lines_keep_the_layout_and_append_fields():
+    capture = _Capture()
+    capture.setFormatter(TextFormatter("%(levelname)s | request_id=%(request_id)s | %(message)s"))
+    logger = _logger("test_audit_text", capture)
+
+    logger.info("Charges expired by sweeper", extra={"count": 3})
+
+    assert capture.lines == ["INFO | request_id=unknown | Charges expired by sweeper | count=3"]
+
+
+def test_queue_mode_formats_on_the_listener_thread():
+    capture = _Capture()
+    capture.setFormatter(JsonLinesFormatter())
+    records = queue.SimpleQueue()
+    listener = QueueListener(records, capture, respect_handler_level=True)
+    logger = _logger("test_audit_queue", LazyQueueHandler(records))
+
+    listener.start()
+    logger.info("Payment confirmed", extra={"charge_id": 1, "request_id": "req-1"})
+    listener.stop()
+
+    assert threading.current_thread().name not in capture.threads
+    assert json.loads(capture.lines[0])["request_id"] == "req-1"
+
+
+def test_buffered_handler_flushes_by_count_and_on_errors(tmp_path):
+    path = tmp_path / "audit.log"
+    handler = BufferedRotatingFileHandler(str(path), flush_records=3, maxBytes=1_000_000)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger = _logger("test_audit_buffered", handler)
+
+    logger.info("one")
+    logger.info("two")
+    assert path.read_text() == ""
+
+    logger.info("three")
+    assert path.read_text().splitlines() == ["one", "two", "three"]
+
+    logger.error("four")
+    assert path.read_text().splitlines()[-1] == "four"
+    handler.close()
+
+
+def test_buffered_handler_rotates_by_bytes_not_characters(tmp_path):
+    path = tmp_path / "audit.log"
+    handler = BufferedRotatingFileHandler(str(path), encoding="utf-8", maxBytes=64, backupCount=1)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger = _logger("test_audit_rotation", handler)
+
+    # 21 characters, 41 bytes each in UTF-8
+    logger.info("ç" * 20)
+    logger.info("ç" * 20)
+    handler.close()
+
+    assert path.stat().st_size <= 64
+    assert (tmp_path / "audit.log.1").stat().st_size <= 64
@@ -0,0 +1,104 @@
+import fakeredis
+import pytest
+from flask import Flask
+
+from db_models.charges import Charge, ChargeStatus
+from repository.database import db
+from routes.charges import MAX_BATCH_SIZE, charges_bp
+
+BATCH_URL = "/payment/charges/batch"
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config["TESTING"] = True
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+
+    db.init_app(app)
+    app.register_blueprint(charges_bp)
+
+    fake_redis = fakeredis.FakeRedis(decode_responses=True)
+    app.extensions["redis"] = fake_redis
+
+    app.fake_redis = fake_redis
+
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def _count_pipelines(monkeypatch, redis):
+    executed = []
+    make_pipeline = redis.pipeline
+
+    def pipeline(*args, **kwargs):
+        pipe = make_pipeline(*args, **kwargs)
+        execute = pipe.execute
+        pipe.execute = lambda *a, **kw: executed.append(1) or execute(*a, **kw)
+        return pipe
+
+    monkeypatch.setattr(redis, "pipeline", pipeline)
+    return executed
+
+
+def test_batch_creates_all_charges_with_one_pipeline(client, app, monkeypatch):
+    pipelines = _count_pipelines(monkeypatch, app.fake_redis)
+    response = client.post(BATCH_URL, json={"charges": [{"value": v} for v in (10.0, 20.5, 30)]})
+
+    assert response.status_code == 201
+    body = response.get_json()
+    assert body["created"] == 3
+    assert body["failed"] == 0
+    assert [r["index"] for r in body["results"]] == [0, 1, 2]
+    # One pipeline for the TTL keys, one for the read cache: independent of batch size
+    assert len(pipelines) == 2
+
+    for result in body["results"]:
+        assert result["status"] == ChargeStatus.PENDING.value
+        assert app.fake_redis.exists(f"charge:ttl:{result['external_id']}") == 1
+
+        charge = db.session.get(Charge, result["id"])
+        assert charge.external_id == result["external_id"]
+        assert charge.status == ChargeStatus.PENDING.value
+
+
+def test_batch_reports_invalid_items_without_aborting(client, app):
+    response = client.post(
+        BATCH_URL,
+        json={"charges": [{"value": 15.0}, {"value": -1}, {"value": "abc"}, {}, {"value": True}]},
+    )
+
+    assert response.status_code == 201
+    body = response.get_json()
+    assert body["created"] == 1
+    assert body["failed"] == 4
+    assert "id" in body["results"][0]
+    assert all(r["error"] == "Invalid value" for r in body["results"][1:])
+    assert Charge.query.count() == 1
+
+
+def test_batch_with_only_invalid_items_returns_400(client):
+    response = client.post(BATCH_URL, json={"charges": [{"value": 0}]})
+
+    assert response.status_code == 400
+    assert response.get_json()["created"] == 0
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [None, {}, {"charges": {}}, {"charges": []}, {"charges": [{"value": 1}] * (MAX_BATCH_SIZE + 1)}],
+)
+def test_batch_rejects_malformed_requests(client, payload):
+    response = client.post(BATCH_URL, json=payload)
+
+    assert response.status_code == 400
+    assert Charge.query.count() == 0
@@ -0,0 +1,134 @@
+import threading
+import time
+
+import fakeredis
+import pytest
+
+from exceptions.charge_exceptions import ChargeTemporarilyUnavailable
+from services import charge_cache
+from services.charge_cache import (
+    cache_key,
+    cache_ttl_for,
+    decode_entry,
+    encode_entry,
+    get_charge_cached,
+    write_entry,
+    write_through,
+)
+
+
+def test_concurrent_misses_run_loader_once():
+    redis = fakeredis.FakeRedis(decode_responses=True)
+    calls = []
+    results = []
+    barrier = threading.Barrier(8)
+
+    def loader():
+        calls.append(1)
+        time.sleep(0.05)
+        return {"id": 1, "value": 10.0, "status": "PENDING"}, 60
+
+    def poll():
+        barrier.wait()
+        results.append(get_charge_cached(redis, 1, loader))
+
+    threads = [threading.Thread(target=poll) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert all(r["status"] == "PENDING" for r in results)
+    assert decode_entry(redis.get(cache_key(1))).payload["id"] == 1
+
+
+def test_stale_value_is_served_while_another_worker_recomputes():
+    redis = fakeredis.FakeRedis(decode_responses=True)
+    stale = {"id": 2, "value": 10.0, "status": "PENDING"}
+    redis.setex(cache_key(2), 90, encode_entry(stale, delta=0.01, ttl=60, now=time.time() - 120))
+    # Recompute lock held by another process
+    redis.set("lock:charge:2", "other-worker", nx=True, px=2000)
+
+    def loader():
+        raise AssertionError("must not hit the DB while another worker recomputes")
+
+    assert get_charge_cached(redis, 2, loader) == stale
+
+
+def test_miss_without_the_lock_never_reads_the_db(monkeypatch):
+    redis = fakeredis.FakeRedis(decode_responses=True)
+    redis.set("lock:charge:8", "other-worker", nx=True, px=2000)
+    monkeypatch.setattr(charge_cache, "FOLLOWER_WAIT_SECONDS", 0.05)
+
+    def loader():
+        raise AssertionError("must not hit the DB without the recompute lock")
+
+    with pytest.raises(ChargeTemporarilyUnavailable):
+        get_charge_cached(redis, 8, loader)
+
+
+def test_follower_timing_out_on_a_miss_never_reads_the_db(monkeypatch):
+    redis = fakeredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(charge_cache, "FOLLOWER_WAIT_SECONDS", 0.05)
+    leader_started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        leader_started.set()
+        release.wait(2)
+        return {"id": 9, "value": 1.0, "status": "PENDING"}, 60
+
+    leader = threading.Thread(target=get_charge_cached, args=(redis, 9, loader))
+    leader.start()
+    leader_started.wait(2)
+    try:
+        with pytest.raises(ChargeTemporarilyUnavailable):
+            get_charge_cached(redis, 9, loader)
+    finally:
+        release.set()
+        leader.join()
+    assert len(calls) == 1
+
+
+def test_fresh_entry_is_served_without_loader():
+    redis = fakeredis.FakeRedis(decode_responses=True)
+    write_entry(redis, 3, {"id": 3, "value": 5.0, "status": "PAID"})
+
+    def loader():
+        raise AssertionError("fresh entries must not be reloaded")
+
+    assert get_charge_cached(redis, 3, loader, beta=0)["status"] == "PAID"
+
+
+def test_early_refresh_probability_grows_near_expiry():
+    now = time.time()
+    near_expiry = decode_entry(encode_entry({"id": 4}, delta=1.0, ttl=0.5, now=now))
+    far_from_expiry = decode_entry(encode_entry({"id": 4}, delta=0.001, ttl=60, now=now))
+
+    refreshed_near = sum(not near_expiry.is_fresh(now, beta=1.0) for _ in range(500))
+    refreshed_far = sum(not far_from_expiry.is_fresh(now, beta=1.0) for _ in range(500))
+
+    assert refreshed_near > 100
+    assert refreshed_far == 0
+
+
+def test_legacy_entries_without_envelope_are_still_read():
+    entry = decode_entry('{"id": 5, "value": 1.0, "status": "PENDING"}')
+
+    assert entry.payload["id"] == 5
+    assert entry.is_fresh(time.time(), charge_cache.EARLY_REFRESH_BETA)
+
+
+def test_pending_entries_never_outlive_the_charge_ttl():
+    redis = fakeredis.FakeRedis(decode_responses=True)
+    write_through(redis, {"id": 6, "value": 1.0, "status": "PENDING"}, remaining_charge_ttl=12)
+    write_through(redis, {"id": 7, "value": 1.0, "status": "PAID"}, remaining_charge_ttl=12)
+
+    assert cache_ttl_for({"status": "PENDING"}, 12) == 12
+    assert decode_entry(redis.get(cache_key(6))).soft_expires_at <= time.time() + 12
+    # fakeredis counts the TTL down: allow the second that may have passed
+    full_ttl = charge_cache.CACHE_TTL_SECONDS + charge_cache.STALE_GRACE_SECONDS
+    assert full_ttl - 1 <= redis.ttl(cache_key(7)) <= full_ttl
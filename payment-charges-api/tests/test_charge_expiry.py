@@ -0,0 +1,142 @@
+import time
+from datetime import datetime, timedelta
+
+import fakeredis
+import pytest
+from flask import Flask
+
+from db_models.charges import Charge, ChargeStatus
+from repository.database import db
+from routes.charges import CHARGE_TTL_SECONDS, charges_bp
+from services.charge_cache import cache_key, decode_entry
+from services.charge_expiry import (
+    EXPIRY_ZSET_KEY,
+    SWEEPER_LOCK_KEY,
+    ExpirySweeper,
+    schedule_expiry,
+    sweep_due_charges,
+)
+
+CHARGES_BASE = "/payment/charges"
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config["TESTING"] = True
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+
+    db.init_app(app)
+    app.register_blueprint(charges_bp)
+
+    fake_redis = fakeredis.FakeRedis(decode_responses=True)
+    app.extensions["redis"] = fake_redis
+    app.fake_redis = fake_redis
+
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def _past_deadline():
+    return time.time() + CHARGE_TTL_SECONDS + 1
+
+
+def test_create_and_batch_schedule_deadlines(app):
+    client = app.test_client()
+    client.post(CHARGES_BASE, json={"value": 10.0})
+    client.post(f"{CHARGES_BASE}/batch", json={"charges": [{"value": 1.0}, {"value": 2.0}]})
+
+    assert app.fake_redis.zcard(EXPIRY_ZSET_KEY) == 3
+    charge = Charge.query.first()
+    assert charge.expires_at == charge.created_at + timedelta(seconds=CHARGE_TTL_SECONDS)
+
+
+def test_sweep_expires_only_due_pending_charges_in_chunks(app):
+    charges = [
+        Charge(value=float(i + 1), status=ChargeStatus.PENDING.value, external_id=f"ext-{i}")
+        for i in range(7)
+    ]
+    charges.append(Charge(value=9.0, status=ChargeStatus.PAID.value, external_id="ext-paid"))
+    db.session.add_all(charges)
+    db.session.commit()
+
+    now = time.time()
+    schedule_expiry(app.fake_redis, {f"ext-{i}": now - 1 for i in range(6)})
+    schedule_expiry(app.fake_redis, {"ext-6": now + 60, "ext-paid": now - 1})
+
+    expired = sweep_due_charges(app.fake_redis, db.engine, now=now, chunk_size=2)
+
+    assert expired == 6
+    db.session.expire_all()
+    statuses = {c.external_id: c.status for c in Charge.query.all()}
+    assert [statuses[f"ext-{i}"] for i in range(6)] == [ChargeStatus.EXPIRED.value] * 6
+    assert statuses["ext-6"] == ChargeStatus.PENDING.value
+    assert statuses["ext-paid"] == ChargeStatus.PAID.value
+    # Only the future deadline remains scheduled
+    assert app.fake_redis.zrangebyscore(EXPIRY_ZSET_KEY, "-inf", "+inf") == ["ext-6"]
+
+
+def test_sweep_replaces_cached_pending_representation(app):
+    client = app.test_client()
+    charge_id = client.post(CHARGES_BASE, json={"value": 15.0}).get_json()["id"]
+    assert client.get(f"{CHARGES_BASE}/{charge_id}").get_json()["status"] == ChargeStatus.PENDING.value
+
+    sweep_due_charges(app.fake_redis, db.engine, now=_past_deadline())
+
+    entry = decode_entry(app.fake_redis.get(cache_key(charge_id)))
+    assert entry.payload == {
+        "id": charge_id,
+        "value": 15.0,
+        "amount_cents": 1500,
+        "status": ChargeStatus.EXPIRED.value,
+    }
+    assert client.get(f"{CHARGES_BASE}/{charge_id}").get_json()["status"] == ChargeStatus.EXPIRED.value
+
+
+def test_failed_update_puts_the_chunk_back(app):
+    schedule_expiry(app.fake_redis, {"ext-a": time.time() - 1})
+
+    class BrokenEngine:
+        def begin(self):
+            raise RuntimeError("database unavailable")
+
+    with pytest.raises(RuntimeError):
+        sweep_due_charges(app.fake_redis, BrokenEngine())
+
+    assert app.fake_redis.zcard(EXPIRY_ZSET_KEY) == 1
+
+
+def test_only_the_leader_sweeps(app):
+    leader = ExpirySweeper(app.fake_redis, db.engine)
+    follower = ExpirySweeper(app.fake_redis, db.engine)
+
+    assert leader.is_leader()
+    assert not follower.is_leader()
+    # Leadership is kept across ticks by renewing the same lock
+    assert leader.is_leader()
+
+    leader.stop()
+    assert app.fake_redis.get(SWEEPER_LOCK_KEY) is None
+    assert follower.is_leader()
+
+
+def test_read_expires_charge_past_deadline_without_redis_ttl_lookup(app, monkeypatch):
+    charge = Charge(
+        value=5.0,
+        status=ChargeStatus.PENDING.value,
+        external_id="ext-late",
+        created_at=datetime.utcnow() - timedelta(hours=1),
+        expires_at=datetime.utcnow() - timedelta(seconds=1),
+    )
+    db.session.add(charge)
+    db.session.commit()
+
+    monkeypatch.setattr(app.fake_redis, "ttl", None)
+    monkeypatch.setattr(app.fake_redis, "exists", None)
+
+    response = app.test_client().get(f"{CHARGES_BASE}/{charge.id}")
+    assert response.get_json()["status"] == ChargeStatus.EXPIRED.value
@@ -0,0 +1,66 @@
+import threading
+
+from sqlalchemy import create_engine, text
+
+from repository.engine import database_url, engine_options, install_sqlite_pragmas
+
+
+def test_database_url_defaults_to_absolute_sqlite_and_normalizes_postgres():
+    assert database_url({}).startswith("sqlite:////")
+    assert database_url({"DATABASE_URL": "postgres://u:p@db/payments"}) == "postgresql://u:p@db/payments"
+
+
+def test_engine_options_from_environment():
+    env = {"DB_POOL_SIZE": "20", "DB_MAX_OVERFLOW": "0", "DB_POOL_RECYCLE": "300", "DB_STATEMENT_TIMEOUT_MS": "2500"}
+
+    options = engine_options("postgresql://u@db/payments", env)
+    assert options["pool_size"] == 20
+    assert options["max_overflow"] == 0
+    assert options["pool_recycle"] == 300
+    assert options["pool_pre_ping"] is True
+    assert options["connect_args"] == {"options": "-c statement_timeout=2500"}
+
+    async_options = engine_options("postgresql+asyncpg://u@db/payments", env, async_driver=True)
+    assert async_options["connect_args"] == {"server_settings": {"statement_timeout": "2500"}}
+
+    assert engine_options("sqlite:///:memory:", env) == {}
+
+
+def test_sqlite_pragmas_are_applied_on_connect(tmp_path):
+    url = f"sqlite:///{tmp_path / 'charges.db'}"
+    engine = create_engine(url, **engine_options(url, {"SQLITE_BUSY_TIMEOUT_MS": "3000"}))
+    install_sqlite_pragmas(engine, {"SQLITE_BUSY_TIMEOUT_MS": "3000"})
+
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 3000
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+
+
+def test_concurrent_writers_wait_instead_of_failing(tmp_path):
+    url = f"sqlite:///{tmp_path / 'charges.db'}"
+    engine = create_engine(url, **engine_options(url, {}))
+    install_sqlite_pragmas(engine, {})
+
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE t (n INTEGER)"))
+
+    errors = []
+
+    def writer():
+        try:
+            for n in range(50):
+                with engine.begin() as conn:
+                    conn.execute(text("INSERT INTO t (n) VALUES (:n)"), {"n": n})
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=writer) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM t")).scalar() == 200
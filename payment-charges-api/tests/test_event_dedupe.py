@@ -0,0 +1,89 @@
+import time
+
+import pytest
+
+from security.event_dedupe import (
+    EVENT_DEDUPE_TTL_SECONDS,
+    BucketedEventDedupe,
+    KeyEventDedupe,
+)
+from security.webhook_gate import GateResult, release_webhook_event, reserve_webhook_event, reserve_webhook_events
+from services.webhook_stream import WEBHOOK_STREAM_KEY, enqueue_webhook_event
+
+# The bucketed backend runs in Lua: needs a real Redis implementation
+fakeredis = pytest.importorskip("fakeredis")
+
+BACKENDS = {
+    "keys": KeyEventDedupe(),
+    "buckets": BucketedEventDedupe(bucket_seconds=3600),
+    "buckets+prefilter": BucketedEventDedupe(bucket_seconds=3600, prefilter_bits=1 << 16),
+}
+
+
+@pytest.fixture
+def redis():
+    redis = fakeredis.FakeRedis(decode_responses=True)
+    redis.setex("charge:ttl:ext-1", 1800, "PENDING")
+    return redis
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # Patches time.time() itself: fakeredis expires keys with the same clock
+    now = [time.time()]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+    return now
+
+
+@pytest.mark.parametrize("name", BACKENDS)
+def test_backends_share_duplicate_semantics(redis, name):
+    dedupe = BACKENDS[name]
+
+    assert reserve_webhook_event(redis, "evt-1", "ext-1", dedupe) == GateResult.RESERVED
+    assert reserve_webhook_event(redis, "evt-1", "ext-1", dedupe) == GateResult.DUPLICATE
+    assert reserve_webhook_event(redis, "evt-2", "ext-missing", dedupe) == GateResult.CHARGE_EXPIRED
+
+    release_webhook_event(redis, "evt-1", dedupe)
+    assert reserve_webhook_events(
+        redis, [("evt-1", "ext-1"), ("evt-1", "ext-1"), ("evt-2", "ext-1")], dedupe
+    ) == [GateResult.RESERVED, GateResult.DUPLICATE, GateResult.RESERVED]
+
+
+def test_buckets_match_the_window_exactly(redis, clock):
+    dedupe = BucketedEventDedupe(bucket_seconds=3600)
+    start = clock[0]
+
+    assert reserve_webhook_event(redis, "evt-1", "ext-1", dedupe) == GateResult.RESERVED
+
+    clock[0] = start + EVENT_DEDUPE_TTL_SECONDS - 1
+    assert reserve_webhook_event(redis, "evt-1", "ext-1", dedupe) == GateResult.DUPLICATE
+
+    # The first bucket still exists, but the entry left the window
+    clock[0] = start + EVENT_DEDUPE_TTL_SECONDS + 1
+    redis.setex("charge:ttl:ext-1", 1800, "PENDING")
+    assert redis.hexists(dedupe.bucket_key(dedupe.buckets(start)[0]), "evt-1")
+    assert reserve_webhook_event(redis, "evt-1", "ext-1", dedupe) == GateResult.RESERVED
+
+
+def test_buckets_hold_many_events_in_one_expiring_key(redis):
+    dedupe = BucketedEventDedupe(bucket_seconds=3600)
+    reserve_webhook_events(redis, [(f"evt-{i}", "ext-1") for i in range(100)], dedupe)
+
+    assert redis.keys("webhook:event:*") == []
+    [bucket] = redis.keys("webhook:dedupe:*")
+    assert redis.hlen(bucket) == 100
+    assert EVENT_DEDUPE_TTL_SECONDS < redis.ttl(bucket) <= EVENT_DEDUPE_TTL_SECONDS + 3600
+
+    report = dedupe.memory_report(redis)
+    assert report["entries"] == 100
+    assert len(report["buckets"]) == EVENT_DEDUPE_TTL_SECONDS // 3600 + 1
+    assert KeyEventDedupe().memory_report(redis)["entries"] == 0
+
+
+def test_stream_ingestion_uses_the_selected_backend(redis):
+    dedupe = BACKENDS["buckets+prefilter"]
+    data = {"event_id": "evt-s", "external_id": "ext-1", "amount_cents": 100, "status": "PAID"}
+
+    assert enqueue_webhook_event(redis, data, dedupe=dedupe) == GateResult.RESERVED
+    assert enqueue_webhook_event(redis, data, dedupe=dedupe) == GateResult.DUPLICATE
+    assert redis.xlen(WEBHOOK_STREAM_KEY) == 1
@@ -4,41 +4,27 @@ import json
 import time
 import uuid
 
+import fakeredis
 import pytest
 from flask import Flask, jsonify, request
 
 from db_models.charges import Charge, ChargeStatus
+from infrastructure.local_cache import get_terminal_cache
 from repository.database import db
-from routes.charges import charges_bp
+from routes.charges import CHARGE_TTL_SECONDS, charges_bp
 from routes.webhooks import webhooks_bp
+from services.charge_expiry import sweep_due_charges
 
 CHARGES_BASE = "/payment/charges"
 
 
-class FakeRedis:
-    def __init__(self):
-        self.store = {}
-
-    def get(self, key):
-        return self.store.get(key)
-
-    def setex(self, key, _ttl, value):
-        self.store[key] = value
-
-    def exists(self, key):
-        return 1 if key in self.store else 0
-
-    def delete(self, key):
-        self.store.pop(key, None)
-
-
 def _sign_payload(secret, payload_bytes):
     digest = hmac.new(secret.encode(), payload_bytes, hashlib.sha256).hexdigest()
     return f"sha256={digest}"
 
 
 @pytest.fixture
-def app(monkeypatch):
+def app():
     app = Flask(__name__)
     app.config["TESTING"] = True
     app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
@@ -49,10 +35,8 @@ def app(monkeypatch):
     app.register_blueprint(charges_bp)
     app.register_blueprint(webhooks_bp)
 
-    fake_redis = FakeRedis()
-    monkeypatch.setattr("routes.charges.redis_client", fake_redis)
-    monkeypatch.setattr("routes.webhooks.redis_client", fake_redis)
-    monkeypatch.setattr("security.idempotency.redis_client", fake_redis)
+    fake_redis = fakeredis.FakeRedis(decode_responses=True)
+    app.extensions["redis"] = fake_redis
 
     app.fake_redis = fake_redis
 
@@ -176,6 +160,7 @@ def test_pix_e2e_webhook_after_ttl_expired_results_in_expired(payment_client, ba
     ttl_key = f"charge:ttl:{charge_data['external_id']}"
 
     assert app.fake_redis.exists(ttl_key) == 1
+    # Deadline reached: the TTL key is gone, the sweeper has not run yet
     app.fake_redis.delete(ttl_key)
 
     pay_response = bank_client.post(
@@ -186,6 +171,9 @@ def test_pix_e2e_webhook_after_ttl_expired_results_in_expired(payment_client, ba
     assert pay_response.get_json()["webhook_status_code"] == 200
     assert pay_response.get_json()["webhook_body"]["message"] == "Expired charge ignored"
 
+    expired = sweep_due_charges(app.fake_redis, db.engine, now=time.time() + CHARGE_TTL_SECONDS + 1)
+    assert expired == 1
+
     status_response = payment_client.get(f"{CHARGES_BASE}/{charge_data['id']}")
     assert status_response.status_code == 200
     assert status_response.get_json()["status"] == ChargeStatus.EXPIRED.value
@@ -227,3 +215,29 @@ def test_pix_e2e_duplicate_webhook_event_is_ignored_and_final_status_paid(paymen
     status_response = payment_client.get(f"{CHARGES_BASE}/{charge_data['id']}")
     assert status_response.status_code == 200
     assert status_response.get_json()["status"] == ChargeStatus.PAID.value
+
+
+def test_pix_e2e_reads_after_create_and_webhook_are_served_from_cache(payment_client, bank_client, app, monkeypatch):
+    charge_data = _create_charge_and_register_bank(payment_client, bank_client, value=42.0)
+
+    def no_db(_charge_id):
+        raise AssertionError("write-through must make the DB read unnecessary")
+
+    monkeypatch.setattr("routes.charges._load_charge", no_db)
+
+    pending = payment_client.get(f"{CHARGES_BASE}/{charge_data['id']}")
+    assert pending.get_json() == {
+        "id": charge_data["id"],
+        "value": 42.0,
+        "amount_cents": 4200,
+        "status": ChargeStatus.PENDING.value,
+    }
+
+    pay_response = bank_client.post("/bank/pix/pay", json={"external_id": charge_data["external_id"]})
+    assert pay_response.get_json()["webhook_status_code"] == 200
+
+    # Bypass the per-process terminal cache: the Redis entry itself must already say PAID
+    get_terminal_cache().clear()
+
+    paid = payment_client.get(f"{CHARGES_BASE}/{charge_data['id']}")
+    assert paid.get_json()["status"] == ChargeStatus.PAID.value
@@ -0,0 +1,126 @@
+import asyncio
+import threading
+import time
+
+import fakeredis
+import pytest
+from flask import Flask
+
+from infrastructure.health_monitor import STALE_AFTER_INTERVALS, HealthMonitor, HealthState, check_all_async
+from repository.database import db
+from routes.health import health_bp
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config["TESTING"] = True
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
+    app.config["HEALTH_CHECK_INTERVAL_SECONDS"] = 60
+
+    db.init_app(app)
+    app.register_blueprint(health_bp)
+    app.extensions["redis"] = fakeredis.FakeRedis(decode_responses=True)
+    return app
+
+
+def test_ready_reports_latency_and_last_success_per_dependency(app):
+    client = app.test_client()
+    response = client.get("/ready")
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["status"] == "ready"
+    assert body["database"] == body["redis"] == "ok"
+    for name in ("database", "redis"):
+        check = body["checks"][name]
+        assert check["status"] == "ok" and check["error"] is None
+        assert check["latency_ms"] >= 0
+        assert check["last_success_age_seconds"] >= 0
+
+    # Snapshot younger than the interval: later probes do not check again
+    again = client.get("/ready").get_json()
+    for name in ("database", "redis"):
+        assert again["checks"][name]["latency_ms"] == body["checks"][name]["latency_ms"]
+    assert again["checked_age_seconds"] >= body["checked_age_seconds"]
+
+
+def test_hanging_check_times_out_and_is_not_started_again():
+    release = threading.Event()
+    calls = {"slow": 0}
+
+    def slow():
+        calls["slow"] += 1
+        release.wait(5)
+
+    monitor = HealthMonitor({"slow": slow, "fast": lambda: None}, interval=1, timeout=0.05)
+    try:
+        for _ in range(3):
+            started = time.perf_counter()
+            monitor.check_all()
+            assert time.perf_counter() - started < 0.5
+
+        body, is_ready = monitor.state.report()
+        assert not is_ready
+        assert body["checks"]["slow"]["status"] == "failed"
+        assert body["checks"]["slow"]["error"] == "timeout"
+        assert body["checks"]["slow"]["last_success_age_seconds"] is None
+        assert body["fast"] == "ok"
+        # Still hung: one call, one pool thread, whatever the number of rounds
+        assert calls["slow"] == 1
+
+        release.set()
+        monitor._pending["slow"][0].result(timeout=1)
+        monitor.check_all()
+        assert monitor.state.report()[1]
+        assert calls["slow"] == 2
+    finally:
+        release.set()
+        monitor.stop()
+
+
+def test_failure_keeps_last_success_and_stale_snapshot_is_not_ready():
+    healthy = {"value": True}
+
+    def flaky():
+        if not healthy["value"]:
+            raise ConnectionError("down")
+
+    monitor = HealthMonitor({"redis": flaky}, interval=1, timeout=0.5)
+    try:
+        monitor.check_all()
+        healthy["value"] = False
+        monitor.check_all()
+
+        body, is_ready = monitor.state.report()
+        assert not is_ready
+        assert body["checks"]["redis"]["error"] == "ConnectionError"
+        assert body["checks"]["redis"]["last_success_age_seconds"] is not None
+
+        healthy["value"] = True
+        monitor.check_all()
+        assert monitor.state.report()[1]
+        # The monitor stopped completing rounds: the old "ok" is not trusted
+        assert not monitor.state.report(now=time.monotonic() + STALE_AFTER_INTERVALS + 1)[1]
+    finally:
+        monitor.stop()
+
+
+def test_async_checks_are_cancelled_at_the_timeout():
+    async def hang():
+        await asyncio.sleep(5)
+
+    async def ok():
+        return None
+
+    checks = {"database": ok, "redis": hang}
+    state = HealthState(checks, interval=1, timeout=0.05)
+
+    started = time.perf_counter()
+    asyncio.run(check_all_async(state, checks, state.timeout))
+    assert time.perf_counter() - started < 1
+
+    body, is_ready = state.report()
+    assert not is_ready
+    assert body["database"] == "ok"
+    assert body["checks"]["redis"]["error"] == "timeout"
@@ -0,0 +1,80 @@
+import pytest
+import redis
+from flask import Flask, jsonify
+from flask_limiter import Limiter
+
+from extensions import rate_limit_key, storage_uri
+from infrastructure.hybrid_rate_limit import KEY_PREFIX, HybridRedisStorage
+
+fakeredis = pytest.importorskip("fakeredis")
+
+KEY = "LIMITER/1.2.3.4/charges/10/1/minute"
+
+
+class _DownRedis:
+    def pipeline(self, transaction=True):
+        raise redis.ConnectionError("redis is down")
+
+
+@pytest.fixture
+def shared_redis():
+    return fakeredis.FakeRedis(decode_responses=True)
+
+
+def _storage(client, **options):
+    return HybridRedisStorage("hybrid+redis://localhost:6379", client=client, **options)
+
+
+def test_hits_are_local_until_the_unsynced_bound(shared_redis):
+    storage = _storage(shared_redis, max_unsynced=3, sync_interval=60)
+
+    assert [storage.incr(KEY, 60) for _ in range(2)] == [1, 2]
+    assert shared_redis.get(KEY_PREFIX + KEY) is None
+
+    # Third unsynced hit: published inline before being admitted
+    assert storage.incr(KEY, 60) == 3
+    assert shared_redis.get(KEY_PREFIX + KEY) == "3"
+    assert 0 < shared_redis.ttl(KEY_PREFIX + KEY) <= 60
+
+
+def test_processes_converge_on_the_shared_count(shared_redis):
+    first = _storage(shared_redis, max_unsynced=10, sync_interval=60)
+    second = _storage(shared_redis, max_unsynced=10, sync_interval=60)
+
+    for _ in range(4):
+        first.incr(KEY, 60)
+    second.incr(KEY, 60)
+
+    assert first.sync_pending() == 1
+    assert second.sync_pending() == 1
+    assert shared_redis.get(KEY_PREFIX + KEY) == "5"
+    assert second.get(KEY) == 5
+
+    first.incr(KEY, 60)
+    first.sync_pending()
+    assert first.get(KEY) == 6
+
+
+def test_limit_is_enforced_locally_when_redis_is_down():
+    storage = _storage(_DownRedis(), max_unsynced=1, sync_interval=60)
+
+    assert [storage.incr(KEY, 60) for _ in range(3)] == [1, 2, 3]
+    assert storage.get(KEY) == 3
+
+
+def test_flask_limiter_uses_the_hybrid_storage(shared_redis):
+    app = Flask(__name__)
+    limiter = Limiter(
+        key_func=rate_limit_key,
+        app=app,
+        storage_uri=storage_uri("hybrid", "redis://localhost:6379"),
+        storage_options={"client": shared_redis, "max_unsynced": 2, "sync_interval": 60},
+    )
+
+    @app.route("/charges", methods=["POST"])
+    @limiter.limit("3 per minute")
+    def create():
+        return jsonify({}), 201
+
+    client = app.test_client()
+    assert [client.post("/charges").status_code for _ in range(4)] == [201, 201, 201, 429]
@@ -0,0 +1,75 @@
+import json
+
+import fakeredis
+import pytest
+from flask import Flask, jsonify
+
+from security import idempotency
+from security.idempotency import encode_response, idempotent, idempotency_key, new_marker
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config["TESTING"] = True
+
+    fake_redis = fakeredis.FakeRedis(decode_responses=True)
+    app.extensions["redis"] = fake_redis
+    app.fake_redis = fake_redis
+    app.calls = []
+
+    @app.route("/resource/<status>", methods=["POST"])
+    @idempotent(ttl=300, wait=0.2)
+    def resource(status):
+        app.calls.append(status)
+        return jsonify({"status": int(status)}), int(status), {"Location": "/resource/1"}
+
+    return app
+
+
+def _post(app, status, key="key-1"):
+    return app.test_client().post(f"/resource/{status}", headers={"Idempotency-Key": key})
+
+
+def test_replay_keeps_status_code_and_selected_headers(app):
+    first = _post(app, 404)
+    replay = _post(app, 404)
+
+    assert app.calls == ["404"]
+    assert (replay.status_code, replay.get_json()) == (404, {"status": 404})
+    assert replay.headers["Location"] == "/resource/1"
+    assert replay.headers["Idempotent-Replayed"] == "true"
+    assert "Idempotent-Replayed" not in first.headers
+
+
+def test_concurrent_duplicate_gets_409_while_first_is_in_progress(app):
+    app.fake_redis.set(idempotency_key("key-1"), new_marker(), ex=30)
+
+    response = _post(app, 201)
+
+    assert response.status_code == 409
+    assert response.headers["Retry-After"] == "1"
+    assert app.calls == []
+
+
+def test_concurrent_duplicate_waits_for_the_first_response(app, monkeypatch):
+    redis_key = idempotency_key("key-1")
+    app.fake_redis.set(redis_key, new_marker(), ex=30)
+
+    def first_request_finishes(_):
+        app.fake_redis.setex(redis_key, 300, encode_response(201, {"Content-Type": "application/json"}, '{"id": 7}'))
+
+    monkeypatch.setattr(idempotency.time, "sleep", first_request_finishes)
+    response = _post(app, 201)
+
+    assert (response.status_code, response.get_json()) == (201, {"id": 7})
+    assert app.calls == []
+
+
+def test_server_errors_are_not_stored(app):
+    assert _post(app, 503).status_code == 503
+    assert app.fake_redis.get(idempotency_key("key-1")) is None
+
+    assert _post(app, 200).status_code == 200
+    assert app.calls == ["503", "200"]
+    assert json.loads(app.fake_redis.get(idempotency_key("key-1")))["status"] == 200
@@ -0,0 +1,109 @@
+from datetime import datetime, timedelta
+
+import fakeredis
+import pytest
+from flask import Flask
+from sqlalchemy import text
+
+from db_models.charges import Charge, ChargeStatus
+from repository.database import db
+from routes.charges import charges_bp
+from services.charge_listing import build_list_query
+
+LIST_URL = "/payment/charges"
+AUTH = {"Authorization": "Bearer ops-key"}
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config["TESTING"] = True
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    app.config["EXTERNAL_API_KEY"] = "ops-key"
+
+    db.init_app(app)
+    app.register_blueprint(charges_bp)
+
+    app.extensions["redis"] = fakeredis.FakeRedis(decode_responses=True)
+
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def _seed(count, start=datetime(2026, 1, 1)):
+    # Pairs of charges share created_at, so the id tie-breaker is exercised
+    for i in range(count):
+        db.session.add(Charge(
+            value=float(i + 1),
+            status=ChargeStatus.PAID.value if i % 3 == 0 else ChargeStatus.PENDING.value,
+            external_id=f"ext-{i}",
+            created_at=start + timedelta(minutes=i // 2),
+        ))
+    db.session.commit()
+
+
+def _walk(client, query=""):
+    ids, cursor = [], None
+    while True:
+        url = f"{LIST_URL}?limit=3{query}" + (f"&cursor={cursor}" if cursor else "")
+        body = client.get(url, headers=AUTH).get_json()
+        ids.extend(item["id"] for item in body["items"])
+        cursor = body["next_cursor"]
+        if not cursor:
+            return ids
+
+
+def test_list_requires_api_key(client):
+    assert client.get(LIST_URL).status_code == 401
+    assert client.get(LIST_URL, headers={"Authorization": "Bearer wrong"}).status_code == 403
+
+
+def test_pages_cover_every_charge_once_newest_first(client, app):
+    _seed(10)
+
+    ids = _walk(client)
+
+    expected = [c.id for c in Charge.query.order_by(Charge.created_at.desc(), Charge.id.desc())]
+    assert ids == expected
+    assert len(set(ids)) == 10
+
+
+def test_filters_by_status_and_created_at_range(client, app):
+    _seed(10)
+
+    paid_ids = _walk(client, "&status=PAID")
+    assert {Charge.query.get(i).status for i in paid_ids} == {ChargeStatus.PAID.value}
+    assert len(paid_ids) == 4
+
+    body = client.get(
+        f"{LIST_URL}?created_from=2026-01-01T00:01:00&created_to=2026-01-01T00:03:00",
+        headers=AUTH,
+    ).get_json()
+    assert sorted(item["external_id"] for item in body["items"]) == ["ext-2", "ext-3", "ext-4", "ext-5"]
+
+
+@pytest.mark.parametrize("query", ["status=UNKNOWN", "limit=0", "limit=abc", "cursor=not-a-cursor", "created_from=yesterday"])
+def test_invalid_parameters_are_rejected(client, query):
+    response = client.get(f"{LIST_URL}?{query}", headers=AUTH)
+    assert response.status_code == 400
+
+
+def test_listing_uses_composite_indexes(app):
+    _seed(4)
+    for params, index in (
+        ({}, "ix_charge_created_at_id"),
+        ({"status": "PAID"}, "ix_charge_status_created_at_id"),
+    ):
+        stmt = build_list_query(after=(datetime(2026, 1, 2), 10), **params)
+        compiled = stmt.compile(db.engine, compile_kwargs={"literal_binds": True})
+        plan = db.session.execute(text(f"EXPLAIN QUERY PLAN {compiled}")).all()
+        assert any(index in row[-1] for row in plan)
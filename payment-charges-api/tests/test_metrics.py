@@ -0,0 +1,159 @@
+import hashlib
+import hmac
+import json
+import os
+import subprocess
+import sys
+import time
+import uuid
+from pathlib import Path
+
+import pytest
+import redis
+from flask import Flask
+from prometheus_client import REGISTRY
+from sqlalchemy import create_engine, text
+
+from db_models.charges import Charge
+from infrastructure.metrics import InstrumentedRedis, instrument_engine, observe_request
+from repository.database import db
+from routes.charges import charges_bp
+from routes.health import health_bp
+from routes.webhooks import webhooks_bp
+
+fakeredis = pytest.importorskip("fakeredis")
+
+SECRET = "test-webhook-secret"
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def _sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config["TESTING"] = True
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
+    app.config["WEBHOOK_SECRET"] = SECRET
+
+    db.init_app(app)
+    app.register_blueprint(charges_bp)
+    app.register_blueprint(webhooks_bp)
+    app.register_blueprint(health_bp)
+
+    redis_client = fakeredis.FakeRedis(decode_responses=True)
+    app.extensions["redis"] = redis_client
+
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def _post_webhook(app, event, secret=SECRET):
+    body = json.dumps(event).encode()
+    return app.test_client().post("/webhooks/pix", data=body, headers={
+        "Content-Type": "application/json",
+        "Idempotency-Key": str(uuid.uuid4()),
+        "X-Timestamp": str(int(time.time())),
+        "X-Signature": "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest(),
+    })
+
+
+def test_webhook_outcomes_are_counted(app):
+    before = {
+        outcome: _sample("webhook_events_total", outcome=outcome)
+        for outcome in ("confirmed", "duplicate", "invalid")
+    }
+    charge_id = app.test_client().post("/payment/charges", json={"value": 10.0}).get_json()["id"]
+    charge = db.session.get(Charge, charge_id)
+    event = {"event_id": "evt-1", "external_id": charge.external_id, "amount_cents": charge.cents, "status": "PAID"}
+
+    assert _post_webhook(app, event).status_code == 200
+    assert _post_webhook(app, event).get_json()["message"] == "Duplicate event ignored"
+    assert _post_webhook(app, event, secret="wrong").status_code == 401
+
+    assert _sample("webhook_events_total", outcome="confirmed") - before["confirmed"] == 1
+    assert _sample("webhook_events_total", outcome="duplicate") - before["duplicate"] == 1
+    assert _sample("webhook_events_total", outcome="invalid") - before["invalid"] == 1
+
+
+def test_metrics_endpoint_exposes_the_registry(app):
+    # Unmatched paths share one label value instead of one series per raw path
+    observe_request("GET", None, None, 404, 0.001)
+    response = app.test_client().get("/metrics")
+
+    assert response.status_code == 200
+    assert response.content_type.startswith("text/plain")
+    exposition = response.get_data(as_text=True)
+    assert 'http_request_duration_seconds_count{blueprint="none",method="GET",route="unmatched",status="404"}' in exposition
+    assert "# TYPE webhook_events_total counter" in exposition
+
+
+def test_terminal_cache_hits_and_size_are_exposed(app):
+    charge = Charge(value=8.0, status="PAID", external_id="ext-terminal-metrics")
+    db.session.add(charge)
+    db.session.commit()
+    hits, misses = (_sample("terminal_cache_lookups_total", result=result) for result in ("hit", "miss"))
+    entries = _sample("terminal_cache_entries")
+
+    client = app.test_client()
+    for _ in range(3):
+        assert client.get(f"/payment/charges/{charge.id}").status_code == 200
+
+    # The first read misses and stores the charge, the next two never leave the process
+    assert _sample("terminal_cache_lookups_total", result="miss") == misses + 1
+    assert _sample("terminal_cache_lookups_total", result="hit") == hits + 2
+    assert _sample("terminal_cache_entries") == entries + 1
+
+    exposition = client.get("/metrics").get_data(as_text=True)
+    assert 'terminal_cache_lookups_total{result="hit"}' in exposition
+    assert "# TYPE terminal_cache_entries gauge" in exposition
+    assert "# TYPE terminal_cache_capacity gauge" in exposition
+
+
+def test_redis_commands_and_pipelines_are_timed():
+    client = InstrumentedRedis(connection_pool=redis.ConnectionPool(
+        connection_class=fakeredis.FakeRedisConnection, server=fakeredis.FakeServer()
+    ))
+    before = (_sample("redis_command_duration_seconds_count", command="SET"),
+              _sample("redis_command_duration_seconds_count", command="PIPELINE"))
+
+    client.set("k", "v")
+    pipe = client.pipeline(transaction=False)
+    pipe.get("k")
+    pipe.incr("n")
+    assert pipe.execute() == [b"v", 1]
+
+    assert _sample("redis_command_duration_seconds_count", command="SET") - before[0] == 1
+    assert _sample("redis_command_duration_seconds_count", command="PIPELINE") - before[1] == 1
+
+
+def test_sql_statements_are_timed_by_type():
+    engine = create_engine("sqlite://")
+    instrument_engine(engine)
+    before = _sample("db_query_duration_seconds_count", statement="SELECT")
+
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        with pytest.raises(Exception):
+            conn.execute(text("SELECT * FROM missing_table"))
+        conn.execute(text("  select 2"))
+
+    assert _sample("db_query_duration_seconds_count", statement="SELECT") - before == 2
+
+
+def test_samples_from_every_worker_are_merged(tmp_path):
+    env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path)}
+    worker = "from infrastructure.metrics import observe_webhook; observe_webhook({'message': 'Payment confirmed'}, 200)"
+    for _ in range(2):
+        subprocess.run([sys.executable, "-c", worker], cwd=ROOT, env=env, check=True)
+
+    exposition = subprocess.run(
+        [sys.executable, "-c", "from infrastructure.metrics import metrics_payload; print(metrics_payload()[0].decode())"],
+        cwd=ROOT, env=env, check=True, capture_output=True, text=True,
+    ).stdout
+    assert 'webhook_events_total{outcome="confirmed"} 2.0' in exposition
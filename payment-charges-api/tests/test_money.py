@@ -0,0 +1,86 @@
+import fakeredis
+import pytest
+from flask import Flask
+from sqlalchemy import create_engine, text
+
+from db_models.charges import Charge
+from repository.database import db, migrate_amounts_to_cents
+from routes.charges import charges_bp
+from services.money import cents_from_payload, to_cents
+
+
+@pytest.mark.parametrize("value, cents", [
+    (100, 10000),
+    (100.5, 10050),
+    (0.29, 29),
+    ("19.99", 1999),
+    (1e-2, 1),
+])
+def test_to_cents_is_exact(value, cents):
+    assert to_cents(value) == cents
+
+
+@pytest.mark.parametrize("value", [10.001, "abc", None, True, float("nan"), [1]])
+def test_to_cents_rejects_inexact_or_malformed_amounts(value):
+    assert to_cents(value) is None
+
+
+def test_payload_accepts_both_forms_and_rejects_disagreement():
+    assert cents_from_payload({"amount_cents": 10050}) == 10050
+    assert cents_from_payload({"value": 100.5}) == 10050
+    assert cents_from_payload({"value": 100.5, "amount_cents": 10050}) == 10050
+    assert cents_from_payload({"value": 100.5, "amount_cents": 10051}) is None
+    assert cents_from_payload({"amount_cents": 100.5}) is None
+
+
+def test_migration_backfills_cents_on_legacy_table(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE charge (id INTEGER PRIMARY KEY, value FLOAT NOT NULL, status VARCHAR(20),"
+            " external_id VARCHAR(36) NOT NULL UNIQUE, created_at DATETIME, expires_at DATETIME, paid_at DATETIME)"
+        ))
+        conn.execute(text(
+            "INSERT INTO charge (value, status, external_id) VALUES (0.29, 'PENDING', 'a'), (120.0, 'PAID', 'b')"
+        ))
+
+    with engine.begin() as conn:
+        assert migrate_amounts_to_cents(conn) == 2
+    with engine.begin() as conn:
+        # Idempotent
+        assert migrate_amounts_to_cents(conn) == 0
+        rows = conn.execute(text("SELECT external_id, amount_cents FROM charge ORDER BY id")).all()
+
+    assert rows == [("a", 29), ("b", 12000)]
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    app.config["TESTING"] = True
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+
+    db.init_app(app)
+    app.register_blueprint(charges_bp)
+    app.extensions["redis"] = fakeredis.FakeRedis(decode_responses=True)
+
+    with app.app_context():
+        db.create_all()
+        yield app.test_client()
+        db.session.remove()
+        db.drop_all()
+
+
+def test_api_accepts_cents_and_returns_both_forms(client):
+    created = client.post("/payment/charges", json={"amount_cents": 1999})
+    assert created.status_code == 201
+
+    charge = db.session.get(Charge, created.get_json()["id"])
+    assert (charge.amount_cents, charge.value) == (1999, 19.99)
+
+    body = client.get(f"/payment/charges/{charge.id}").get_json()
+    assert body["amount_cents"] == 1999
+    assert body["value"] == 19.99
+
+    assert client.post("/payment/charges", json={"value": 10.001}).status_code == 400
@@ -0,0 +1,91 @@
+import hashlib
+import hmac
+import time
+
+import pytest
+from flask import Flask, jsonify
+
+from infrastructure.profiling import (
+    PROFILE_ID_HEADER,
+    PROFILE_SIGNATURE_HEADER,
+    PROFILE_TIMESTAMP_HEADER,
+    install_profiling,
+    profile_signature_payload,
+)
+from routes.ops import ops_bp
+
+TOKEN = "ops-token"
+AUTH = {"Authorization": f"Bearer {TOKEN}"}
+
+
+def _slow_handler():
+    return sum(i * i for i in range(20_000))
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__)
+    app.config.update(TESTING=True, PROFILING_TOKEN=TOKEN, PROFILING_DIR=str(tmp_path), PROFILING_KEEP=2)
+
+    @app.route("/work")
+    def work():
+        return jsonify({"total": _slow_handler()})
+
+    install_profiling(app)
+    app.register_blueprint(ops_bp)
+    return app
+
+
+def _signed(method, full_path, secret=TOKEN, timestamp=None):
+    timestamp = timestamp or str(int(time.time()))
+    payload = profile_signature_payload(timestamp, method, full_path)
+    signature = hmac.new(secret.encode(), payload, hashlib.sha256).hexdigest()
+    return {PROFILE_SIGNATURE_HEADER: f"sha256={signature}", PROFILE_TIMESTAMP_HEADER: timestamp}
+
+
+def test_signed_request_is_profiled_and_readable(app):
+    client = app.test_client()
+
+    assert PROFILE_ID_HEADER not in client.get("/work").headers
+    assert PROFILE_ID_HEADER not in client.get("/work", headers=_signed("GET", "/work", secret="wrong")).headers
+
+    # Signature replayed under a fresh timestamp
+    replayed = _signed("GET", "/work", timestamp=str(int(time.time()) - 1))
+    replayed[PROFILE_TIMESTAMP_HEADER] = str(int(time.time()))
+    assert PROFILE_ID_HEADER not in client.get("/work", headers=replayed).headers
+
+    name = client.get("/work?n=1", headers=_signed("GET", "/work?n=1")).headers[PROFILE_ID_HEADER]
+    assert client.get("/ops/profiles", headers=AUTH).get_json() == {"profiles": [name]}
+
+    report = client.get(f"/ops/profiles/{name}?format=text", headers=AUTH).get_data(as_text=True)
+    assert "_slow_handler" in report
+    assert client.get(f"/ops/profiles/{name}", headers=AUTH).data
+    assert client.get("/ops/profiles/..%2Fsecret.prof", headers=AUTH).status_code == 404
+    assert client.get("/ops/profiles").status_code == 401
+
+
+def test_sampling_keeps_a_rolling_window(app):
+    client = app.test_client()
+    assert client.post("/ops/profiling", json={"sample_rate": 2}, headers=AUTH).status_code == 400
+    assert client.post("/ops/profiling", json={"sample_rate": 1}, headers=AUTH).get_json()["sample_rate"] == 1
+
+    for _ in range(4):
+        client.get("/work")
+
+    # Sampled profiles are stored but not announced to the caller
+    assert PROFILE_ID_HEADER not in client.get("/work").headers
+    assert len(client.get("/ops/profiles", headers=AUTH).get_json()["profiles"]) == 2
+
+
+def test_memory_snapshots_report_growth(app):
+    client = app.test_client()
+
+    assert client.post("/ops/memory/snapshot", headers=AUTH).get_json()["tracing"] == "started"
+    retained = [bytearray(1024) for _ in range(1000)]
+    body = client.post("/ops/memory/snapshot?limit=5", headers=AUTH).get_json()
+    assert client.delete("/ops/memory/snapshot", headers=AUTH).status_code == 204
+
+    assert body["tracing"] == "running"
+    assert len(body["top_growth"]) == 5
+    assert body["top_growth"][0]["size_diff"] >= 1000 * 1024
+    assert retained
@@ -3,39 +3,28 @@ import hashlib
 import json
 import time
 
+import fakeredis
 import pytest
 from flask import Flask
+from sqlalchemy import event
 
+import routes.webhooks
 from repository.database import db
 from db_models.charges import Charge, ChargeStatus
 from routes.charges import charges_bp
 from routes.webhooks import webhooks_bp
 from services.charge_state_machine import (
+    SOURCE_STATES,
     ChargeState,
     InvalidChargeTransition,
     transition_charge,
+    transition_rows_where,
+    transition_where,
 )
 
 
-class FakeRedis:
-    def __init__(self):
-        self.store = {}
-
-    def get(self, key):
-        return self.store.get(key)
-
-    def setex(self, key, _ttl, value):
-        self.store[key] = value
-
-    def exists(self, key):
-        return 1 if key in self.store else 0
-
-    def delete(self, key):
-        self.store.pop(key, None)
-
-
 @pytest.fixture
-def app(monkeypatch):
+def app():
     app = Flask(__name__)
     app.config["TESTING"] = True
     app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
@@ -46,10 +35,8 @@ def app(monkeypatch):
     app.register_blueprint(charges_bp)
     app.register_blueprint(webhooks_bp)
 
-    fake_redis = FakeRedis()
-    monkeypatch.setattr("routes.charges.redis_client", fake_redis)
-    monkeypatch.setattr("routes.webhooks.redis_client", fake_redis)
-    monkeypatch.setattr("security.idempotency.redis_client", fake_redis)
+    fake_redis = fakeredis.FakeRedis(decode_responses=True)
+    app.extensions["redis"] = fake_redis
 
     with app.app_context():
         db.create_all()
@@ -146,3 +133,76 @@ def test_webhook_paid_ignored_for_expired(client, app):
     with app.app_context():
         refreshed = Charge.query.get(charge.id)
         assert refreshed.status == ChargeStatus.EXPIRED
+
+
+def test_allowed_transitions_compile_to_status_guards():
+    assert SOURCE_STATES[ChargeState.PAID] == (ChargeState.PENDING.value,)
+    assert SOURCE_STATES[ChargeState.EXPIRED] == (ChargeState.PENDING.value,)
+    assert SOURCE_STATES[ChargeState.PENDING] == ()
+
+
+@pytest.mark.parametrize("returning", [True, False])
+def test_conditional_transition_moves_a_row_once(app, monkeypatch, returning):
+    monkeypatch.setattr(db.engine.dialect, "update_returning", returning)
+    charge = _create_charge(value=12.5, external_id="ext-cond")
+
+    row = transition_where(ChargeState.PAID, Charge.external_id == "ext-cond", Charge.amount_cents == 1250)
+    assert (row.id, row.status, row.amount_cents) == (charge.id, ChargeStatus.PAID.value, 1250)
+    assert row.paid_at is not None
+
+    # Guard: PAID is not a source state of EXPIRED (or of PAID)
+    assert transition_where(ChargeState.EXPIRED, Charge.id == charge.id) is None
+    assert transition_where(ChargeState.PAID, Charge.id == charge.id) is None
+    assert Charge.query.get(charge.id).status == ChargeStatus.PAID.value
+
+
+@pytest.mark.parametrize("returning", [True, False])
+def test_conditional_transition_returns_only_the_rows_it_moved(app, monkeypatch, returning):
+    monkeypatch.setattr(db.engine.dialect, "update_returning", returning)
+    paid = _create_charge(value=10.0, external_id="ext-done")
+    pending = _create_charge(value=10.0, external_id="ext-open")
+    assert transition_where(ChargeState.PAID, Charge.id == paid.id) is not None
+
+    # Both match the criteria, only one is still PENDING
+    rows = transition_rows_where(ChargeState.PAID, Charge.external_id.in_(["ext-done", "ext-open"]))
+    assert [row.id for row in rows] == [pending.id]
+
+
+def test_conditional_transition_loses_against_concurrent_expiry(app):
+    charge = _create_charge(value=40.0, external_id="ext-race")
+    # The sweeper wins the race first
+    assert transition_where(ChargeState.EXPIRED, Charge.id == charge.id) is not None
+
+    assert transition_where(ChargeState.PAID, Charge.external_id == "ext-race") is None
+    assert Charge.query.get(charge.id).status == ChargeStatus.EXPIRED.value
+
+
+def test_webhook_confirms_with_a_single_statement(client, app):
+    _create_charge(value=70.0, external_id="ext-hot")
+    routes.webhooks.redis_client.setex("charge:ttl:ext-hot", 1800, "PENDING")
+
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement.split()[0].upper())
+
+    event.listen(db.engine, "before_cursor_execute", record)
+    try:
+        payload = json.dumps({
+            "event_id": "evt_hot", "external_id": "ext-hot", "amount_cents": 7000, "status": "PAID",
+        }).encode()
+        response = client.post(
+            "/webhooks/pix",
+            data=payload,
+            headers={
+                "Content-Type": "application/json",
+                "X-Timestamp": str(int(time.time())),
+                "X-Signature": _sign_payload("test-webhook-secret", payload),
+                "Idempotency-Key": "idem-hot",
+            },
+        )
+    finally:
+        event.remove(db.engine, "before_cursor_execute", record)
+
+    assert response.get_json() == {"message": "Payment confirmed"}
+    assert statements == ["UPDATE"]
@@ -0,0 +1,105 @@
+import fakeredis
+import pytest
+from flask import Flask
+
+from db_models.charges import Charge, ChargeStatus
+from infrastructure.local_cache import TerminalChargeCache, get_terminal_cache
+from repository.database import db
+from routes.charges import charges_bp
+
+
+def _snapshot(charge_id, status, external_id=None):
+    return {"id": charge_id, "external_id": external_id, "value": 10.0, "status": status}
+
+
+def test_cache_ignores_non_terminal_charges():
+    cache = TerminalChargeCache(maxsize=10)
+
+    assert cache.put(_snapshot(1, ChargeStatus.PENDING.value, "ext-1")) is False
+    assert cache.get_by_id(1) is None
+    assert cache.stats()["size"] == 0
+
+
+def test_cache_indexes_by_id_and_external_id():
+    cache = TerminalChargeCache(maxsize=10)
+    cache.put(_snapshot(1, ChargeStatus.PAID.value, "ext-1"))
+
+    assert cache.get_by_id(1)["status"] == ChargeStatus.PAID.value
+    assert cache.get_by_external_id("ext-1")["id"] == 1
+    assert cache.get_by_external_id("ext-unknown") is None
+
+    stats = cache.stats()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 1
+    assert stats["hit_rate"] == pytest.approx(2 / 3, rel=1e-3)
+
+
+def test_cache_evicts_least_recently_used():
+    cache = TerminalChargeCache(maxsize=2)
+    cache.put(_snapshot(1, ChargeStatus.PAID.value, "ext-1"))
+    cache.put(_snapshot(2, ChargeStatus.EXPIRED.value, "ext-2"))
+    cache.get_by_id(1)
+    cache.put(_snapshot(3, ChargeStatus.PAID.value, "ext-3"))
+
+    assert cache.get_by_id(2) is None
+    assert cache.get_by_external_id("ext-2") is None
+    assert cache.get_by_id(1) is not None
+    assert cache.stats()["size"] == 2
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config["TESTING"] = True
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+
+    db.init_app(app)
+    app.register_blueprint(charges_bp)
+
+    fake_redis = fakeredis.FakeRedis(decode_responses=True)
+    app.extensions["redis"] = fake_redis
+    app.fake_redis = fake_redis
+
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def test_get_serves_terminal_charge_from_process_memory(app):
+    charge = Charge(value=30.0, status=ChargeStatus.PAID.value, external_id="ext-paid")
+    db.session.add(charge)
+    db.session.commit()
+    charge_id = charge.id
+
+    client = app.test_client()
+    first = client.get(f"/payment/charges/{charge_id}")
+    assert first.get_json()["status"] == ChargeStatus.PAID.value
+
+    # Neither Redis nor the DB is needed anymore for this charge
+    app.fake_redis.flushall()
+    db.session.delete(db.session.get(Charge, charge_id))
+    db.session.commit()
+
+    second = client.get(f"/payment/charges/{charge_id}")
+    assert second.status_code == 200
+    assert second.get_json() == first.get_json()
+    assert get_terminal_cache().get_by_external_id("ext-paid")["id"] == charge_id
+
+
+def test_terminal_read_stores_the_snapshot_once(app, monkeypatch):
+    charge = Charge(value=12.0, status=ChargeStatus.EXPIRED.value, external_id="ext-once")
+    db.session.add(charge)
+    db.session.commit()
+
+    cache = get_terminal_cache()
+    puts = []
+    put = cache.put
+    monkeypatch.setattr(cache, "put", lambda snapshot: puts.append(snapshot) or put(snapshot))
+
+    response = app.test_client().get(f"/payment/charges/{charge.id}")
+    assert response.status_code == 200
+    # The DB snapshot, external_id included
+    assert [snapshot["external_id"] for snapshot in puts] == ["ext-once"]
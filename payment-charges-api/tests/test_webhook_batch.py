@@ -0,0 +1,151 @@
+import gzip
+import hashlib
+import hmac
+import json
+import time
+import uuid
+
+import pytest
+from flask import Flask
+
+from db_models.charges import Charge, ChargeStatus
+from repository.database import db
+from routes.charges import charges_bp
+from routes.webhooks import webhooks_bp
+from services.charge_cache import cache_key, decode_entry
+from services.webhook_batch import MAX_BATCH_BODY_BYTES
+
+# The batch gate pipelines Lua scripts: needs a real Redis implementation
+fakeredis = pytest.importorskip("fakeredis")
+
+SECRET = "test-webhook-secret"
+BATCH_URL = "/webhooks/pix/batch"
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config["TESTING"] = True
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    app.config["WEBHOOK_SECRET"] = SECRET
+
+    db.init_app(app)
+    app.register_blueprint(charges_bp)
+    app.register_blueprint(webhooks_bp)
+
+    redis = fakeredis.FakeRedis(decode_responses=True)
+    app.extensions["redis"] = redis
+    app.redis = redis
+
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def _create_charge(app, value):
+    charge_id = app.test_client().post("/payment/charges", json={"value": value}).get_json()["id"]
+    return db.session.get(Charge, charge_id)
+
+
+def _event(charge, event_id=None, **overrides):
+    return {
+        "event_id": event_id or str(uuid.uuid4()),
+        "external_id": charge.external_id,
+        "amount_cents": charge.cents,
+        "status": "PAID",
+        **overrides,
+    }
+
+
+def _post_batch(app, events, compress=False):
+    body = json.dumps({"events": events}).encode()
+    headers = {"Content-Type": "application/json", "Idempotency-Key": str(uuid.uuid4())}
+    if compress:
+        body = gzip.compress(body)
+        headers["Content-Encoding"] = "gzip"
+
+    # The signature covers the bytes on the wire
+    headers["X-Signature"] = "sha256=" + hmac.new(SECRET.encode(), body, hashlib.sha256).hexdigest()
+    headers["X-Timestamp"] = str(int(time.time()))
+    return app.test_client().post(BATCH_URL, data=body, headers=headers)
+
+
+def _statuses():
+    db.session.expire_all()
+    return {charge.external_id: charge.status for charge in Charge.query.all()}
+
+
+def test_batch_returns_one_result_per_event_in_order(app):
+    first = _create_charge(app, 10.0)
+    second = _create_charge(app, 20.0)
+
+    events = [
+        _event(first, "evt-1"),
+        _event(first, "evt-1"),                    # same event twice in the batch
+        _event(second, "evt-2", amount_cents=1),   # wrong amount
+        _event(first, "evt-3", external_id="missing"),
+        _event(second, "evt-4", status="FAILED"),
+        {"event_id": "evt-5"},
+    ]
+
+    response = _post_batch(app, events)
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["confirmed"] == 1
+    assert [(r["event_id"], r["status"], r.get("message") or r.get("error")) for r in body["results"]] == [
+        ("evt-1", 200, "Payment confirmed"),
+        ("evt-1", 200, "Duplicate event ignored"),
+        ("evt-2", 400, "Invalid value"),
+        ("evt-3", 404, "Charge not found"),
+        ("evt-4", 200, "Ignored"),
+        ("evt-5", 400, "Invalid payload"),
+    ]
+
+    statuses = _statuses()
+    assert statuses[first.external_id] == ChargeStatus.PAID.value
+    assert statuses[second.external_id] == ChargeStatus.PENDING.value
+
+    # Write-through of the new state, and failed events can be retried
+    assert decode_entry(app.redis.get(cache_key(first.id))).payload["status"] == ChargeStatus.PAID.value
+    assert app.redis.exists("webhook:event:evt-2") == 0
+
+
+def test_gzip_batch_is_verified_before_inflating(app):
+    charge = _create_charge(app, 15.5)
+
+    response = _post_batch(app, [_event(charge)], compress=True)
+    assert response.get_json()["confirmed"] == 1
+
+    bomb = gzip.compress(b" " * (MAX_BATCH_BODY_BYTES + 1))
+    headers = {
+        "Content-Encoding": "gzip",
+        "Idempotency-Key": "bomb",
+        "X-Timestamp": str(int(time.time())),
+        "X-Signature": "sha256=" + hmac.new(SECRET.encode(), bomb, hashlib.sha256).hexdigest(),
+    }
+    assert app.test_client().post(BATCH_URL, data=bomb, headers=headers).status_code == 413
+
+    headers["X-Signature"] = "sha256=invalid"
+    assert app.test_client().post(BATCH_URL, data=bomb, headers=headers).status_code == 401
+
+
+def test_failed_commit_reports_500_and_releases_the_events(app, monkeypatch):
+    charge = _create_charge(app, 30.0)
+
+    commit = db.session.commit
+
+    def broken_commit():
+        raise RuntimeError("database unavailable")
+
+    monkeypatch.setattr(db.session, "commit", broken_commit)
+    result = _post_batch(app, [_event(charge, "evt-retry")]).get_json()["results"][0]
+    assert result["status"] == 500
+    monkeypatch.setattr(db.session, "commit", commit)
+
+    # The bank's retry of the same event goes through
+    retried = _post_batch(app, [_event(charge, "evt-retry")]).get_json()
+    assert retried["results"][0]["message"] == "Payment confirmed"
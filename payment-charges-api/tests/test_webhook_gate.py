@@ -0,0 +1,33 @@
+import fakeredis
+
+from security.webhook_gate import (
+    GateResult,
+    event_key,
+    release_webhook_event,
+    reserve_webhook_event,
+)
+
+
+def test_gate_reserves_event_once():
+    redis = fakeredis.FakeRedis(decode_responses=True)
+    redis.setex("charge:ttl:ext-1", 1800, "PENDING")
+
+    assert reserve_webhook_event(redis, "evt-1", "ext-1") == GateResult.RESERVED
+    assert redis.exists(event_key("evt-1")) == 1
+    assert reserve_webhook_event(redis, "evt-1", "ext-1") == GateResult.DUPLICATE
+
+
+def test_gate_does_not_reserve_when_charge_ttl_is_missing():
+    redis = fakeredis.FakeRedis(decode_responses=True)
+
+    assert reserve_webhook_event(redis, "evt-2", "ext-missing") == GateResult.CHARGE_EXPIRED
+    assert redis.exists(event_key("evt-2")) == 0
+
+
+def test_released_event_can_be_reserved_again():
+    redis = fakeredis.FakeRedis(decode_responses=True)
+    redis.setex("charge:ttl:ext-3", 1800, "PENDING")
+
+    assert reserve_webhook_event(redis, "evt-3", "ext-3") == GateResult.RESERVED
+    release_webhook_event(redis, "evt-3")
+    assert reserve_webhook_event(redis, "evt-3", "ext-3") == GateResult.RESERVED
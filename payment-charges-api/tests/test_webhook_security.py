@@ -3,6 +3,7 @@ import hmac
 import json
 import time
 
+import fakeredis
 import pytest
 from flask import Flask
 
@@ -12,23 +13,6 @@ from routes.charges import charges_bp
 from routes.webhooks import webhooks_bp
 
 
-class FakeRedis:
-    def __init__(self):
-        self.store = {}
-
-    def get(self, key):
-        return self.store.get(key)
-
-    def setex(self, key, _ttl, value):
-        self.store[key] = value
-
-    def exists(self, key):
-        return 1 if key in self.store else 0
-
-    def delete(self, key):
-        self.store.pop(key, None)
-
-
 def _sign_payload(secret, payload_bytes):
     digest = hmac.new(secret.encode(), payload_bytes, hashlib.sha256).hexdigest()
     return f"sha256={digest}"
@@ -43,7 +27,7 @@ def _create_charge(value=100.0, status=ChargeStatus.PENDING, external_id="ext-se
 
 
 @pytest.fixture
-def app(monkeypatch):
+def app():
     app = Flask(__name__)
     app.config["TESTING"] = True
     app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
@@ -54,10 +38,8 @@ def app(monkeypatch):
     app.register_blueprint(charges_bp)
     app.register_blueprint(webhooks_bp)
 
-    fake_redis = FakeRedis()
-    monkeypatch.setattr("routes.charges.redis_client", fake_redis)
-    monkeypatch.setattr("routes.webhooks.redis_client", fake_redis)
-    monkeypatch.setattr("security.idempotency.redis_client", fake_redis)
+    fake_redis = fakeredis.FakeRedis(decode_responses=True)
+    app.extensions["redis"] = fake_redis
 
     app.fake_redis = fake_redis
 
@@ -181,6 +163,8 @@ def test_webhook_value_mismatch_returns_400_and_keeps_pending(client, app):
     with app.app_context():
         refreshed = Charge.query.get(charge.id)
         assert refreshed.status == ChargeStatus.PENDING.value
+    # The gate reservation must be released so the bank can retry the event
+    assert app.fake_redis.exists("webhook:event:evt_test_value_mismatch") == 0
 
 
 def test_webhook_duplicate_event_id_is_ignored_without_changing_paid_at(client, app):
@@ -238,3 +222,71 @@ def test_webhook_duplicate_event_id_is_ignored_without_changing_paid_at(client,
         refreshed = Charge.query.get(charge.id)
         assert refreshed.status == ChargeStatus.PAID.value
         assert refreshed.paid_at == first_paid_at
+
+
+def _match_count(secret):
+    from prometheus_client import REGISTRY
+
+    return REGISTRY.get_sample_value("webhook_signature_matches_total", {"secret": secret}) or 0
+
+
+def test_webhook_accepts_previous_secret_during_rotation(client, app):
+    app.config["WEBHOOK_SECRET"] = "new-webhook-secret"
+    app.config["WEBHOOK_SECRET_PREVIOUS"] = ["test-webhook-secret"]
+    with app.app_context():
+        charge = _create_charge(value=20.0, external_id="ext-rotation")
+        app.fake_redis.setex(f"charge:ttl:{charge.external_id}", 1800, "PENDING")
+
+    def post(secret, event_id):
+        payload_bytes = json.dumps({
+            "event_id": event_id, "external_id": "ext-rotation", "value": 20.0, "status": "PAID",
+        }).encode()
+        return client.post(
+            "/webhooks/pix",
+            data=payload_bytes,
+            headers={
+                "Content-Type": "application/json",
+                "X-Timestamp": str(int(time.time())),
+                "X-Signature": _sign_payload(secret, payload_bytes),
+                "Idempotency-Key": f"idem-{event_id}",
+            },
+        )
+
+    previous, current = _match_count("previous"), _match_count("current")
+
+    # Bank still on the old secret
+    assert post("test-webhook-secret", "evt_rotation_old").status_code == 200
+    # Bank switched to the new one
+    assert post("new-webhook-secret", "evt_rotation_new").status_code == 200
+    # Retired / unknown secret
+    assert post("some-other-secret", "evt_rotation_bad").status_code == 401
+
+    assert _match_count("previous") == previous + 1
+    assert _match_count("current") == current + 1
+
+
+def test_keyring_tries_last_matched_secret_first():
+    from security.webhook_signature import Keyring
+
+    keyring = Keyring(["current", "previous"])
+    payload = b'{"event_id":"evt_1"}'
+
+    assert keyring.match(_sign_payload("previous", payload), payload) == 1
+    assert keyring.match(_sign_payload("current", payload), payload) == 0
+    assert keyring.match(_sign_payload("unknown", payload), payload) is None
+
+    copies = []
+
+    class CountingKey:
+        def __init__(self, keyed):
+            self.keyed = keyed
+
+        def copy(self):
+            copies.append(self)
+            return self.keyed.copy()
+
+    keyring.match(_sign_payload("previous", payload), payload)
+    keyring._keyed = [CountingKey(keyed) for keyed in keyring._keyed]
+    # "previous" matched last: one HMAC, not two
+    assert keyring.match(_sign_payload("previous", payload), payload) == 1
+    assert copies == [keyring._keyed[1]]
@@ -0,0 +1,28 @@
+import pytest
+
+from benchmarks.webhook_stages import build_stages, bench_env, find_regressions, measure, stats
+
+# The stages run against fakeredis (Lua scripts included)
+pytest.importorskip("fakeredis")
+
+
+def test_every_stage_runs():
+    with bench_env() as app:
+        stages = build_stages(app)
+        results = {stage.name: stats(measure(stage, rounds=3, warmup=1)) for stage in stages}
+
+    assert {"hmac_verify[64KiB]", "json_parse", "transition_charge", "idempotent_dispatch", "pix_webhook"} <= set(results)
+    assert all(result["rounds"] == 3 and result["median_us"] > 0 for result in results.values())
+
+
+def test_regressions_compare_one_statistic_against_the_threshold():
+    baseline = {"stages": {"fast": {"min_us": 10.0}, "slow": {"min_us": 100.0}, "gone": {"min_us": 1.0}}}
+    results = {
+        "fast": {"min_us": 12.4, "median_us": 30.0},  # +24%: within 25%
+        "slow": {"min_us": 150.0},                    # +50%
+        "new": {"min_us": 5.0},                       # no baseline yet
+    }
+
+    assert find_regressions(results, baseline, threshold=0.25) == {"slow": 0.5}
+    assert find_regressions(results, baseline, threshold=0.1) == {"fast": 0.24, "slow": 0.5}
+    assert find_regressions(results, baseline, stat="median_us") == {}
@@ -0,0 +1,225 @@
+import hashlib
+import hmac
+import json
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from flask import Flask
+
+from db_models.charges import Charge, ChargeStatus
+from repository.database import db
+from routes.charges import CHARGE_TTL_SECONDS, charges_bp
+from routes.webhooks import webhooks_bp
+from security.webhook_gate import GateResult
+from services import webhook_processor
+from services.charge_cache import cache_key
+from services.charge_expiry import EXPIRY_ZSET_KEY, paying_key, sweep_due_charges
+from services.webhook_stream import (
+    DEAD_LETTER_STREAM_KEY,
+    MAX_DELIVERIES,
+    WEBHOOK_CONSUMER_GROUP,
+    WEBHOOK_STREAM_KEY,
+    WebhookStreamWorker,
+    enqueue_webhook_event,
+    ensure_consumer_group,
+)
+
+# Streams, consumer groups and Lua need a real Redis implementation
+fakeredis = pytest.importorskip("fakeredis")
+
+SECRET = "test-webhook-secret"
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config["TESTING"] = True
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    app.config["WEBHOOK_SECRET"] = SECRET
+    app.config["WEBHOOK_INGESTION_MODE"] = "stream"
+
+    db.init_app(app)
+    app.register_blueprint(charges_bp)
+    app.register_blueprint(webhooks_bp)
+
+    redis = fakeredis.FakeRedis(decode_responses=True)
+    app.extensions["redis"] = redis
+    app.redis = redis
+
+    with app.app_context():
+        db.create_all()
+        ensure_consumer_group(redis)
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def _post_paid(app, charge):
+    event_id = str(uuid.uuid4())
+    body = json.dumps({
+        "event_id": event_id,
+        "external_id": charge.external_id,
+        "amount_cents": charge.cents,
+        "status": "PAID",
+    }).encode()
+    signature = hmac.new(SECRET.encode(), body, hashlib.sha256).hexdigest()
+    return app.test_client().post(
+        "/webhooks/pix",
+        data=body,
+        headers={
+            "Content-Type": "application/json",
+            "X-Signature": f"sha256={signature}",
+            "X-Timestamp": str(int(time.time())),
+            "Idempotency-Key": event_id,
+        },
+    )
+
+
+def _create_charge(app, value=25.0):
+    charge_id = app.test_client().post("/payment/charges", json={"value": value}).get_json()["id"]
+    return db.session.get(Charge, charge_id)
+
+
+def _status(charge):
+    db.session.expire_all()
+    return db.session.get(Charge, charge.id).status
+
+
+def _pending_count(redis):
+    return redis.xpending(WEBHOOK_STREAM_KEY, WEBHOOK_CONSUMER_GROUP)["pending"]
+
+
+def test_endpoint_acks_before_the_worker_applies_the_event(app):
+    charge = _create_charge(app)
+
+    response = _post_paid(app, charge)
+
+    assert response.status_code == 202
+    assert response.get_json() == {"message": "Event accepted"}
+    assert _status(charge) == ChargeStatus.PENDING.value
+    assert app.redis.xlen(WEBHOOK_STREAM_KEY) == 1
+
+    worker = WebhookStreamWorker(app, app.redis, "c1", block_ms=None)
+    assert worker.poll() == 1
+
+    assert _status(charge) == ChargeStatus.PAID.value
+    assert _pending_count(app.redis) == 0
+    assert app.redis.exists(paying_key(charge.external_id)) == 0
+
+
+def test_failed_entry_stays_pending_and_is_reclaimed(app, monkeypatch):
+    charge = _create_charge(app)
+    _post_paid(app, charge)
+
+    original = webhook_processor.transition_where
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("database unavailable")
+
+    monkeypatch.setattr(webhook_processor, "transition_where", fail)
+    crashed = WebhookStreamWorker(app, app.redis, "c1", block_ms=None)
+    assert crashed.poll() == 0
+    assert _pending_count(app.redis) == 1
+
+    monkeypatch.setattr(webhook_processor, "transition_where", original)
+    survivor = WebhookStreamWorker(app, app.redis, "c2", block_ms=None, min_idle_ms=0)
+    assert survivor.claim_stale() == 1
+
+    assert _status(charge) == ChargeStatus.PAID.value
+    assert _pending_count(app.redis) == 0
+
+
+def test_entry_is_dead_lettered_after_max_deliveries(app, monkeypatch):
+    charge = _create_charge(app)
+    _post_paid(app, charge)
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("database unavailable")
+
+    monkeypatch.setattr(webhook_processor, "transition_where", fail)
+    worker = WebhookStreamWorker(app, app.redis, "c1", block_ms=None, min_idle_ms=0)
+    worker.poll()
+    for _ in range(MAX_DELIVERIES - 1):
+        worker._claim_cursor = "0-0"
+        worker.claim_stale()
+
+    assert _pending_count(app.redis) == 0
+    assert app.redis.xlen(DEAD_LETTER_STREAM_KEY) == 1
+
+
+def test_reservation_is_kept_while_pending_and_released_when_dead_lettered(app, monkeypatch):
+    charge = _create_charge(app)
+    _post_paid(app, charge)
+    (_, fields), = app.redis.xrange(WEBHOOK_STREAM_KEY)
+    data = json.loads(fields["payload"])
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("database unavailable")
+
+    monkeypatch.setattr(webhook_processor, "transition_where", fail)
+    worker = WebhookStreamWorker(app, app.redis, "c1", block_ms=None, min_idle_ms=0)
+    worker.poll()
+
+    # Still pending: a re-sent event must not be queued a second time
+    assert enqueue_webhook_event(app.redis, data) == GateResult.DUPLICATE
+    assert app.redis.xlen(WEBHOOK_STREAM_KEY) == 1
+
+    for _ in range(MAX_DELIVERIES - 1):
+        worker._claim_cursor = "0-0"
+        worker.claim_stale()
+
+    assert app.redis.xlen(DEAD_LETTER_STREAM_KEY) == 1
+    assert enqueue_webhook_event(app.redis, data) == GateResult.RESERVED
+
+
+def test_unparseable_entry_does_not_block_the_batch_and_is_dead_lettered(app):
+    app.redis.xadd(WEBHOOK_STREAM_KEY, {"event_id": "broken", "payload": "not-json", "received_at": "0"})
+    charge = _create_charge(app)
+    _post_paid(app, charge)
+
+    worker = WebhookStreamWorker(app, app.redis, "c1", block_ms=None, min_idle_ms=0)
+    assert worker.poll() == 1
+    assert _status(charge) == ChargeStatus.PAID.value
+    assert _pending_count(app.redis) == 1
+
+    for _ in range(MAX_DELIVERIES - 1):
+        worker._claim_cursor = "0-0"
+        worker.claim_stale()
+
+    assert _pending_count(app.redis) == 0
+    (_, dead), = app.redis.xrange(DEAD_LETTER_STREAM_KEY)
+    assert dead["event_id"] == "broken" and dead["payload"] == "not-json"
+
+
+def test_sweeper_postpones_charges_with_a_queued_payment(app):
+    charge = _create_charge(app)
+    _post_paid(app, charge)
+
+    now = time.time() + CHARGE_TTL_SECONDS + 1
+    assert sweep_due_charges(app.redis, db.engine, now=now) == 0
+    assert _status(charge) == ChargeStatus.PENDING.value
+    assert app.redis.zscore(EXPIRY_ZSET_KEY, charge.external_id) > now
+
+    WebhookStreamWorker(app, app.redis, "c1", block_ms=None).poll()
+    assert _status(charge) == ChargeStatus.PAID.value
+
+
+
+def test_read_past_deadline_does_not_expire_a_charge_with_a_queued_payment(app):
+    charge = _create_charge(app)
+    assert _post_paid(app, charge).status_code == 202
+
+    # Worker backlog: the deadline passes before the event is applied
+    charge.expires_at = datetime.utcnow() - timedelta(seconds=1)
+    db.session.commit()
+    app.redis.delete(cache_key(charge.id))
+
+    response = app.test_client().get(f"/payment/charges/{charge.id}")
+    assert response.get_json()["status"] == ChargeStatus.PENDING.value
+    assert _status(charge) == ChargeStatus.PENDING.value
+
+    WebhookStreamWorker(app, app.redis, "c1", block_ms=None).poll()
+    assert _status(charge) == ChargeStatus.PAID.value
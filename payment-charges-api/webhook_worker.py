@@ -0,0 +1,33 @@
+"""
+Worker pool for WEBHOOK_INGESTION_MODE=stream.
+
+    python webhook_worker.py --workers 8
+
+Consumes the webhooks:pix stream (consumer group "webhook-processors") and
+applies the PAID transitions with the same rules as the synchronous endpoint.
+Works for both the WSGI and the ASGI API: they share the stream and the database.
+"""
+import argparse
+import os
+
+# The API processes already run the (leader-elected) expiry sweeper
+os.environ.setdefault("EXPIRY_SWEEPER_ENABLED", "0")
+
+from app import create_app  # noqa: E402
+from infrastructure.redis_client import get_redis  # noqa: E402
+from services.webhook_stream import run_worker_pool  # noqa: E402
+
+
+def main():
+    app = create_app()
+    parser = argparse.ArgumentParser(description="PIX webhook stream workers")
+    parser.add_argument("--workers", type=int, default=app.config["WEBHOOK_WORKERS"])
+    args = parser.parse_args()
+
+    with app.app_context():
+        client = get_redis()
+    run_worker_pool(app, client, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()